@@ -0,0 +1,133 @@
+import threading, time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from bias_detector import BiasDetector
+from metrics import get_metrics
+from outlier_scorer import OutlierScorer
+from sentiment_analyzer import SentimentAnalyzer
+
+
+class BatchAnalysis:
+    """Columnar analysis results for one batch; row ``i`` belongs to article ``i``."""
+
+    def __init__(self, polarity, subjectivity, bias_hits, clickbait_hits, bias_score,
+                 manipulation_score, outlier_score, is_high_manipulation):
+        self.polarity = polarity
+        self.subjectivity = subjectivity
+        self.bias_hits = bias_hits  # {category: int array}
+        self.clickbait_hits = clickbait_hits
+        self.bias_score = bias_score
+        self.manipulation_score = manipulation_score
+        self.outlier_score = outlier_score
+        self.is_high_manipulation = is_high_manipulation
+
+    def __len__(self):
+        return len(self.polarity)
+
+    def record(self, i: int, analyzed_at: str) -> Dict:
+        """The ``analysis`` dict stored on article ``i``."""
+        return {
+            'sentiment': {'polarity': float(self.polarity[i]),
+                          'subjectivity': float(self.subjectivity[i])},
+            'bias_score': float(self.bias_score[i]),
+            'manipulation_score': float(self.manipulation_score[i]),
+            'outlier_score': float(self.outlier_score[i]),
+            'analyzed_at': analyzed_at,
+            'is_high_manipulation': bool(self.is_high_manipulation[i]),
+        }
+
+
+class AnalysisPipeline:
+    """One analysis stage shared by ``monitor_cycle`` and ``/api/parse``.
+
+    ``run`` scores a whole batch at once: sentiment through the cached
+    ``analyze_batch``, keyword hits through one matcher pass per article, the
+    heuristic manipulation score as array arithmetic, and the title outlier
+    score from ``OutlierScorer``. ``analyze`` attaches the results to the
+    articles so they can be persisted in a single store write.
+
+    Each topic keeps its own outlier reference window, so a cycle's titles are
+    compared with earlier titles of the same topic rather than whichever topic
+    ran last.
+    """
+
+    def __init__(self, cfg, sentiment_analyzer=None, bias_detector=None):
+        self.cfg = cfg
+        self.sentiment_analyzer = sentiment_analyzer or SentimentAnalyzer(
+            cache_size=cfg.SENTIMENT_CACHE_SIZE, cache_file=cfg.SENTIMENT_CACHE_FILE,
+            workers=cfg.SENTIMENT_WORKERS, pool_min_batch=cfg.SENTIMENT_POOL_MIN_BATCH)
+        self.bias_detector = bias_detector or BiasDetector(cfg)
+        self.outlier_scorers: Dict[Optional[str], OutlierScorer] = {}  # topic name -> window
+        self.lock = threading.Lock()
+
+    def outlier_scorer(self, topic: Optional[str] = None) -> OutlierScorer:
+        """The scorer holding ``topic``'s reference window, created on first use."""
+        scorer = self.outlier_scorers.get(topic)
+        if scorer is None:
+            scorer = self.outlier_scorers.setdefault(
+                topic, OutlierScorer(window=self.cfg.OUTLIER_REFERENCE_WINDOW))
+        return scorer
+
+    def run(self, articles: List[Dict], topic: Optional[str] = None) -> BatchAnalysis:
+        metrics = get_metrics()
+        with self.lock:
+            start = time.perf_counter()
+            titles = [a.get('title') or '' for a in articles]
+            texts = [t + ' ' + (a.get('description') or '') for t, a in zip(titles, articles)]
+
+            with metrics.timer('news_stage_seconds', stage='sentiment'):
+                sentiments = self.sentiment_analyzer.analyze_batch(texts)
+            polarity = np.array([s['polarity'] for s in sentiments], dtype=float)
+            subjectivity = np.array([s['subjectivity'] for s in sentiments], dtype=float)
+
+            with metrics.timer('news_stage_seconds', stage='keywords'):
+                hits = self.bias_detector.keyword_hits_batch(articles)
+            categories = hits[0][0].keys() if hits else ()
+            bias_hits = {c: np.array([h[c] for h, _ in hits], dtype=int) for c in categories}
+            clickbait = np.array([t['title_clickbait'] for _, t in hits], dtype=int)
+            bias_score = np.array([self.bias_detector.bias_score(h) for h, _ in hits], dtype=float)
+
+            manipulation = self.heuristic_score(polarity, subjectivity, bias_score, clickbait)
+            with metrics.timer('news_stage_seconds', stage='outlier'):
+                if any(t.strip() for t in titles):
+                    outlier = np.asarray(self.outlier_scorer(topic).score(titles), dtype=float)
+                else:
+                    outlier = np.zeros(len(titles))
+            if articles:
+                metrics.observe('news_analysis_seconds_per_article',
+                                (time.perf_counter() - start) / len(articles))
+
+            return BatchAnalysis(polarity, subjectivity, bias_hits, clickbait, bias_score,
+                                 manipulation, outlier,
+                                 manipulation > self.cfg.MANIPULATION_THRESHOLD)
+
+    def analyze(self, articles: List[Dict], topic: Optional[str] = None) -> List[Dict]:
+        """Run the batch and set ``article['analysis']`` on each article."""
+        result = self.run(articles, topic)
+        now = datetime.now().isoformat()
+        for i, article in enumerate(articles):
+            article['analysis'] = result.record(i, now)
+        return articles
+
+    @staticmethod
+    def heuristic_score(polarity, subjectivity, bias_score, clickbait_hits):
+        score = (np.where(np.abs(polarity) >= 0.7, 2.0, 0.0)
+                 + np.where(subjectivity >= 0.8, 1.5, 0.0)
+                 + bias_score + clickbait_hits)
+        return np.minimum(score, 10)
+
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+
+def get_pipeline(cfg) -> AnalysisPipeline:
+    """Process-wide pipeline, so caches and the outlier reference survive between calls."""
+    global _pipeline
+    with _pipeline_lock:
+        if _pipeline is None:
+            _pipeline = AnalysisPipeline(cfg)
+        return _pipeline
@@ -0,0 +1,669 @@
+import bisect, json, os, threading
+from collections import OrderedDict
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None
+
+
+def timestamp(article: Dict) -> float:
+    """Epoch seconds of an article: ``published_ts`` as set at ingest, else parsed."""
+    ts = article.get('published_ts')
+    return ts if ts is not None else _parse_time(article)
+
+
+def _parse_time(article: Dict) -> float:
+    # providers send different ISO variants; naive times count as UTC and an
+    # article without a usable published_at/fetched_at sorts first
+    for key in ('published_at', 'fetched_at'):
+        value = article.get(key)
+        if not value:
+            continue
+        try:
+            parsed = datetime.fromisoformat(str(value).strip().replace('Z', '+00:00'))
+        except ValueError:
+            continue
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return parsed.timestamp()
+    return 0.0
+
+
+class _Segment:
+    """One day of the store: ``<directory>/<YYYY-MM-DD>.jsonl`` plus its summary."""
+
+    def __init__(self, directory: str, day: str):
+        self.day = day
+        self.path = os.path.join(directory, f'{day}.jsonl')
+        self.summary_path = os.path.join(directory, f'{day}.summary.json')
+        self.hot = False
+        self.records: Optional[List[Dict]] = None  # hot, or cached while cold
+        self.inode = None
+        self.offset = 0
+        self.first_id = None
+        self.last_id = None
+        self.count = 0
+        self.urls: Dict[str, int] = {}  # url -> latest id in this segment
+        self.patch_lines = 0
+
+    def note(self, rec):
+        if self.first_id is None:
+            self.first_id = rec['id']
+        self.last_id = rec['id']
+        self.count += 1
+        self.urls[rec.get('url')] = rec['id']
+
+    def summary(self) -> Dict:
+        return {'first_id': self.first_id, 'last_id': self.last_id, 'count': self.count,
+                'urls': self.urls}
+
+
+class ArticleStore:
+    """Append-only article store split into daily JSONL segments.
+
+    ``path`` names the store (``data/articles.jsonl``); its articles live in
+    ``data/articles/<YYYY-MM-DD>.jsonl``, one segment per day they were stored,
+    so ids grow from segment to segment. Every article line carries an integer
+    ``id``. Changes to stored articles (``evolution_index``, ``topic_cluster``
+    ...) are appended to the article's segment as patch lines ``{"_patch": id,
+    "fields": {...}}`` and folded in on load, so inserts and updates cost
+    O(new lines); a segment is rewritten atomically when its patch backlog
+    gets large.
+
+    The newest ``hot_days`` days are kept in memory and back ``all()``, the API
+    and clustering. Older segments are cold: only their summary (id range and
+    URLs, cached in ``<day>.summary.json``) stays in memory and their records
+    are read on demand (``get``, ``since``, ``history``) into a cache of the
+    last ``cold_cache`` segments used. Nothing is ever dropped. Writers in
+    other processes are picked up on the next call through the file offsets,
+    and a lock file serialises appends.
+    """
+
+    def __init__(self, path: str, legacy_path: Optional[str] = None, hot_days: int = 2,
+                 cold_cache: int = 4):
+        self.path = path
+        self.directory = os.path.splitext(path)[0]
+        self.hot_days = max(hot_days, 1)
+        self.cold_cache = cold_cache
+        self._lock = threading.RLock()
+        self._segments: List[_Segment] = []  # oldest day first; the hot ones are a suffix
+        self._by_day: Dict[str, _Segment] = {}
+        self._records: List[Dict] = []  # hot records, oldest first
+        self._by_id: Dict[int, Dict] = {}
+        self._latest_by_url: Dict[str, Dict] = {}
+        self._cold_urls: Dict[str, int] = {}
+        self._cold_loaded: 'OrderedDict[str, _Segment]' = OrderedDict()
+        self._next_id = 0
+        self._dir_mtime = None
+        self._lock_depth = 0
+        self._listeners = []  # (listener, replay)
+        self._quiet = False
+        self.version = 0
+
+        os.makedirs(self.directory, exist_ok=True)
+        with self._locked():
+            if not self._list_days():
+                if not os.path.exists(path) and legacy_path and os.path.exists(legacy_path):
+                    self._import_legacy(legacy_path)
+                if os.path.isfile(path):
+                    self._split_single_file()
+            self._catch_up()
+
+    # -------------- public --------------
+    def add(self, articles: List[Dict], snapshots: bool = False) -> List[Dict]:
+        """Append articles and return the ones actually stored.
+
+        Stored articles get their ``id`` and ``published_ts`` (``published_at``
+        as epoch seconds, see ``timestamp``). By default an article whose URL
+        is already stored is skipped. With ``snapshots=True`` a URL gets a new
+        snapshot whenever its title, description or published_at differ from
+        the latest stored one.
+        """
+        with self._locked():
+            self._catch_up()
+            fresh, pending = [], {}
+            for art in articles:
+                url = art.get('url')
+                if not url:
+                    continue
+                prev = pending.get(url) or self.latest(url)
+                if prev is not None and not (snapshots and self._changed(prev, art)):
+                    continue
+                art['id'] = self._next_id
+                self._next_id += 1
+                art['published_ts'] = _parse_time(art)
+                pending[url] = art
+                fresh.append(art)
+            if fresh:
+                seg = self._segment_for_append()
+                self._append(seg, [json.dumps(a) for a in fresh])
+                for art in fresh:
+                    self._index(seg, art)
+                self._emit('add', fresh)
+            return fresh
+
+    def update(self, changes: Dict[int, Dict]):
+        """Apply ``{id: {field: value}}`` changes, skipping fields that are already equal."""
+        with self._locked():
+            self._catch_up()
+            lines: Dict[str, List[str]] = {}
+            updated = []
+            for art_id, fields in changes.items():
+                rec = self.get(art_id)
+                if rec is None:
+                    continue
+                diff = {k: v for k, v in fields.items() if rec.get(k) != v}
+                if diff:
+                    updated.append((rec, {k: rec.get(k) for k in diff}))
+                    rec.update(diff)
+                    lines.setdefault(self._segment_of(art_id).day, []).append(
+                        json.dumps({'_patch': art_id, 'fields': diff}))
+                    self.version += 1
+            for day, seg_lines in lines.items():
+                seg = self._by_day[day]
+                self._append(seg, seg_lines)
+                seg.patch_lines += len(seg_lines)
+            if updated:
+                self._emit('update', updated)
+            for day in lines:
+                seg = self._by_day[day]
+                if seg.patch_lines > max(seg.count, 1000):
+                    self._compact_segment(seg)
+            return len(updated)
+
+    def all(self) -> List[Dict]:
+        """The hot window, oldest first; ``history`` also reads the cold segments."""
+        with self._lock:
+            self._catch_up()
+            return list(self._records)
+
+    def history(self, start_day: Optional[str] = None) -> Iterator[Dict]:
+        """Every record stored on ``start_day`` (YYYY-MM-DD) or later, oldest first.
+
+        Cold segments are read one at a time, so memory stays bounded by the
+        segment cache however long the history is.
+        """
+        with self._lock:
+            self._catch_up()
+            days = [s.day for s in self._segments if start_day is None or s.day >= start_day]
+        for day in days:
+            with self._lock:
+                seg = self._by_day.get(day)
+                records = list(self._records_of(seg)) if seg is not None else []
+            yield from records
+
+    def refresh(self) -> int:
+        """Fold in writes from other processes and return the current version."""
+        with self._lock:
+            self._catch_up()
+            return self.version
+
+    def atomically(self, fn):
+        """Catch up and call ``fn()`` with no event reaching the listeners meanwhile.
+
+        Listeners run under the store lock, so state read by ``fn`` from two of
+        them (e.g. counts and a feed position) reflects the same events.
+        """
+        with self._lock:
+            self._catch_up()
+            return fn()
+
+    def since(self, after_id: int) -> List[Dict]:
+        """Articles with an id greater than ``after_id``, oldest first, cold ones included."""
+        with self._lock:
+            self._catch_up()
+            out = []
+            for seg in self._segments:
+                if seg.hot:
+                    break
+                if seg.last_id is not None and seg.last_id > after_id:
+                    records = self._records_of(seg)
+                    out.extend(records[bisect.bisect_right(records, after_id, key=lambda r: r['id']):])
+            start = bisect.bisect_right(self._records, after_id, key=lambda r: r['id'])
+            return out + self._records[start:]
+
+    def get(self, art_id: int) -> Optional[Dict]:
+        with self._lock:
+            rec = self._by_id.get(art_id)
+            if rec is not None:
+                return rec
+            seg = self._segment_of(art_id)
+            if seg is None or seg.hot:
+                return None
+            records = self._records_of(seg)
+            i = bisect.bisect_left(records, art_id, key=lambda r: r['id'])
+            return records[i] if i < len(records) and records[i]['id'] == art_id else None
+
+    def get_many(self, ids: List[int]) -> List[Optional[Dict]]:
+        """``get`` for each id, in the given order; each cold segment is read at most once."""
+        with self._lock:
+            found = {i: self.get(i) for i in sorted(set(ids))}  # by id: one segment after another
+        return [found[i] for i in ids]
+
+    def latest(self, url: str) -> Optional[Dict]:
+        with self._lock:
+            rec = self._latest_by_url.get(url)
+            if rec is None and url in self._cold_urls:
+                rec = self.get(self._cold_urls[url])
+            return rec
+
+    def subscribe(self, listener, replay: bool = True):
+        """Call ``listener(event, payload)`` on every change.
+
+        Events: ``('reset', None)`` (start over), ``('add', [records])`` and
+        ``('update', [(record, old_fields)])``. With ``replay`` the listener
+        first gets a ``reset`` followed by the whole history as ``add``
+        batches, one per segment, and the same again whenever the store has to
+        reload; without it only a ``reset`` is sent on reload. Listeners run
+        under the store lock and must be quick.
+        """
+        with self._lock:
+            self._catch_up()
+            self._listeners.append((listener, replay))
+            if replay:
+                self._replay(listener)
+
+    def log_since(self, position=None):
+        """Raw segment lines appended since ``position``, for incremental copies.
+
+        ``position`` is the ``end`` of an earlier call, ``{day: [inode,
+        offset]}``. Returns ``(end, parts)`` with one ``(day, full, lines)``
+        part per segment that changed: ``full`` is True for a segment that is
+        new to ``position`` or was rewritten since (compaction), in which case
+        ``lines`` covers the whole segment. ``lines`` is a generator of parsed
+        line objects (articles and ``_patch`` lines) that reads the file lazily.
+        """
+        position = position if isinstance(position, dict) else {}
+        end, parts = {}, []
+        with self._locked():
+            self._catch_up()
+            for seg in self._segments:
+                try:
+                    f = open(seg.path, 'rb')  # this inode stays readable even if compacted later
+                except FileNotFoundError:
+                    continue
+                st = os.fstat(f.fileno())
+                end[seg.day] = [st.st_ino, st.st_size]
+                prev = position.get(seg.day)
+                full = prev is None or prev[0] != st.st_ino or prev[1] > st.st_size
+                if not full and prev[1] == st.st_size:
+                    f.close()
+                    continue
+                parts.append((seg.day, full, self._read_lines(f, 0 if full else prev[1], st.st_size)))
+        return end, parts
+
+    def __len__(self):
+        with self._lock:
+            return sum(s.count for s in self._segments if not s.hot) + len(self._records)
+
+    def compact(self):
+        """Rewrite the segments that carry patch lines with the patches folded in."""
+        with self._locked():
+            self._catch_up()
+            for seg in list(self._segments):
+                if seg.patch_lines:
+                    self._compact_segment(seg)
+
+    # -------------- private --------------
+    @staticmethod
+    def _changed(prev, art):
+        return (art.get('title') != prev.get('title') or
+                art.get('description') != prev.get('description') or
+                art.get('published_at') != prev.get('published_at'))
+
+    @staticmethod
+    def _read_lines(f, start, end):
+        with f:
+            f.seek(start)
+            pos = start
+            for raw in f:
+                pos += len(raw)
+                if pos > end:
+                    break
+                if raw.strip():
+                    try:
+                        yield json.loads(raw)
+                    except ValueError:
+                        continue
+
+    def _today(self) -> str:
+        return datetime.now().strftime('%Y-%m-%d')
+
+    def _list_days(self) -> List[str]:
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted(n[:-len('.jsonl')] for n in names if n.endswith('.jsonl'))
+
+    def _segment_of(self, art_id) -> Optional[_Segment]:
+        known = [s for s in self._segments if s.first_id is not None]
+        i = bisect.bisect_right(known, art_id, key=lambda s: s.first_id) - 1
+        return known[i] if i >= 0 else None
+
+    def _segment_for_append(self) -> _Segment:
+        day = self._today()
+        if self._segments and self._segments[-1].day >= day:
+            return self._segments[-1]  # clock went back: days must not go backwards with ids
+        seg = _Segment(self.directory, day)
+        self._segments.append(seg)
+        self._by_day[day] = seg
+        self._rebalance()
+        return seg
+
+    def _index(self, seg, rec):
+        seg.records.append(rec)
+        seg.note(rec)
+        self._records.append(rec)
+        self._by_id[rec['id']] = rec
+        self._latest_by_url[rec.get('url')] = rec
+        self._cold_urls.pop(rec.get('url'), None)
+        self._next_id = max(self._next_id, rec['id'] + 1)
+        self.version += 1
+
+    def _catch_up(self):
+        """Fold in segments and lines written (or compactions done) by another process."""
+        try:
+            mtime = os.stat(self.directory).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime != self._dir_mtime:
+            self._dir_mtime = mtime
+            new = [d for d in self._list_days() if d not in self._by_day]
+            for day in new:
+                self._by_day[day] = _Segment(self.directory, day)
+            if new:
+                self._segments = [self._by_day[d] for d in sorted(self._by_day)]
+                self._rebalance()
+        for seg in self._segments:
+            if seg.hot and self._tail(seg):
+                return self._reload()
+
+    def _rebalance(self):
+        """Load segments that entered the hot window and cool the ones that left it."""
+        newest = date.fromisoformat(self._segments[-1].day)
+        first_hot = (newest - timedelta(days=self.hot_days - 1)).isoformat()
+        for seg in self._segments:
+            hot = seg.day >= first_hot
+            if hot and not seg.hot:
+                seg.hot, seg.records = True, []  # filled by _tail
+                seg.inode, seg.offset = None, 0
+                self._cold_loaded.pop(seg.day, None)
+            elif not hot and seg.hot:
+                self._freeze(seg)
+            elif not hot and seg.first_id is None and seg.records is None:
+                self._load_summary(seg)
+
+    def _freeze(self, seg):
+        seg.hot = False
+        for rec in seg.records:
+            self._by_id.pop(rec['id'], None)
+            if self._latest_by_url.get(rec.get('url')) is rec:
+                del self._latest_by_url[rec.get('url')]
+        if seg.last_id is not None:
+            self._records = [r for r in self._records if r['id'] > seg.last_id]
+        self._write_summary(seg)
+        seg.records = None
+        self._note_cold_urls(seg)
+
+    def _note_cold_urls(self, seg):
+        for url, art_id in seg.urls.items():
+            if url not in self._latest_by_url and art_id > self._cold_urls.get(url, -1):
+                self._cold_urls[url] = art_id
+        if seg.last_id is not None:
+            self._next_id = max(self._next_id, seg.last_id + 1)
+
+    def _load_summary(self, seg):
+        try:
+            with open(seg.summary_path) as f:
+                saved = json.load(f)
+            seg.first_id, seg.last_id = saved['first_id'], saved['last_id']
+            seg.count, seg.urls = saved['count'], saved['urls']
+        except (OSError, ValueError, KeyError):
+            self._load_cold(seg)  # reading the segment fills in the summary
+            self._write_summary(seg)
+        self._note_cold_urls(seg)
+
+    def _write_summary(self, seg):
+        tmp = f"{seg.summary_path}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(seg.summary(), f)
+        os.replace(tmp, seg.summary_path)
+
+    def _records_of(self, seg) -> List[Dict]:
+        if seg.hot:
+            return seg.records
+        if seg.records is not None and not self._cold_stale(seg):
+            self._cold_loaded.move_to_end(seg.day)
+            return seg.records
+        return self._load_cold(seg)
+
+    @staticmethod
+    def _cold_stale(seg) -> bool:
+        try:
+            st = os.stat(seg.path)
+        except FileNotFoundError:
+            return False
+        return st.st_ino != seg.inode or st.st_size != seg.offset
+
+    def _load_cold(self, seg) -> List[Dict]:
+        records, by_id = [], {}
+        seg.first_id = seg.last_id = None
+        seg.count, seg.urls, seg.patch_lines = 0, {}, 0
+        try:
+            with open(seg.path, 'rb') as f:
+                st = os.fstat(f.fileno())
+                data = f.read()
+        except FileNotFoundError:
+            st, data = None, b''
+        end = data.rfind(b'\n') + 1
+        for line in data[:end].splitlines():
+            try:
+                obj = json.loads(line)
+            except ValueError:
+                continue
+            if '_patch' in obj:
+                rec = by_id.get(obj['_patch'])
+                if rec is not None:
+                    rec.update(obj.get('fields', {}))
+                seg.patch_lines += 1
+            elif obj.get('id') not in by_id:
+                by_id[obj['id']] = obj
+                records.append(obj)
+                seg.note(obj)
+        seg.inode, seg.offset = (st.st_ino, end) if st is not None else (None, 0)
+        seg.records = records
+        self._cold_loaded[seg.day] = seg
+        self._cold_loaded.move_to_end(seg.day)
+        while len(self._cold_loaded) > self.cold_cache:
+            _, old = self._cold_loaded.popitem(last=False)
+            old.records = None
+        return records
+
+    def _tail(self, seg) -> bool:
+        """Apply new lines of a hot segment; True if the file was replaced meanwhile."""
+        try:
+            st = os.stat(seg.path)
+        except FileNotFoundError:
+            return False
+        if seg.inode is not None and st.st_ino != seg.inode:
+            return True
+        seg.inode = st.st_ino
+        if st.st_size <= seg.offset:
+            return False
+        with open(seg.path, 'rb') as f:
+            f.seek(seg.offset)
+            chunk = f.read()
+        end = chunk.rfind(b'\n') + 1
+        for line in chunk[:end].splitlines():
+            if line.strip():
+                self._apply_line(seg, line)
+        seg.offset += end
+        return False
+
+    def _apply_line(self, seg, line):
+        try:
+            obj = json.loads(line)
+        except ValueError:
+            return  # torn tail from a crashed writer
+        if '_patch' in obj:
+            rec = self._by_id.get(obj['_patch'])
+            if rec is not None:
+                fields = obj.get('fields', {})
+                old = {k: rec.get(k) for k in fields}
+                rec.update(fields)
+                self.version += 1
+                self._emit('update', [(rec, old)])
+            seg.patch_lines += 1
+        elif obj.get('id') not in self._by_id:
+            self._index(seg, obj)
+            self._emit('add', [obj])
+
+    def _reload(self):
+        """Start over from the files, e.g. after another process compacted a hot segment."""
+        self._segments, self._by_day = [], {}
+        self._records, self._by_id, self._latest_by_url = [], {}, {}
+        self._cold_urls, self._cold_loaded = {}, OrderedDict()
+        self._dir_mtime = None
+        self._quiet = True
+        try:
+            self._catch_up()
+        finally:
+            self._quiet = False
+        self.version += 1
+        for listener, replay in self._listeners:
+            if replay:
+                self._replay(listener)
+            else:
+                listener('reset', None)
+
+    def _replay(self, listener):
+        listener('reset', None)
+        for seg in list(self._segments):
+            records = list(self._records_of(seg))
+            if records:
+                listener('add', records)
+
+    def _compact_segment(self, seg):
+        records = self._records_of(seg)
+        tmp = f"{seg.path}.tmp"
+        with open(tmp, 'w') as f:
+            for rec in records:
+                f.write(json.dumps(rec) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, seg.path)
+        st = os.stat(seg.path)
+        seg.inode, seg.offset = st.st_ino, st.st_size
+        seg.patch_lines = 0
+
+    def _emit(self, event, payload):
+        if self._quiet:
+            return
+        for listener, _ in self._listeners:
+            try:
+                listener(event, payload)
+            except Exception as e:
+                print(f"Store listener failed on {event}: {e}")
+
+    def _append(self, seg, lines):
+        data = ('\n'.join(lines) + '\n').encode()
+        fd = os.open(seg.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, data)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        st = os.stat(seg.path)
+        seg.inode, seg.offset = st.st_ino, st.st_size
+
+    def _split_single_file(self):
+        """Move a single-file store (the pre-segment layout at ``path``) into daily segments."""
+        records, by_id = [], {}
+        with open(self.path, 'rb') as f:
+            for line in f:
+                try:
+                    obj = json.loads(line)
+                except ValueError:
+                    continue
+                if '_patch' in obj:
+                    if obj['_patch'] in by_id:
+                        by_id[obj['_patch']].update(obj.get('fields', {}))
+                elif obj.get('id') not in by_id:
+                    by_id[obj['id']] = obj
+                    records.append(obj)
+        records.sort(key=lambda r: r['id'])
+        days: Dict[str, List[str]] = OrderedDict()
+        day = None
+        for rec in records:
+            # a day never goes backwards with the ids, so segments keep disjoint id ranges
+            stamp = (rec.get('fetched_at') or '')[:10] or self._today()
+            day = max(day, stamp) if day else stamp
+            days.setdefault(day, []).append(json.dumps(rec) + '\n')
+        for day, lines in days.items():
+            with open(os.path.join(self.directory, f'{day}.jsonl'), 'w') as f:
+                f.write(''.join(lines))
+        os.replace(self.path, f"{self.path}.migrated")
+        print(f"Split {len(records)} articles from {self.path} into {len(days)} daily segments")
+
+    def _import_legacy(self, legacy_path):
+        try:
+            with open(legacy_path) as f:
+                legacy = json.load(f)
+        except (OSError, ValueError):
+            return
+        lines = []
+        for i, art in enumerate(legacy):
+            art['id'] = i
+            lines.append(json.dumps(art))
+        tmp = f"{self.path}.tmp"
+        with open(tmp, 'w') as f:
+            f.write(''.join(l + '\n' for l in lines))
+        os.replace(tmp, self.path)
+        print(f"Migrated {len(lines)} articles from {legacy_path}")
+
+    def _locked(self):
+        return _FileLock(self)
+
+
+class _FileLock:
+    """Thread lock plus an advisory lock file so other processes append in turn."""
+
+    def __init__(self, store):
+        self.store = store
+        self.fd = None
+
+    def __enter__(self):
+        self.store._lock.acquire()
+        self.store._lock_depth += 1
+        if fcntl is not None and self.store._lock_depth == 1:
+            self.fd = os.open(self.store.path + '.lock', os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(self.fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if self.fd is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+            os.close(self.fd)
+        self.store._lock_depth -= 1
+        self.store._lock.release()
+
+
+_stores: Dict[str, ArticleStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(cfg=None) -> ArticleStore:
+    """Process-wide store for ``cfg.DATA_FILE`` so the scheduler and Flask share one index."""
+    if cfg is None:
+        from configuration import Config
+        cfg = Config()
+    path = os.path.abspath(cfg.DATA_FILE)
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = ArticleStore(path, legacy_path=cfg.LEGACY_DATA_FILE,
+                                         hot_days=cfg.HOT_DAYS, cold_cache=cfg.COLD_CACHE_SEGMENTS)
+        return _stores[path]
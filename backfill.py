@@ -0,0 +1,236 @@
+"""Run a historical dump through the analysis pipeline into the store.
+
+    python main.py backfill export.jsonl[.gz] [--workers 4] [--chunk-size 1000] [--timeline title]
+    python backfill.py export.jsonl ...    # the same
+
+The input is read as a stream of JSON lines (stored articles or raw provider
+items), in chunks that are analyzed on a process pool and written to the store
+in input order. Progress is checkpointed after every stored chunk, so running
+the same command again resumes after the last one.
+"""
+import argparse, gzip, json, os, time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from near_duplicates import canonical_url
+
+_pipeline = None
+
+
+def _init_worker(settings):
+    # each worker builds its own pipeline, with a sentiment cache in memory only (it is not
+    # written back to Config.SENTIMENT_CACHE_FILE). Workers take chunks in no fixed order, so a rolling outlier window would compare a chunk
+    # with whatever that worker saw last: each chunk is only compared with itself
+    global _pipeline
+    from configuration import Config
+    from analysis_pipeline import AnalysisPipeline
+    cfg = Config()
+    for k, v in settings.items():
+        setattr(cfg, k, v)
+    cfg.SENTIMENT_CACHE_FILE, cfg.SENTIMENT_WORKERS, cfg.OUTLIER_REFERENCE_WINDOW = None, 0, 0
+    _pipeline = AnalysisPipeline(cfg)
+
+
+def _analyze_chunk(articles):
+    # module level so it can be pickled into worker processes
+    if not articles:
+        return []
+    return [a['analysis'] for a in _pipeline.analyze(articles)]
+
+
+def _normalize(raw: Dict) -> Optional[Dict]:
+    """A stored article, or a raw provider item mapped like ``NewsCollector._transform``."""
+    url = raw.get('url') or raw.get('link')
+    if not url:
+        return None
+    source = raw.get('source')
+    art = dict(raw)
+    art.pop('id', None)  # the store assigns its own ids
+    art.update({
+        'source': source.get('name') if isinstance(source, dict) else source or raw.get('source_id'),
+        'title': raw.get('title') or '',
+        'description': raw.get('description') or '',
+        'url': canonical_url(url),
+        'published_at': raw.get('published_at') or raw.get('publishedAt') or raw.get('pubDate'),
+        'fetched_at': raw.get('fetched_at') or datetime.now().isoformat(),
+    })
+    for key in ('publishedAt', 'pubDate', 'link', 'source_id'):
+        art.pop(key, None)
+    return art
+
+
+class Backfill:
+    """Streams a JSONL dump through analysis into the store, resumably.
+
+    Memory is bounded by ``workers * 2`` chunks in flight: the reader only
+    submits a new chunk when one of those has been stored. The checkpoint
+    (``<input>.checkpoint.json`` by default) records the byte offset after the
+    last stored chunk. Articles whose URL the fingerprint index already knows
+    (stored before, or earlier in the input) are dropped before analysis, so a
+    chunk that was stored but not yet checkpointed when the run stopped is
+    skipped on the next run.
+    """
+
+    def __init__(self, cfg, path: str, store=None, workers: int = 0, chunk_size: int = 1000,
+                 checkpoint: Optional[str] = None, snapshots: bool = False):
+        from article_store import get_store
+        from fingerprint_index import FingerprintIndex
+        self.cfg = cfg
+        self.path = path
+        self.store = store if store is not None else get_store(cfg)
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.checkpoint = checkpoint or f"{path}.checkpoint.json"
+        self.snapshots = snapshots
+        # kept current so the next collection cycle skips the backfilled URLs
+        self.fingerprints = FingerprintIndex(cfg.FINGERPRINT_FILE, self.store)
+        self.read = self.processed = self.stored = self.invalid = self.skipped = 0
+
+    # -------------- public --------------
+    def run(self, timeline: Optional[str] = None) -> Dict:
+        """Backfill from the checkpoint to the end of the input; returns the run's totals."""
+        state = self._load_checkpoint()
+        offset = state.get('offset', 0)
+        if offset:
+            print(f"Resuming {self.path} at byte {offset} ({state.get('stored', 0)} stored before)")
+        size = os.path.getsize(self.path)
+        start = time.monotonic()
+        chunks = self._fresh(self._chunks(offset))
+
+        if self.workers > 1:
+            settings = {k: getattr(self.cfg, k) for k in dir(self.cfg) if k.isupper()}
+            with ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                     initargs=(settings,)) as pool:
+                pending = deque()
+                for chunk in chunks:
+                    pending.append((chunk, pool.submit(_analyze_chunk, chunk[0])))
+                    if len(pending) >= 2 * self.workers:  # back-pressure on the reader
+                        self._store(*self._done(pending.popleft()), state, size, start)
+                while pending:
+                    self._store(*self._done(pending.popleft()), state, size, start)
+        else:
+            _init_worker({k: getattr(self.cfg, k) for k in dir(self.cfg) if k.isupper()})
+            for articles, end in chunks:
+                self._store(articles, _analyze_chunk(articles), end, state, size, start)
+
+        elapsed = time.monotonic() - start
+        self.fingerprints.save()
+        if timeline:
+            self._timeline(timeline)
+        from story_index import get_story_index
+        get_story_index(self.store).save()
+        print(f"Backfill done: {self.read} read, {self.stored} stored, {self.skipped} known, "
+              f"{self.invalid} invalid in {elapsed:.1f}s ({self.read / max(elapsed, 1e-9):.0f} articles/s)")
+        return {'read': self.read, 'stored': self.stored, 'invalid': self.invalid,
+                'skipped': self.skipped, 'seconds': elapsed, 'offset': state.get('offset', 0)}
+
+    # -------------- private --------------
+    @staticmethod
+    def _done(item):
+        (articles, end), future = item
+        return articles, future.result(), end
+
+    def _open(self):
+        return gzip.open(self.path, 'rb') if self.path.endswith('.gz') else open(self.path, 'rb')
+
+    def _chunks(self, offset: int) -> Iterator[Tuple[List[Dict], int]]:
+        """``(articles, byte offset after them)`` per chunk, read lazily from ``offset``."""
+        with self._open() as f:
+            f.seek(offset)
+            pos, chunk = offset, []
+            for line in f:
+                if not line.strip():
+                    pos += len(line)
+                    continue
+                try:
+                    art = _normalize(json.loads(line))
+                except (ValueError, AttributeError):
+                    if not line.endswith(b'\n'):
+                        break  # a dump still being written: leave the torn line for the next run
+                    art = None
+                # a last line without newline that parses is complete (many exports end that way)
+                pos += len(line)
+                self.read += 1
+                if art is None:
+                    self.invalid += 1
+                else:
+                    chunk.append(art)
+                if len(chunk) >= self.chunk_size:
+                    yield chunk, pos
+                    chunk = []
+            if chunk:
+                yield chunk, pos
+
+    def _fresh(self, chunks):
+        """Drop the articles the fingerprint index knows from each chunk, before analysis."""
+        for articles, end in chunks:
+            fresh, skipped = self.fingerprints.split(articles, snapshots=self.snapshots)
+            # remembered now, so a later chunk read while this one is analyzed drops its URLs too
+            self.fingerprints.remember(fresh)
+            self.skipped += len(skipped)
+            yield fresh, end
+
+    def _store(self, articles, analyses, end, state, size, start):
+        for art, analysis in zip(articles, analyses):
+            art['analysis'] = analysis
+        added = self.store.add(articles, snapshots=self.snapshots) if articles else []
+        self.stored += len(added)
+        self.processed += len(articles)
+        state.update({'offset': end, 'stored': state.get('stored', 0) + len(added),
+                      'updated_at': datetime.now().isoformat()})
+        self._save_checkpoint(state)
+        elapsed = time.monotonic() - start
+        # offsets count uncompressed bytes, so the percentage is only exact for plain files
+        done = f" {min(end / size, 1):.0%}" if size and not self.path.endswith('.gz') else ''
+        print(f"Backfill{done}: {self.processed} analyzed, {self.stored} stored, "
+              f"{self.processed / max(elapsed, 1e-9):.0f} articles/s")
+
+    def _timeline(self, timeline):
+        from evolution_tracker import EvolutionTracker
+        tracker = EvolutionTracker(self.store)
+        t0 = time.monotonic()
+        if timeline == 'title':
+            tracker.build_timeline_by_title_similarity()
+        else:
+            tracker.build_timeline()
+        print(f"Timeline ({timeline}) updated in {time.monotonic() - t0:.1f}s")
+
+    def _load_checkpoint(self) -> Dict:
+        try:
+            with open(self.checkpoint) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return {'input': os.path.abspath(self.path)}
+        if state.get('input') != os.path.abspath(self.path):
+            raise ValueError(f"{self.checkpoint} belongs to {state.get('input')}")
+        return state
+
+    def _save_checkpoint(self, state):
+        tmp = f"{self.checkpoint}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp, self.checkpoint)
+
+
+def main(argv: Optional[List[str]] = None):
+    from configuration import Config
+    cfg = Config()
+    ap = argparse.ArgumentParser(prog='backfill', description="Analyze and store a JSONL article dump")
+    ap.add_argument('input', help='JSON lines, optionally gzip-compressed (.gz)')
+    ap.add_argument('--workers', type=int, default=cfg.BACKFILL_WORKERS,
+                    help='analysis processes (default: one per CPU)')
+    ap.add_argument('--chunk-size', type=int, default=cfg.BACKFILL_CHUNK_SIZE)
+    ap.add_argument('--checkpoint', help='default: <input>.checkpoint.json')
+    ap.add_argument('--snapshots', action='store_true',
+                    help='store a new snapshot when a known URL has different content')
+    ap.add_argument('--timeline', choices=('url', 'title'),
+                    help='refresh evolution indexes afterwards')
+    args = ap.parse_args(argv)
+    Backfill(cfg, args.input, workers=args.workers, chunk_size=args.chunk_size,
+             checkpoint=args.checkpoint, snapshots=args.snapshots).run(args.timeline)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,247 @@
+"""Incremental, compressed backups of the article store.
+
+    python backup.py                       # back up what changed since the last run
+    python backup.py restore <target.jsonl> [--until 2024-05-01T12:00]   # writes <target>/<day>.jsonl
+"""
+import argparse, json, math, os, threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+try:
+    import pyarrow  # optional: enables Parquet segments
+except ImportError:
+    pyarrow = None
+
+
+def _flatten(obj, prefix=''):
+    for key, value in obj.items():
+        if isinstance(value, dict) and value:
+            yield from _flatten(value, f"{prefix}{key}.")
+        else:
+            yield f"{prefix}{key}", value
+
+
+def _set(obj, column, value):
+    *parents, leaf = column.split('.')
+    for p in parents:
+        obj = obj.setdefault(p, {})
+    obj[leaf] = value
+
+
+def _column_type(values):
+    kinds = {type(v) for v in values if v is not None}
+    if kinds <= {bool}:
+        return 'bool'
+    if kinds <= {int}:
+        return 'int'
+    if kinds <= {int, float}:
+        return 'float'
+    if kinds <= {str}:
+        return 'str'
+    return 'json'
+
+
+def _encode(value, kind):
+    if value is None:
+        return None
+    return json.dumps(value) if kind == 'json' else value
+
+
+def _decode(value, kind):
+    if kind == 'bool':
+        return value in (True, 'True', 'true', '1')
+    if kind == 'int':
+        return int(value)
+    if kind == 'float':
+        return float(value)
+    if kind == 'json':
+        return json.loads(value)
+    return str(value)
+
+
+class IncrementalBackup:
+    """Copies only what the store appended since the last backup.
+
+    Each run reads the lines appended to every daily store segment since the
+    offsets recorded in ``manifest.json`` and writes them in chunks of
+    ``chunk_size``: articles as flattened columns
+    (``analysis.sentiment.polarity`` ...) and patch lines as ``(id, fields)``
+    rows, in Parquet when pyarrow is installed and gzip-compressed CSV
+    otherwise. A store segment that is new or was compacted since is copied in
+    full. ``restore`` replays, per day, the latest full copy and the chunks
+    after it, optionally only those taken up to a time.
+    """
+
+    def __init__(self, store, directory: str = 'data/backups', chunk_size: int = 5000):
+        self.store = store
+        self.directory = directory
+        self.chunk_size = chunk_size
+        self.manifest_path = os.path.join(directory, 'manifest.json')
+        self._lock = threading.Lock()
+
+    # -------------- public --------------
+    def run(self) -> Dict:
+        """Back up the changes since the last run; returns the manifest entry of this run."""
+        with self._lock:
+            manifest = self._load_manifest()
+            end, parts = self.store.log_since(manifest.get('position'))
+            created_at = datetime.now().isoformat()
+            run_id = len(manifest['runs'])
+            entry = {'run': run_id, 'created_at': created_at, 'position': end,
+                     'parts': {day: full for day, full, _ in parts}, 'segments': [],
+                     'articles': 0, 'patches': 0}
+            for day, _, lines in parts:
+                articles, patches = [], []
+                for obj in lines:
+                    if '_patch' in obj:
+                        patches.append(obj)
+                    else:
+                        articles.append(obj)
+                    if len(articles) >= self.chunk_size:
+                        self._write(entry, day, 'articles', articles)
+                        articles = []
+                    if len(patches) >= self.chunk_size:
+                        self._write(entry, day, 'patches', patches)
+                        patches = []
+                # articles before patches: a patch only refers to articles written earlier
+                self._write(entry, day, 'articles', articles)
+                self._write(entry, day, 'patches', patches)
+            if entry['parts']:
+                manifest['runs'].append(entry)
+            manifest['position'] = end
+            self._save_manifest(manifest)
+            bases = sum(entry['parts'].values())
+            print(f"Backup: {entry['articles']} articles, {entry['patches']} patches"
+                  f"{f' ({bases} full segments)' if bases else ''}")
+            return entry
+
+    def restore(self, target: str, until: Optional[str] = None) -> int:
+        """Rebuild a store at ``target`` from the backups taken up to ``until`` (ISO time).
+
+        The daily segments are written next to ``target`` the way ``ArticleStore``
+        lays them out (``data/restored.jsonl`` -> ``data/restored/<day>.jsonl``).
+        Returns the number of lines written.
+        """
+        runs = [r for r in self._load_manifest()['runs']
+                if 'parts' in r and (until is None or r['created_at'] <= until)]
+        by_day: Dict[str, List[Dict]] = {}
+        for r in runs:
+            for day, full in r['parts'].items():
+                if full:
+                    by_day[day] = []  # a full copy replaces what came before
+            # patches are written in their own segments, so order article segments first per run
+            for seg in sorted(r['segments'], key=lambda s: s['kind'] != 'articles'):
+                if seg['day'] in by_day:
+                    by_day[seg['day']].append(seg)
+        if not by_day:
+            raise ValueError("no full backup at or before that time")
+        directory = os.path.splitext(target)[0]
+        os.makedirs(directory, exist_ok=True)
+        n = 0
+        for day, segments in sorted(by_day.items()):
+            path = os.path.join(directory, f'{day}.jsonl')
+            tmp = f"{path}.tmp"
+            with open(tmp, 'w') as f:
+                for seg in segments:
+                    for obj in self._read(seg):
+                        f.write(json.dumps(obj) + '\n')
+                        n += 1
+            os.replace(tmp, path)
+        return n
+
+    # -------------- segments --------------
+    def _write(self, entry, day, kind, rows):
+        import pandas as pd
+        if not rows:
+            return
+        if kind == 'articles':
+            flat = [dict(_flatten(r)) for r in rows]
+            for row in flat:
+                # keep explicit nulls and empty strings apart from absent fields, which all
+                # read back as empty CSV cells
+                nulls = [c for c, v in row.items() if v is None]
+                if nulls:
+                    row['_nulls'] = json.dumps(nulls)
+                empty = [c for c, v in row.items() if v == '']
+                if empty:
+                    row['_empty'] = json.dumps(empty)
+        else:
+            flat = [{'id': r['_patch'], 'fields': r.get('fields', {})} for r in rows]
+        columns = list(dict.fromkeys(c for row in flat for c in row))
+        types = {c: _column_type([row.get(c) for row in flat]) for c in columns}
+        frame = pd.DataFrame({c: pd.Series([_encode(row.get(c), types[c]) for row in flat], dtype=object)
+                              for c in columns})
+        ext = 'parquet' if pyarrow is not None else 'csv.gz'
+        name = f"{entry['run']:06d}-{len(entry['segments']):03d}-{day}-{kind}.{ext}"
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, name)
+        if pyarrow is not None:
+            frame.to_parquet(path, compression='zstd', index=False)
+        else:
+            frame.to_csv(path, index=False, compression='gzip')
+        entry['segments'].append({'file': name, 'day': day, 'kind': kind, 'rows': len(rows),
+                                  'types': types})
+        entry[kind] += len(rows)
+
+    def _read(self, seg):
+        import pandas as pd
+        path = os.path.join(self.directory, seg['file'])
+        if seg['file'].endswith('.parquet'):
+            frame = pd.read_parquet(path)
+        else:
+            # everything as text, typed back from the manifest
+            frame = pd.read_csv(path, compression='gzip', dtype=str,
+                                keep_default_na=False, na_values=[''])
+        types = seg['types']
+        for row in frame.to_dict('records'):
+            obj = {}
+            nulls, empty = row.pop('_nulls', None), row.pop('_empty', None)
+            for col, value in row.items():
+                if value is None or (isinstance(value, float) and math.isnan(value)):
+                    continue
+                _set(obj, col, _decode(value, types[col]))
+            if isinstance(nulls, str):
+                for col in json.loads(nulls):
+                    _set(obj, col, None)
+            if isinstance(empty, str):
+                for col in json.loads(empty):
+                    _set(obj, col, '')
+            if seg['kind'] == 'patches':
+                obj = {'_patch': obj['id'], 'fields': obj.get('fields', {})}
+            yield obj
+
+    # -------------- manifest --------------
+    def _load_manifest(self) -> Dict:
+        try:
+            with open(self.manifest_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'position': None, 'runs': []}
+
+    def _save_manifest(self, manifest):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = f"{self.manifest_path}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(manifest, f, indent=1)
+        os.replace(tmp, self.manifest_path)
+
+
+def main(argv: Optional[List[str]] = None):
+    from configuration import Config
+    from article_store import get_store
+    ap = argparse.ArgumentParser(description="Incremental article backups")
+    sub = ap.add_subparsers(dest='command')
+    rp = sub.add_parser('restore', help='rebuild a store from the backups')
+    rp.add_argument('target')
+    rp.add_argument('--until', help='ISO time; ignore backups taken later')
+    args = ap.parse_args(argv)
+    cfg = Config()
+    backup = IncrementalBackup(get_store(cfg), cfg.BACKUP_DIR, cfg.BACKUP_CHUNK_SIZE)
+    if args.command == 'restore':
+        print(f"Restored {backup.restore(args.target, args.until)} lines to {args.target}")
+    else:
+        backup.run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""Online StoryClusterer vs the batch TF-IDF + DBSCAN path.
+
+    python -m benchmarks.bench_clustering [--sizes 1000 10000 100000] [--batch-max 20000]
+
+For each corpus size: batch fit time, online build time from scratch, the
+time to add the newest 1% incrementally, and adjusted Rand agreement of the
+online labels with DBSCAN and with the generator's ground-truth stories.
+DBSCAN is brute-force O(n^2) on cosine distance, so it is skipped above --batch-max.
+"""
+import argparse, os, sys, time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sklearn.cluster import DBSCAN
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics import adjusted_rand_score
+
+from story_clusterer import StoryClusterer
+from benchmarks.synthetic import make_articles
+
+
+def run(sizes, batch_max, eps):
+    print(f"{'n':>7} {'batch(s)':>9} {'online(s)':>10} {'add 1%(ms)':>11} "
+          f"{'ARI vs batch':>13} {'ARI vs truth':>13} {'clusters':>9}")
+    for n in sizes:
+        arts = make_articles(n)
+        titles = [a['title'] for a in arts]
+        truth = [a['story'] for a in arts]
+
+        batch_labels, batch_t = None, float('nan')
+        if n <= batch_max:
+            t0 = time.perf_counter()
+            X = TfidfVectorizer(stop_words='english').fit_transform(titles)
+            batch_labels = DBSCAN(eps=eps, min_samples=1, metric='cosine').fit_predict(X)
+            batch_t = time.perf_counter() - t0
+
+        split = n - max(n // 100, 1)
+        clusterer = StoryClusterer(threshold=1 - eps)
+        t0 = time.perf_counter()
+        labels = clusterer.assign(titles[:split])
+        online_t = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        labels += clusterer.assign(titles[split:])
+        add_t = time.perf_counter() - t0
+        online_t += add_t
+
+        vs_batch = adjusted_rand_score(batch_labels, labels) if batch_labels is not None else float('nan')
+        print(f"{n:>7} {batch_t:>9.2f} {online_t:>10.2f} {add_t * 1000:>11.1f} "
+              f"{vs_batch:>13.3f} {adjusted_rand_score(truth, labels):>13.3f} {clusterer.next_id:>9}")
+
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    ap.add_argument('--batch-max', type=int, default=20000)
+    ap.add_argument('--eps', type=float, default=0.6)
+    args = ap.parse_args()
+    run(args.sizes, args.batch_max, args.eps)
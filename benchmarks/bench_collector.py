@@ -0,0 +1,58 @@
+"""Cycle wall-time of NewsCollector against provider latency, using the local fake providers.
+
+    python -m benchmarks.bench_collector [--latencies 0 0.1 0.25 0.5] [--pages 3]
+
+"sequential" calls the three fetchers one after another (the old behaviour),
+"concurrent" is collect_latest_news() from empty cursors, "incremental" is the
+next cycle with the cursors left by the previous one (nothing new published).
+"""
+import argparse, os, sys, time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from configuration import Config
+from news_collector import NewsCollector
+from benchmarks.fake_provider import FakeProviderServer
+
+
+def run(latencies, pages, per_page, repeat):
+    print(f"{'latency(s)':>10} {'sequential(s)':>14} {'concurrent(s)':>14} "
+          f"{'incremental(s)':>15} {'articles':>9} {'requests/cycle':>15}")
+    for latency in latencies:
+        with FakeProviderServer(latency=latency, pages=pages, per_page=per_page) as server:
+            cfg = server.configure(Config())
+            cfg.PROVIDER_CURSOR_FILE = None
+            collector = NewsCollector(cfg)
+
+            seq = []
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                deadline = time.monotonic() + 60
+                for ep in collector.endpoints:
+                    ep(deadline=deadline, emit=lambda page: None, cursor={})
+                seq.append(time.perf_counter() - t0)
+
+            conc, incr, n = [], [], 0
+            for _ in range(repeat):
+                collector.cursors.clear()
+                t0 = time.perf_counter()
+                n = len(collector.collect_latest_news())
+                conc.append(time.perf_counter() - t0)
+                collector.collect_latest_news()  # settle the boundary items at the cursor
+                before = sum(server.hits.values())
+                t0 = time.perf_counter()
+                collector.collect_latest_news()
+                incr.append(time.perf_counter() - t0)
+                requests_per_cycle = sum(server.hits.values()) - before
+            collector.close()
+        print(f"{latency:>10.3f} {min(seq):>14.3f} {min(conc):>14.3f} {min(incr):>15.3f} "
+              f"{n:>9} {requests_per_cycle:>15}")
+
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--latencies', type=float, nargs='+', default=[0.0, 0.1, 0.25, 0.5])
+    ap.add_argument('--pages', type=int, default=3, help='newsdata pages per cycle')
+    ap.add_argument('--per-page', type=int, default=20)
+    ap.add_argument('--repeat', type=int, default=3)
+    args = ap.parse_args()
+    run(args.latencies, args.pages, args.per_page, args.repeat)
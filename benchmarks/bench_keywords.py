@@ -0,0 +1,52 @@
+"""Keyword scoring: the old per-keyword substring loops vs the compiled KeywordMatcher.
+
+    python -m benchmarks.bench_keywords [--n 20000]
+
+"old" is detect_bias's loop over BIAS_KEYWORDS plus the clickbait loop over the
+lowercased title that the monitor's manipulation score used to run; "new" is one
+keyword_hits_batch call that returns both.
+"""
+import argparse, os, sys, time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from configuration import Config
+from bias_detector import BiasDetector
+from benchmarks.synthetic import make_articles
+
+
+def old_scores(cfg, articles):
+    out = []
+    for article in articles:
+        text = f"{article['title']} {article['description']}"
+        score = 0.0
+        for k, words in cfg.BIAS_KEYWORDS.items():
+            hits = sum(w in text for w in words)
+            score += hits * (1.5 if k in ('inflammatory', 'clickbait') else 1)
+        title_lower = article['title'].lower()
+        clickbait = sum(1 for w in cfg.CLICKBAIT_WORDS if w in title_lower)
+        out.append((min(score, 10), clickbait))
+    return out
+
+
+def run(n):
+    cfg = Config()
+    arts = make_articles(n)
+    detector = BiasDetector(cfg)
+
+    t0 = time.perf_counter()
+    old_scores(cfg, arts)
+    old_t = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    detector.keyword_hits_batch(arts)
+    new_t = time.perf_counter() - t0
+
+    print(f"{'articles':>9} {'old(ms)':>9} {'new(ms)':>9} {'old art/s':>11} {'new art/s':>11}")
+    print(f"{n:>9} {old_t * 1e3:>9.1f} {new_t * 1e3:>9.1f} {n / old_t:>11,.0f} {n / new_t:>11,.0f}")
+
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--n', type=int, default=20000)
+    args = ap.parse_args()
+    run(args.n)
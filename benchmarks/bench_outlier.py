@@ -0,0 +1,53 @@
+"""Dense cosine_similarity outlier scores vs OutlierScorer: time and peak memory.
+
+    python -m benchmarks.bench_outlier [--sizes 1000 5000 10000 100000] [--dense-max 10000]
+
+The dense path allocates an n x n float64 matrix (8 * n^2 bytes), so it is
+skipped above --dense-max.
+"""
+import argparse, os, sys, time, tracemalloc
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from outlier_scorer import OutlierScorer
+from benchmarks.synthetic import make_articles
+
+
+def dense(titles):
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.metrics.pairwise import cosine_similarity
+    return 1 - cosine_similarity(TfidfVectorizer().fit_transform(titles)).mean(axis=1)
+
+
+def measure(fn, titles):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    out = fn(titles)
+    elapsed = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return out, elapsed, peak / 2 ** 20
+
+
+def run(sizes, dense_max):
+    warm = ['warm up imports', 'before timing']
+    dense(warm), OutlierScorer().score(warm)
+    print(f"{'n':>7} {'dense(s)':>9} {'dense(MiB)':>11} {'sparse(s)':>10} {'sparse(MiB)':>12} {'max |diff|':>11}")
+    for n in sizes:
+        titles = [a['title'] for a in make_articles(n)]
+        sparse_out, s_t, s_mem = measure(OutlierScorer().score, titles)
+        if n <= dense_max:
+            dense_out, d_t, d_mem = measure(dense, titles)
+            diff = float(np.max(np.abs(dense_out - sparse_out)))
+            print(f"{n:>7} {d_t:>9.3f} {d_mem:>11.1f} {s_t:>10.3f} {s_mem:>12.1f} {diff:>11.2e}")
+        else:
+            print(f"{n:>7} {'-':>9} {'-':>11} {s_t:>10.3f} {s_mem:>12.1f} {'-':>11}")
+
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--sizes', type=int, nargs='+', default=[1000, 5000, 10000, 100000])
+    ap.add_argument('--dense-max', type=int, default=10000)
+    args = ap.parse_args()
+    run(args.sizes, args.dense_max)
@@ -0,0 +1,52 @@
+"""SentimentAnalyzer throughput in articles/sec: per-article loop vs analyze_batch, cold and warm cache.
+
+    python -m benchmarks.bench_sentiment [--n 5000] [--workers 4]
+"""
+import argparse, os, sys, time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from textblob import TextBlob
+
+from sentiment_analyzer import SentimentAnalyzer
+from benchmarks.synthetic import make_articles
+
+
+def old_analyze(text):
+    blob = TextBlob(text)
+    return {'polarity': blob.sentiment.polarity, 'subjectivity': blob.sentiment.subjectivity}
+
+
+def rate(n, fn):
+    t0 = time.perf_counter()
+    fn()
+    return n / (time.perf_counter() - t0)
+
+
+def run(n, workers):
+    texts = [f"{a['title']} {a['description']}" for a in make_articles(n)]
+    old_analyze('warm up the pattern lexicon')
+    rows = [('old loop (2x .sentiment)', rate(n, lambda: [old_analyze(t) for t in texts]))]
+
+    cold = SentimentAnalyzer()
+    rows.append(('analyze_batch cold', rate(n, lambda: cold.analyze_batch(texts, workers=0))))
+    rows.append(('analyze_batch warm', rate(n, lambda: cold.analyze_batch(texts, workers=0))))
+    if workers > 1:
+        # the pool is started once and reused, so time its start apart from a batch
+        pooled = SentimentAnalyzer(pool_min_batch=0)
+        t0 = time.perf_counter()
+        pooled.analyze_batch([f"start the pool {i}" for i in range(4 * workers)], workers=workers)
+        print(f"pool start ({workers} procs): {time.perf_counter() - t0:.2f}s")
+        rows.append((f'analyze_batch cold, {workers} procs',
+                     rate(n, lambda: pooled.analyze_batch(texts, workers=workers))))
+        pooled.close()
+
+    for name, r in rows:
+        print(f"{name:<32} {r:>12,.0f} articles/s")
+
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--n', type=int, default=5000)
+    ap.add_argument('--workers', type=int, default=4)
+    args = ap.parse_args()
+    run(args.n, args.workers)
@@ -0,0 +1,60 @@
+"""Incremental vs full evolution_index assignment (EvolutionTracker.build_timeline).
+
+    python -m benchmarks.bench_timeline [--sizes 1000 10000 100000] [--batch 50]
+
+For each corpus size the store is filled with snapshots of n // 10 stories
+and numbered once; then --batch new snapshots arrive (a tenth of them
+published earlier than their story's latest one) and are numbered
+incrementally, and the whole corpus is renumbered for comparison. The
+incremental per-call cost should stay flat as the corpus grows.
+"""
+import argparse, os, sys, tempfile, time
+from datetime import datetime, timedelta
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from article_store import ArticleStore
+from evolution_tracker import EvolutionTracker
+from benchmarks.synthetic import make_articles
+
+
+def snapshots(n, seed, start):
+    arts = make_articles(n, seed=seed, start=start)
+    for a in arts:
+        a['url'] = f"https://example.com/{a['story']}"  # one URL per story: every article a snapshot
+    return arts
+
+
+def run(sizes, batch):
+    print(f"{'n':>7} {'first build(s)':>15} {'incremental(ms)':>16} {'full(s)':>8} {'renumbered':>11}")
+    for n in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            store = ArticleStore(os.path.join(tmp, 'articles.jsonl'))
+            store.add(snapshots(n, 0, datetime(2024, 1, 1)), snapshots=True)
+            tracker = EvolutionTracker(store)
+            t0 = time.perf_counter()
+            tracker.build_timeline()
+            first_t = time.perf_counter() - t0
+            store.compact()  # fold in the first numbering so no compaction lands in the timed call
+
+            late = snapshots(batch, 1, datetime(2024, 1, 1) + timedelta(minutes=n))
+            for a in late[::10]:
+                a['published_at'] = '2023-12-31T00:00:00Z'  # arrives out of order
+            before = store.version
+            store.add(late, snapshots=True)
+            t0 = time.perf_counter()
+            tracker.build_timeline()
+            inc_t = time.perf_counter() - t0
+            renumbered = store.version - before - batch
+
+            t0 = time.perf_counter()
+            tracker.build_timeline(incremental=False)
+            full_t = time.perf_counter() - t0
+            print(f"{n:>7} {first_t:>15.2f} {inc_t * 1000:>16.1f} {full_t:>8.2f} {renumbered:>11}")
+
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    ap.add_argument('--batch', type=int, default=50)
+    args = ap.parse_args()
+    run(args.sizes, args.batch)
@@ -0,0 +1,201 @@
+"""Local stand-in for the three news APIs, used by benchmarks and tests.
+
+Each provider answers on its own path (``/newsapi``, ``/newsdata``, ``/thenewsapi``)
+with payloads shaped like the real services, after an optional artificial delay.
+"""
+import hashlib, json, threading, time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+PROVIDERS = ('newsapi', 'newsdata', 'thenewsapi')
+
+
+class _QuietServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # clients that gave up (timeouts in tests) close the socket mid-response
+        pass
+
+
+_EPOCH = datetime(2024, 1, 1)
+
+
+def fake_article(provider, n):
+    """Article number ``n`` of a provider's feed, with that provider's field names.
+
+    Higher numbers are newer.
+    """
+    published = _EPOCH + timedelta(minutes=n)
+    source = f'{provider}-source-{n % 5}'
+    title = f'{provider} headline {n} on affirmative action'
+    description = f'Story {n} served by the fake {provider}.'
+    url = f'https://example.com/{provider}/{n}'
+    if provider == 'newsdata':
+        return {'article_id': f'{n:032x}', 'title': title, 'link': url, 'description': description,
+                'pubDate': published.strftime('%Y-%m-%d %H:%M:%S'), 'source_id': source}
+    if provider == 'thenewsapi':
+        return {'uuid': f'{n:032x}', 'title': title, 'description': description, 'url': url,
+                'source': source, 'published_at': published.strftime('%Y-%m-%dT%H:%M:%S.000000Z')}
+    return {'source': {'id': None, 'name': source}, 'title': title, 'description': description,
+            'url': url, 'publishedAt': published.strftime('%Y-%m-%dT%H:%M:%SZ')}
+
+
+def published(article):
+    """``YYYY-MM-DDTHH:MM:SS`` of a fake article, whichever provider served it."""
+    stamp = article.get('publishedAt') or article.get('pubDate') or article.get('published_at')
+    return stamp.replace(' ', 'T')[:19]
+
+
+class FakeProviderServer:
+    """Serves ``pages * per_page`` articles per provider, newest first.
+
+    ``per_page`` is the server-side page size cap. Filters follow the real
+    APIs: newsapi ``from``/``to`` plus ``page``, newsdata ``page`` tokens,
+    thenewsapi ``published_after``/``published_before`` plus ``page``. Head
+    responses carry an ``ETag`` (newsapi, newsdata) or ``Last-Modified``
+    (thenewsapi) and answer conditional requests with 304. ``publish`` adds
+    newer articles to a feed; ``inject`` queues error responses (429, 5xx)
+    that are served before the next normal ones.
+    """
+
+    def __init__(self, latency=0.0, pages=1, per_page=10, host='127.0.0.1', port=0):
+        # latency: seconds, either one float for every provider or a {provider: seconds} dict
+        self.latency = latency
+        self.pages = pages
+        self.per_page = per_page
+        self.hits = {p: 0 for p in PROVIDERS}
+        self.feeds = {p: [fake_article(p, n) for n in reversed(range(pages * per_page))]
+                      for p in PROVIDERS}
+        self.faults = {p: deque() for p in PROVIDERS}
+        self._lock = threading.Lock()
+        self.httpd = _QuietServer((host, port), self._handler())
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def urls(self):
+        return {p: f'{self.base_url}/{p}' for p in PROVIDERS}
+
+    def configure(self, cfg):
+        """Point a Config at this server and return it."""
+        urls = self.urls()
+        cfg.NEWSAPI_URL = urls['newsapi']
+        cfg.NEWSDATA_URL = urls['newsdata']
+        cfg.THENEWSAPI_URL = urls['thenewsapi']
+        return cfg
+
+    def publish(self, n, providers=PROVIDERS):
+        """Add ``n`` newer articles to the head of each provider's feed."""
+        with self._lock:
+            for p in providers:
+                top = len(self.feeds[p])
+                self.feeds[p][:0] = [fake_article(p, k) for k in reversed(range(top, top + n))]
+
+    def inject(self, provider, *statuses, retry_after=None):
+        """Answer the next requests to ``provider`` with these statuses, in order."""
+        headers = {'Retry-After': str(retry_after)} if retry_after is not None else {}
+        with self._lock:
+            self.faults[provider].extend((status, headers) for status in statuses)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # -------------- responses --------------
+    def delay_for(self, provider):
+        if isinstance(self.latency, dict):
+            return self.latency.get(provider, 0.0)
+        return self.latency
+
+    def respond(self, provider, query, headers=None):
+        """Return (status, headers, body) for one request."""
+        time.sleep(self.delay_for(provider))
+        headers = headers or {}
+        q = {k: v[0] for k, v in query.items()}
+        with self._lock:
+            feed = list(self.feeds[provider])
+            fault = self.faults[provider].popleft() if self.faults[provider] else None
+        if fault is not None:
+            status, fault_headers = fault
+            return status, fault_headers, {'status': 'error', 'message': f'injected {status}'}
+        if provider == 'newsdata':
+            offset = int(q.get('page') or 0)
+            arts = feed[offset:offset + self.per_page]
+            more = offset + self.per_page < len(feed)
+            body = {'status': 'success', 'results': arts,
+                    'nextPage': str(offset + self.per_page) if more else None}
+        else:
+            lo, hi = (('from', 'to') if provider == 'newsapi'
+                      else ('published_after', 'published_before'))
+            size = min(int(q.get('pageSize') or q.get('limit') or 100), self.per_page)
+            page = int(q.get('page') or 1)
+            match = [a for a in feed
+                     if (not q.get(lo) or published(a) >= q[lo][:19])
+                     and (not q.get(hi) or published(a) <= q[hi][:19])]
+            arts = match[(page - 1) * size:page * size]
+            if provider == 'newsapi':
+                body = {'status': 'ok', 'totalResults': len(match), 'articles': arts}
+            else:
+                body = {'meta': {'found': len(match), 'returned': len(arts), 'limit': size,
+                                 'page': page}, 'data': arts}
+
+        tag = '"%s"' % hashlib.sha1(json.dumps(body, sort_keys=True).encode()).hexdigest()[:16]
+        newest = published(feed[0]) if feed else '2024-01-01T00:00:00'
+        modified = format_datetime(datetime.strptime(newest, '%Y-%m-%dT%H:%M:%S')
+                                   .replace(tzinfo=timezone.utc), usegmt=True)
+        if provider == 'thenewsapi':
+            if headers.get('If-Modified-Since') == modified:
+                return 304, {'Last-Modified': modified}, None
+            return 200, {'Last-Modified': modified}, body
+        if headers.get('If-None-Match') == tag:
+            return 304, {'ETag': tag}, None
+        return 200, {'ETag': tag}, body
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                provider = parsed.path.strip('/')
+                if provider not in PROVIDERS:
+                    self.send_error(404)
+                    return
+                with server._lock:
+                    server.hits[provider] += 1
+                status, headers, body = server.respond(provider, parse_qs(parsed.query),
+                                                       dict(self.headers))
+                payload = json.dumps(body).encode() if body is not None else b''
+                self.send_response(status)
+                if body is not None:
+                    self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                for k, v in headers.items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
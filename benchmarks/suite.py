@@ -0,0 +1,266 @@
+"""Benchmark suite over the hot paths of the monitor and the API, with a regression check.
+
+    python -m benchmarks.suite [--sizes 100 1000 10000 100000] [--only sentiment store_add]
+                               [--repeat 3] [--output results.json]
+                               [--baseline benchmarks/baseline.json] [--tolerance 0.25]
+
+Every case is timed at every corpus size up to its own limit (the slow paths
+stop earlier, see ``CASES``), on synthetic articles or the local fake
+providers. Each measurement runs in a fresh child process, so caches and
+process-wide singletons never carry over between runs; the best of
+``--repeat`` is kept. ``--output`` writes the results as JSON. Timings only
+compare on the same machine, so no baseline ships with the repository: record
+one first with ``--output benchmarks/baseline.json``, and later runs are
+compared against it (without one, nothing is compared). A case is a regression when it is more than
+``--tolerance`` slower than the baseline (and by more than ``--min-delta``
+seconds, which keeps timer noise at small sizes out); the exit status is 1 if
+any case regressed.
+"""
+import argparse, contextlib, json, multiprocessing, os, platform, sys, tempfile, time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import make_articles
+
+CASES = {}  # name -> (function(n) -> (seconds, items), largest size, what is timed)
+
+
+def case(name, max_n, what):
+    def register(fn):
+        CASES[name] = (fn, max_n, what)
+        return fn
+    return register
+
+
+def _config():
+    from configuration import Config
+    cfg = Config()
+    cfg.SENTIMENT_CACHE_FILE = cfg.KEYWORDS_FILE = cfg.TOPICS_FILE = cfg.PROVIDER_CURSOR_FILE = None
+    return cfg
+
+
+def _serve(cfg, n):
+    """A fake provider server holding about ``n`` articles over the three providers."""
+    from benchmarks.fake_provider import FakeProviderServer
+    per_page = min(cfg.MAX_ARTICLES_PER_REQUEST, max(n // 3, 1))
+    pages = max(n // (3 * per_page), 1)
+    server = FakeProviderServer(pages=pages, per_page=per_page)
+    server.configure(cfg)
+    cfg.MAX_ARTICLES_PER_REQUEST = per_page
+    cfg.PROVIDER_PAGE_BUDGET = pages + 1
+    cfg.PROVIDER_TIMEOUTS = {p: 300 for p in ('newsapi', 'newsdata', 'thenewsapi')}
+    cfg.PROVIDER_RATE_LIMITS = {}  # measure the client, not the providers' quotas
+    return server
+
+
+def _timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return time.perf_counter() - t0, out
+
+
+@case('collect', 10000, 'NewsCollector.collect_latest_news from empty cursors (fake providers)')
+def bench_collect(n):
+    from news_collector import NewsCollector
+    cfg = _config()
+    with _serve(cfg, n):
+        collector = NewsCollector(cfg)
+        seconds, articles = _timed(collector.collect_latest_news)
+        collector.close()
+    return seconds, len(articles)
+
+
+@case('sentiment', 10000, 'SentimentAnalyzer.analyze per article, cold cache')
+def bench_sentiment(n):
+    from sentiment_analyzer import SentimentAnalyzer
+    texts = [f"{a['title']} {a['description']}" for a in make_articles(n)]
+    analyzer = SentimentAnalyzer()
+    return _timed(lambda: [analyzer.analyze(t) for t in texts])[0], n
+
+
+@case('bias', 100000, 'BiasDetector.detect_bias per article')
+def bench_bias(n):
+    from bias_detector import BiasDetector
+    articles = make_articles(n)
+    detector = BiasDetector(_config())
+    return _timed(lambda: [detector.detect_bias(a) for a in articles])[0], n
+
+
+@case('outlier', 100000, 'title outlier scores of one batch (OutlierScorer.score)')
+def bench_outlier(n):
+    from outlier_scorer import OutlierScorer
+    titles = [a['title'] for a in make_articles(n)]
+    return _timed(lambda: OutlierScorer().score(titles))[0], n
+
+
+@case('store_add', 100000, 'ArticleStore.add of one batch into an empty store')
+def bench_store_add(n):
+    from article_store import ArticleStore
+    articles = make_articles(n)
+    store = ArticleStore(os.path.join(os.getcwd(), 'articles.jsonl'))
+    seconds, added = _timed(lambda: store.add(articles))
+    return seconds, len(added)
+
+
+def _stored(n, snapshots=False):
+    from article_store import ArticleStore
+    articles = make_articles(n)
+    if snapshots:
+        for a in articles:
+            a['url'] = f"https://example.com/{a['story']}"  # one URL per story
+    store = ArticleStore(os.path.join(os.getcwd(), 'articles.jsonl'))
+    store.add(articles, snapshots=snapshots)
+    return store
+
+
+@case('timeline_url', 100000, 'EvolutionTracker.build_timeline, first numbering of every snapshot')
+def bench_timeline_url(n):
+    from evolution_tracker import EvolutionTracker
+    tracker = EvolutionTracker(_stored(n, snapshots=True))
+    return _timed(tracker.build_timeline)[0], n
+
+
+@case('timeline_title', 100000, 'EvolutionTracker.build_timeline_by_title_similarity, first clustering')
+def bench_timeline_title(n):
+    from evolution_tracker import EvolutionTracker
+    tracker = EvolutionTracker(_stored(n))
+    return _timed(tracker.build_timeline_by_title_similarity)[0], n
+
+
+@case('api_stories', 100000, 'GET /api/stories (full hot window, uncached) via the Flask test client')
+def bench_api_stories(n):
+    from article_store import get_store
+    from web.app import create_app
+    get_store(_config()).add(make_articles(n))
+    client = create_app(_config()).test_client()
+    seconds, resp = _timed(lambda: client.get('/api/stories'))
+    return seconds, len(resp.json)
+
+
+@case('api_parse', 10000, 'POST /api/parse until its job is done (fake providers, URL timeline)')
+def bench_api_parse(n):
+    from configuration import Config
+    from web.app import create_app
+    # the endpoint builds its own Config(); this child process is thrown away afterwards
+    for key, value in vars(_config()).items():
+        setattr(Config, key, value)
+    with _serve(Config, n):
+        client = create_app(Config()).test_client()
+
+        def parse():
+            job = client.post('/api/parse').json
+            while job['status'] in ('queued', 'running'):
+                time.sleep(0.005)
+                job = client.get(f"/api/jobs/{job['id']}").json
+            if job['status'] != 'done':
+                raise RuntimeError(f"parse failed: {job.get('error')}")
+            return job['result']
+
+        seconds, result = _timed(parse)
+    return seconds, result['added']
+
+
+def _warm_up():
+    # import and load the heavy libraries once; forked children inherit them, so first-use
+    # costs (sklearn imports, the TextBlob lexicon) stay out of the timings
+    from sklearn.cluster import DBSCAN  # noqa: F401
+    from sklearn.feature_extraction.text import HashingVectorizer, TfidfVectorizer  # noqa: F401
+    from textblob import TextBlob
+    TextBlob('warm up the pattern lexicon').sentiment
+    import web.app  # noqa: F401
+
+
+def _measure(name, n):
+    # runs in a child process: own working directory, fresh singletons
+    with tempfile.TemporaryDirectory() as tmp, open(os.devnull, 'w') as quiet, \
+            contextlib.redirect_stdout(quiet):
+        os.chdir(tmp)
+        return CASES[name][0](n)
+
+
+def run(names, sizes, repeat=3, quiet=False):
+    """Time ``names`` at ``sizes``; returns ``{"<case>/<n>": {seconds, items, per_second}}``."""
+    ctx = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods()
+                                      else None)
+    _warm_up()
+    results = {}
+    for name in names:
+        for n in sizes:
+            if n > CASES[name][1]:
+                continue
+            runs = []
+            for _ in range(repeat):
+                with ProcessPoolExecutor(1, mp_context=ctx) as pool:
+                    runs.append(pool.submit(_measure, name, n).result())
+            seconds, items = min(runs)
+            results[f'{name}/{n}'] = {'seconds': seconds, 'items': items,
+                                      'per_second': items / seconds if seconds else None}
+            if not quiet:
+                print(f"{name + '/' + str(n):<22} {seconds:>10.4f}s {items:>8} items "
+                      f"{items / max(seconds, 1e-9):>12,.0f}/s")
+    return results
+
+
+def compare(results, baseline, tolerance=0.25, min_delta=0.005):
+    """Cases present in both that got slower than ``tolerance`` (and ``min_delta`` seconds)."""
+    regressions = []
+    for key, res in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        ratio = res['seconds'] / base['seconds'] if base['seconds'] else float('inf')
+        if ratio > 1 + tolerance and res['seconds'] - base['seconds'] > min_delta:
+            regressions.append({'case': key, 'seconds': res['seconds'],
+                                'baseline': base['seconds'], 'ratio': ratio})
+    return regressions
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000, 100000])
+    ap.add_argument('--only', nargs='+', choices=sorted(CASES), default=list(CASES))
+    ap.add_argument('--repeat', type=int, default=3)
+    ap.add_argument('--output', help='write the results as JSON')
+    ap.add_argument('--baseline', default=os.path.join(os.path.dirname(__file__), 'baseline.json'),
+                    help='results file to compare with, if it exists')
+    ap.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown (0.25 = 25%%)')
+    ap.add_argument('--min-delta', type=float, default=0.005, help='seconds; smaller slowdowns are noise')
+    ap.add_argument('--list', action='store_true', help='describe the cases and exit')
+    args = ap.parse_args(argv)
+    if args.list:
+        for name, (_, max_n, what) in CASES.items():
+            print(f"{name:<15} up to {max_n:>6}  {what}")
+        return 0
+
+    results = run(args.only, args.sizes, args.repeat)
+    report = {'created_at': datetime.now().isoformat(timespec='seconds'),
+              'python': platform.python_version(), 'machine': platform.platform(),
+              'cpus': os.cpu_count(), 'repeat': args.repeat, 'results': results}
+    if args.output:
+        tmp = f"{args.output}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(report, f, indent=1)
+        os.replace(tmp, args.output)
+        print(f"Results written to {args.output}")
+
+    if args.baseline and os.path.abspath(args.baseline) != os.path.abspath(args.output or ''):
+        if not os.path.exists(args.baseline):
+            print(f"No baseline at {args.baseline}, nothing compared; record one on this machine "
+                  f"with --output {args.baseline}")
+            return 0
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline['results'], args.tolerance, args.min_delta)
+        print(f"Compared with {args.baseline} ({baseline.get('created_at')}, {baseline.get('machine')})")
+        for r in regressions:
+            print(f"REGRESSION {r['case']}: {r['seconds']:.4f}s vs {r['baseline']:.4f}s "
+                  f"({r['ratio']:.2f}x)")
+        if regressions:
+            return 1
+        print("No regressions")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,54 @@
+"""Deterministic synthetic articles for benchmarks and tests."""
+import random
+from datetime import datetime, timedelta
+
+TOPIC_WORDS = ('court', 'ruling', 'college', 'admissions', 'policy', 'senate', 'vote', 'budget',
+               'election', 'campaign', 'climate', 'report', 'economy', 'market', 'inflation',
+               'health', 'vaccine', 'school', 'teachers', 'union', 'strike', 'border', 'housing',
+               'rent', 'tax', 'energy', 'oil', 'prices', 'tech', 'privacy', 'lawsuit', 'merger',
+               'police', 'protest', 'city', 'council', 'governor', 'mayor', 'trade', 'tariffs')
+# broaden the topical vocabulary so unrelated stories rarely share most of their key words
+TOPIC_WORDS = TOPIC_WORDS + tuple(f'{a}{b}' for a in ('north', 'south', 'east', 'west', 'state', 'federal',
+                                             'river', 'lake', 'harbor', 'valley', 'metro', 'county')
+                                   for b in ('port', 'field', 'bank', 'court', 'board', 'agency', 'fund',
+                                             'district', 'hospital', 'airline', 'bridge', 'league',
+                                             'college', 'clinic', 'prison', 'station', 'museum', 'factory'))
+FILLER = ('new', 'latest', 'update', 'live', 'analysis', 'exclusive', 'week', 'today',
+          'officials', 'says', 'after', 'amid', 'plans', 'faces', 'critics', 'supporters')
+SPICE = ('shocking', 'outrageous', 'scandal', 'exposed', 'secret', 'revealed', 'progressive',
+         'conservative', 'devastating', 'unbelievable')
+SOURCES = ('BBC News', 'CNN', 'Fox News', 'Reuters', 'Associated Press', 'Politico',
+           'The Washington Post', 'USA Today')
+
+
+def make_articles(n, n_stories=None, seed=0, start=None):
+    """``n`` articles spread over ``n_stories`` stories (default n // 10).
+
+    Every story has a fixed set of key words; each article is a variant of its
+    story's title with some filler words, so ``story`` is a ground-truth label.
+    """
+    rng = random.Random(seed)
+    n_stories = n_stories or max(n // 10, 1)
+    start = start or datetime(2024, 1, 1)
+    stories = []
+    for s in range(n_stories):
+        words = rng.sample(TOPIC_WORDS, 4) + [f'story{s}']
+        stories.append(words)
+    out = []
+    for i in range(n):
+        s = rng.randrange(n_stories)
+        words = stories[s] + rng.sample(FILLER, 1)
+        if rng.random() < 0.2:
+            words.append(rng.choice(SPICE))
+        rng.shuffle(words)
+        ts = start + timedelta(minutes=i)
+        out.append({
+            'source': rng.choice(SOURCES),
+            'title': ' '.join(words).capitalize(),
+            'description': ' '.join(rng.sample(TOPIC_WORDS + FILLER, 12)),
+            'url': f'https://example.com/{s}/{i}',
+            'published_at': ts.isoformat() + 'Z',
+            'fetched_at': (ts + timedelta(minutes=5)).isoformat(),
+            'story': s,
+        })
+    return out
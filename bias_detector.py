@@ -1,18 +1,165 @@
-from typing import Dict
+import json, os, re, time
+from typing import Dict, List, Tuple
 from configuration import Config
 
+try:
+    import ahocorasick  # optional: pyahocorasick, a C Aho-Corasick automaton
+except ImportError:
+    ahocorasick = None
+
+def _normalize(text):
+    # case-insensitive, and curly quotes in keyword lists and headlines match plain apostrophes
+    return text.lower().replace('’', "'").replace('‘', "'")
+
+
+def _trie_pattern(words):
+    """Regex for ``words`` with common prefixes factored out, e.g. ``s(?:ecret|hocking(?: truth)?)``."""
+    trie = {}
+    for w in words:
+        node = trie
+        for ch in w:
+            node = node.setdefault(ch, {})
+        node[''] = {}
+
+    def build(node):
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:%s)' % '|'.join(branches)
+        # a keyword ends here: the greedy '?' still prefers the longer keyword
+        return '(?:%s)?' % body if '' in node else body
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    """Every keyword category compiled into one regex, matched in a single pass.
+
+    Matching is case-insensitive substring matching, like ``w in text``, and
+    overlapping keywords ("shocking" / "shocking truth") all count. With
+    pyahocorasick installed the keywords go into an Aho-Corasick automaton.
+    Otherwise they are compiled as a trie-shaped regex (shared prefixes
+    factored out, longer continuations tried first): each search reports the
+    longest keyword at the next position that has one, the shorter keywords
+    that are prefixes of it come from a precomputed table, and the next
+    search restarts one character later.
+    """
+
+    def __init__(self, categories: Dict[str, List[str]]):
+        self.categories = {}
+        owners: Dict[str, List[str]] = {}
+        for cat, words in categories.items():
+            norm = sorted({_normalize(w) for w in words if w})
+            self.categories[cat] = norm
+            for w in norm:
+                owners.setdefault(w, []).append(cat)
+        keywords = sorted(owners, key=len, reverse=True)
+        self.owners = owners
+        self.prefixes = {k: [p for p in keywords if k.startswith(p)] for k in keywords}
+        self.pattern = self.automaton = None
+        if keywords and ahocorasick is not None:
+            self.automaton = ahocorasick.Automaton()
+            for k in keywords:
+                self.automaton.add_word(k, k)
+            self.automaton.make_automaton()
+        elif keywords:
+            self.pattern = re.compile(_trie_pattern(keywords))
+
+    def count(self, text: str, title_end: int = None) -> Tuple[Dict[str, int], Dict[str, int]]:
+        """Distinct keywords hit per category in ``text`` and in ``text[:title_end]``."""
+        found, in_title = set(), set()
+        if self.automaton is not None:
+            for end, kw in self.automaton.iter(text):
+                found.add(kw)
+                if title_end is not None and end < title_end:
+                    in_title.add(kw)
+            return self._tally(found), self._tally(in_title)
+        search = self.pattern.search if self.pattern is not None else None
+        m = search(text) if search else None
+        while m is not None:
+            start = m.start()
+            for kw in self.prefixes[m.group()]:
+                found.add(kw)
+                if title_end is not None and start + len(kw) <= title_end:
+                    in_title.add(kw)
+            m = search(text, start + 1)
+        return self._tally(found), self._tally(in_title)
+
+    def _tally(self, words):
+        counts = dict.fromkeys(self.categories, 0)
+        for w in words:
+            for cat in self.owners[w]:
+                counts[cat] += 1
+        return counts
+
+
 class BiasDetector:
     def __init__(self, cfg):
         self.cfg = cfg
-    
+        self._keywords_mtime = None
+        self._checked_at = 0.0
+        self.matcher = KeywordMatcher(self._keyword_lists())
+
     def detect_bias(self, article: Dict):
-        text = f"{article['title']} {article['description']}"
+        return self.bias_score(self.keyword_hits(article)[0])
+
+    def detect_bias_batch(self, articles: List[Dict]) -> List[float]:
+        return [self.bias_score(hits) for hits, _ in self.keyword_hits_batch(articles)]
+
+    def keyword_hits(self, article: Dict):
+        """(hits per category over title + description, hits per category in the title alone)."""
+        return self.keyword_hits_batch([article])[0]
+
+    def keyword_hits_batch(self, articles: List[Dict]):
+        self.maybe_reload()
+        matcher = self.matcher
+        out = []
+        for article in articles:
+            title = _normalize(article.get('title') or '')
+            description = _normalize(article.get('description') or '')
+            out.append(matcher.count(f"{title} {description}", title_end=len(title)))
+        return out
+
+    @staticmethod
+    def bias_score(hits: Dict[str, int]):
         score = 0.0
-        for k, words in self.cfg.BIAS_KEYWORDS.items():
-            hits = sum(w in text for w in words)
+        for k, n in hits.items():
+            if k == 'title_clickbait':
+                continue
             mult = 1.5 if k in ('inflammatory', 'clickbait') else 1
-            score += hits * mult
-        
+            score += n * mult
+
         return min(score, 10)
-    
-    
\ No newline at end of file
+
+    # -------------- keyword lists --------------
+    def reload(self):
+        """Rebuild the matcher from Config and the optional keywords file."""
+        self.matcher = KeywordMatcher(self._keyword_lists())
+
+    def maybe_reload(self):
+        """Pick up edits to ``Config.KEYWORDS_FILE`` without a restart (checked every few seconds)."""
+        path = self.cfg.KEYWORDS_FILE
+        now = time.monotonic()
+        if not path or now - self._checked_at < self.cfg.KEYWORDS_RELOAD_INTERVAL:
+            return
+        self._checked_at = now
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            mtime = None
+        if mtime != self._keywords_mtime:
+            self.reload()
+
+    def _keyword_lists(self):
+        lists = dict(self.cfg.BIAS_KEYWORDS)
+        lists['title_clickbait'] = self.cfg.CLICKBAIT_WORDS
+        path = self.cfg.KEYWORDS_FILE
+        self._keywords_mtime = None
+        if path and os.path.exists(path):
+            try:
+                self._keywords_mtime = os.stat(path).st_mtime
+                with open(path) as f:
+                    lists.update(json.load(f))
+            except (OSError, ValueError) as e:
+                print(f"Ignoring keywords file {path}: {e}")
+        return lists
@@ -0,0 +1,154 @@
+import threading
+from datetime import datetime
+from typing import Dict, Optional
+
+from analysis_pipeline import get_pipeline
+from article_store import get_store
+from fingerprint_index import FingerprintIndex
+from metrics import get_metrics, profiled
+from near_duplicates import NearDuplicateIndex
+from news_collector import NewsCollector
+from story_index import get_story_index
+
+
+class CollectionCycle:
+    """Fetch -> analyze -> store -> (optional) timeline, shared by the scheduler and /api/parse."""
+
+    def __init__(self, cfg, collector=None, pipeline=None, store=None, fingerprints=None,
+                 duplicates=None):
+        self.cfg = cfg
+        self.collector = collector or NewsCollector(cfg)
+        self.pipeline = pipeline or get_pipeline(cfg)
+        self.store = store if store is not None else get_store(cfg)
+        if fingerprints is None:
+            fingerprints = FingerprintIndex(cfg.FINGERPRINT_FILE, self.store)
+        self.fingerprints = fingerprints
+        if duplicates is None:
+            duplicates = NearDuplicateIndex(cfg.NEAR_DUPLICATE_FILE, cfg.NEAR_DUPLICATE_THRESHOLD)
+        self.duplicates = duplicates
+        self.skipped = self.analyzed = self.reused = 0  # totals since start
+
+    def run(self, snapshots: bool = False, timeline: Optional[str] = None,
+            topic: Optional[str] = None, profile: bool = False) -> Dict:
+        """One collection pass for ``topic`` (a registered topic name; default the first one).
+
+        ``snapshots`` stores a new snapshot when a known URL's content changed
+        (otherwise known URLs are skipped); ``timeline`` is ``'url'`` or
+        ``'title'`` to refresh evolution indexes afterwards. Articles whose URL
+        and content hash are already in the fingerprint index skip analysis, and
+        near-duplicates of an analyzed article from another URL (syndicated
+        copies) reuse its analysis.
+
+        Pages are analyzed and stored in batches of ``Config.STREAM_BATCH_SIZE``
+        articles as the collector yields them, so the first articles are
+        visible while later pages are still downloading. Stage timings go to
+        the metrics registry; ``profile`` (or ``Config.PROFILE_CYCLES``) runs
+        the cycle under cProfile and saves the profile to ``Config.PROFILE_DIR``.
+        """
+        resolved = self.collector.topics.get(topic) if topic else self.collector.topics.default()
+        if resolved is None:
+            raise ValueError(f"Unknown topic {topic!r}")
+        directory = self.cfg.PROFILE_DIR if profile or self.cfg.PROFILE_CYCLES else None
+        with profiled(directory, f"cycle-{resolved.name}"), \
+                get_metrics().timer('news_stage_seconds', stage='cycle'):
+            return self._run(resolved, snapshots, timeline)
+
+    def _run(self, resolved, snapshots, timeline):
+        metrics = get_metrics()
+        print(f"Start collection cycle for {resolved.name} at {datetime.now()}")
+        counts = dict.fromkeys(('collected', 'analyzed', 'reused', 'skipped', 'added'), 0)
+        batch = []
+        for page in self.collector.stream_latest_news(resolved):
+            batch.extend(page)
+            if len(batch) >= self.cfg.STREAM_BATCH_SIZE:
+                self._store_batch(batch, resolved.name, snapshots, counts)
+                batch = []
+        if batch:
+            self._store_batch(batch, resolved.name, snapshots, counts)
+
+        if counts['analyzed']:
+            # once per cycle: rewriting the whole cache after every batch adds up
+            with metrics.timer('news_stage_seconds', stage='sentiment_cache_save'):
+                self.pipeline.sentiment_analyzer.save_cache()
+        if counts['analyzed'] or counts['reused']:
+            with metrics.timer('news_stage_seconds', stage='save_indexes'):
+                self.duplicates.save()
+                self.fingerprints.save()
+                get_story_index(self.store).checkpoint(self.cfg.INDEX_CHECKPOINT_LINES)
+        for outcome, n in counts.items():
+            metrics.inc('news_articles_total', n, outcome=outcome)
+        print(f"Collected {counts['collected']} news articles: analyzed {counts['analyzed']}, "
+              f"reused {counts['reused']}, skipped {counts['skipped']} unchanged, saved {counts['added']} new")
+
+        if timeline:
+            from evolution_tracker import EvolutionTracker
+            tracker = EvolutionTracker(self.store)
+            try:
+                with metrics.timer('news_stage_seconds', stage=f'timeline_{timeline}'):
+                    if timeline == 'title':
+                        tracker.build_timeline_by_title_similarity()
+                    else:
+                        tracker.build_timeline()
+            except Exception as e:
+                print(f"Timeline update failed: {e}")
+
+        return dict(counts, topic=resolved.name, total=len(self.store))
+
+    def _store_batch(self, articles, topic, snapshots, counts):
+        """Skip known articles, analyze the rest (copies reuse an analysis) and store them."""
+        counts['collected'] += len(articles)
+        fresh, skipped = self.fingerprints.split(articles, snapshots=snapshots)
+        self.skipped += len(skipped)
+        counts['skipped'] += len(skipped)
+        if not fresh:
+            return
+        self.duplicates.assign(fresh)
+        leaders, copies = self._split_copies(fresh)
+        self.analyzed += len(leaders)
+        self.reused += len(copies)
+        analyzed = self.pipeline.analyze(leaders, topic) if leaders else []
+        by_group = {a['dup_group']: a['analysis'] for a in analyzed if a['dup_group'] is not None}
+        for art, analysis in copies:
+            art['analysis'] = dict(analysis if analysis is not None else by_group[art['dup_group']])
+        with get_metrics().timer('news_stage_seconds', stage='store'):
+            added = self.store.add(analyzed + [art for art, _ in copies], snapshots=snapshots)
+        self.duplicates.remember(added)
+        self.fingerprints.remember(fresh)
+        counts['analyzed'] += len(leaders)
+        counts['reused'] += len(copies)
+        counts['added'] += len(added)
+        print(f"Stored {len(added)} of {len(articles)} articles ({len(leaders)} analyzed, "
+              f"{len(copies)} reused)")
+
+    def _split_copies(self, articles):
+        """Split off near-duplicates whose group already has an analyzed member at another URL.
+
+        Returns ``(leaders, copies)``; a copy is ``(article, analysis)`` where the
+        analysis is None when the group's first member is a leader of this batch.
+        """
+        leaders, copies, batch = [], [], {}
+        for art in articles:
+            gid = art['dup_group']
+            first = self.duplicates.first(gid)
+            stored = self.store.get(first[0]) if first is not None and first[1] != art['url'] else None
+            if stored is not None and stored.get('analysis'):
+                copies.append((art, stored['analysis']))
+            elif gid is not None and gid in batch and batch[gid] != art['url']:
+                copies.append((art, None))
+            else:
+                batch.setdefault(gid, art['url'])
+                leaders.append(art)
+        return leaders, copies
+
+
+_cycle = None
+_cycle_lock = threading.Lock()
+
+
+def get_cycle(cfg) -> CollectionCycle:
+    """Process-wide cycle, so provider sessions and caches are reused between runs."""
+    global _cycle
+    with _cycle_lock:
+        if _cycle is None:
+            _cycle = CollectionCycle(cfg)
+        return _cycle
@@ -15,12 +15,64 @@ class Config:
 
     CATEGORIES = ['politics', 'technology', 'business', 'health', 'science']
 
+    # Narratives to track; a topic is only filtered by the sources/categories it lists
+    # (e.g. the lists above), interval defaults to UPDATE_INTERVAL
+    TOPICS = [
+        {'name': 'affirmative-action', 'queries': ['affirmative action']},
+    ]
+    TOPICS_FILE = 'data/topics.json'  # optional JSON list of extra topics, same shape as TOPICS
+    TOPIC_SPACING = 10  # minimum seconds between two topic fetches
+
+    NEWSAPI_URL = os.getenv('NEWSAPI_URL', 'https://newsapi.org/v2/everything')
+    NEWSDATA_URL = os.getenv('NEWSDATA_URL', 'https://newsdata.io/api/1/latest')
+    THENEWSAPI_URL = os.getenv('THENEWSAPI_URL', 'https://api.thenewsapi.com/v1/news/all')
+
+    # Seconds a provider may take in total (all of its pages) before a cycle stops waiting for it
+    PROVIDER_TIMEOUTS = {'newsapi': 15, 'newsdata': 30, 'thenewsapi': 15}
+    HTTP_CONNECT_TIMEOUT = 3.05
+    HTTP_POOL_SIZE = 10
+    HTTP_MAX_RETRIES = 3  # retries of a 429/5xx/connection error, within the provider timeout
+    HTTP_BACKOFF_BASE = 0.5  # seconds; doubled per attempt, full jitter, capped by HTTP_BACKOFF_MAX
+    HTTP_BACKOFF_MAX = 30
+    PROVIDER_RATE_LIMITS = {'newsapi': 1.0, 'newsdata': 1.0, 'thenewsapi': 1.0}  # requests/second
+    PROVIDER_BURST = 10
+    CIRCUIT_FAILURE_THRESHOLD = 5  # failed requests in a row before a provider is skipped
+    CIRCUIT_COOLDOWN = 300  # seconds a provider is skipped before one trial request
+    # Pages each provider may fetch per cycle; a backlog left over is resumed in later cycles
+    PROVIDER_PAGE_BUDGET = 5
+    PROVIDER_CURSOR_FILE = 'data/provider_cursors.json'  # per-provider latest item, ETag, resume token
+    STREAM_QUEUE_PAGES = 4  # fetched pages waiting for analysis before providers pause
+    STREAM_BATCH_SIZE = 100  # articles analyzed and stored together while later pages download
+
     MANIPULATION_THRESHOLD = 6.5
+    # Recent titles every batch's outlier scores are computed against; about one cycle's worth, so a
+    # micro-batch (even of one article) is compared with the cycle so far. 0 = each batch on its own
+    OUTLIER_REFERENCE_WINDOW = 1500
     UPDATE_INTERVAL = 300
     MAX_ARTICLES_PER_REQUEST = 100
 
-    DATA_FILE = 'data/articles.json' 
+    DATA_FILE = 'data/articles.jsonl'
+    LEGACY_DATA_FILE = 'data/articles.json'  # imported into DATA_FILE once if present
+    HOT_DAYS = 2  # days of daily store segments kept in memory; older ones are read on demand
+    COLD_CACHE_SEGMENTS = 4  # cold segments kept loaded after a historical query
+    FINGERPRINT_FILE = 'data/fingerprints.json'  # URL -> content hash of articles already analyzed
+    INDEX_CHECKPOINT_LINES = 20000  # store lines the saved story index may lag; replayed on start
+    NEAR_DUPLICATE_FILE = 'data/near_duplicates.json'  # MinHash/LSH groups of syndicated copies
+    NEAR_DUPLICATE_THRESHOLD = 0.7  # estimated Jaccard similarity of title + description shingles
     BACKUP_INTERVAL = 3600
+    BACKUP_DIR = 'data/backups'  # incremental segments + manifest.json (see backup.py)
+    BACKUP_CHUNK_SIZE = 5000  # rows per backup segment
+    BACKFILL_WORKERS = 0  # analysis processes for `main.py backfill`; 0 = one per CPU
+    BACKFILL_CHUNK_SIZE = 1000  # articles per analyzed chunk and checkpoint
+
+    SENTIMENT_CACHE_SIZE = 50000
+    SENTIMENT_CACHE_FILE = 'data/sentiment_cache.json'
+    SENTIMENT_WORKERS = 0  # >1 scores cache misses of a batch on a process pool (capped at the CPUs)
+    SENTIMENT_POOL_MIN_BATCH = 1000  # fewer misses are scored in-process; the pool's round trips cost more
+
+    METRICS_ENABLED = True  # per-stage timings and counters served at /api/metrics
+    PROFILE_CYCLES = False  # run every collection cycle under cProfile (or /api/parse?profile=1)
+    PROFILE_DIR = 'data/profiles'
 
     FLASK_DEBUG = False 
     FLASK_HOST = '127.0.0.1'
@@ -38,6 +90,20 @@ class Config:
     "one simple trick", "instantly", "this is why", "epic", "game changer"]
     }
 
+    # counted on the headline alone by the manipulation heuristic
+    CLICKBAIT_WORDS = [
+    "shocking", "unbelievable", "you won’t believe", "exposed", "secret",
+    "top", "the truth about", "never seen before", "revealed", "surprising",
+    "this is what happens", "will blow your mind", "can‘t believe", "must see",
+    "what happened next", "goes viral", "insane", "the reason why", "miracle",
+    "will change your life", "hidden", "uncovered", "no one tells you", "jaw-dropping",
+    "one simple trick", "instantly", "this is why", "epic", "game changer"
+]
+
+    # optional JSON {category: [keywords]} merged over BIAS_KEYWORDS / title_clickbait; edits are picked up live
+    KEYWORDS_FILE = 'data/keywords.json'
+    KEYWORDS_RELOAD_INTERVAL = 5
+
 def test_config():
     config = Config()
     print("✅ Configuration loaded successfully!")
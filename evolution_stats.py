@@ -0,0 +1,95 @@
+import json, threading
+from collections import Counter
+from typing import Dict
+
+
+class EvolutionStats:
+    """Story-evolution counts kept up to date from store events.
+
+    Counts per ``source-evolution_index`` (the dashboard's bar labels), per
+    source, per topic cluster and per hour of ``fetched_at`` are adjusted as
+    records are added or patched, so a request only serializes the
+    current totals. The serialized body is cached until the next change.
+    """
+
+    def __init__(self, store, buckets: int = 48):
+        self.store = store
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._reset()
+        store.subscribe(self._on_event)
+
+    def _reset(self):
+        self.by_source_index = Counter()
+        self.by_source = Counter()
+        self.by_cluster = Counter()
+        self.by_bucket = Counter()
+        self.total = 0
+        self.version = 0
+        self._body = None
+
+    # -------------- public --------------
+    def snapshot(self) -> Dict:
+        self.store.refresh()
+        with self._lock:
+            recent = sorted(self.by_bucket)[-self.buckets:]
+            return {
+                'total': self.total,
+                'by_source_index': dict(self.by_source_index),
+                'by_source': dict(self.by_source),
+                'by_cluster': {str(k): v for k, v in self.by_cluster.items()},
+                'by_bucket': {b: self.by_bucket[b] for b in recent},
+            }
+
+    def get(self):
+        """Return ``(version, body)``; the body is re-serialized only after a change."""
+        snap = self.snapshot()
+        with self._lock:
+            if self._body is None:
+                self._body = json.dumps(snap).encode()
+            return self.version, self._body
+
+    # -------------- store events --------------
+    def _on_event(self, event, payload):
+        with self._lock:
+            if event == 'reset':
+                self._reset()
+                return
+            if event == 'add':
+                for rec in payload:
+                    self._count(rec, 1)
+            elif event == 'update':
+                for rec, old in payload:
+                    self._count({**rec, **old}, -1)
+                    self._count(rec, 1)
+            self.version += 1
+            self._body = None
+
+    def _count(self, rec, n):
+        source = rec.get('source') or 'unknown'
+        idx = rec.get('evolution_index')
+        self._bump(self.by_source_index, f"{source}-{0 if idx is None else idx}", n)
+        self._bump(self.by_source, source, n)
+        if rec.get('topic_cluster') is not None:
+            self._bump(self.by_cluster, rec['topic_cluster'], n)
+        bucket = (rec.get('fetched_at') or '')[:13]
+        if bucket:
+            self._bump(self.by_bucket, bucket, n)
+        self.total += n
+
+    @staticmethod
+    def _bump(counter, key, n):
+        counter[key] += n
+        if counter[key] <= 0:
+            del counter[key]
+
+
+_stats: Dict[str, EvolutionStats] = {}
+_stats_lock = threading.Lock()
+
+
+def get_stats(store) -> EvolutionStats:
+    with _stats_lock:
+        if store.path not in _stats:
+            _stats[store.path] = EvolutionStats(store)
+        return _stats[store.path]
@@ -1,40 +1,51 @@
 from collections import defaultdict
-from datetime import datetime, timezone
-import hashlib, re, json, os
 from typing import List, Dict
+from article_store import ArticleStore, get_store, timestamp
+from story_index import get_story_index, url_fingerprint
 
 class EvolutionTracker:
-    def __init__(self, data_file = 'data/articles.json'):
-        self.path = data_file
-    
-    @staticmethod
-    def _fingerprint(url):
-        slug = re.sub(r"https?://", "", url).split('?')[0]
-        return hashlib.md5(slug.encode()).hexdigest()
+    def __init__(self, store: ArticleStore = None):
+        self.store = store if store is not None else get_store()
     
+    _fingerprint = staticmethod(url_fingerprint)
+
+    def build_timeline(self, incremental: bool = True):
+        """Number each URL's snapshots in time order (``evolution_index``, 0 = earliest).
+
+        Incrementally only the snapshots that have no index yet are placed: the
+        story index finds their position in the existing chain by binary search
+        and just they and the snapshots after them are renumbered, so the cost
+        follows the new snapshots, not the corpus. ``incremental=False``
+        renumbers every chain.
+        """
+        index = get_story_index(self.store)
+        changes = {}
+        if incremental:
+            for fp, start in index.unnumbered().items():
+                chain = index.timeline(fp)
+                for i in range(start, len(chain)):
+                    changes[chain[i]] = {'evolution_index': i}
+        else:
+            for chain in index.chains().values():
+                for i, art_id in enumerate(chain):
+                    changes[art_id] = {'evolution_index': i}
 
-    def build_timeline(self):
-        with open(self.path) as f:
-            articles = json.load(f)
-        buckets = defaultdict(list)
-        for art in articles:
-            buckets[self._fingerprint(art['url'])].append(art)
-        
-        for fp, chain in buckets.items():
-            chain.sort(key = lambda x:x['published_at'] or x['fetched_at'])
-
-            for i, art in enumerate(chain):
-                art['evolution_index'] = i
-            
-        with open(self.path, 'w') as f:
-            json.dump(articles, f, indent = 2)
+        # by id, so cold segments are read one after another
+        self.store.update(dict(sorted(changes.items())))
     
-    def build_timeline_by_title_similarity(self, eps: float = 0.6, min_samples: int = 1):
-        """Group articles by title similarity using TF-IDF + DBSCAN (cosine).
+    def build_timeline_by_title_similarity(self, eps: float = 0.6, min_samples: int = 1,
+                                           online: bool = True):
+        """Group articles by title similarity and assign topic_cluster.
         Assign an evolution_index within each cluster ordered by time.
+
+        By default new articles are assigned incrementally to stable clusters
+        (see StoryClusterer); ``online=False`` re-runs TF-IDF + DBSCAN (cosine)
+        over the whole corpus and renumbers every cluster.
         """
-        with open(self.path) as f:
-            articles: List[Dict] = json.load(f)
+        if online:
+            return self._assign_clusters_online(1 - eps)
+
+        articles: List[Dict] = list(self.store.history())
 
         if not articles:
             return
@@ -58,14 +69,38 @@ class EvolutionTracker:
             label_to_indices[int(lab)].append(idx)
 
         # For each cluster, order by time and assign evolution_index
-        def parse_time(a: Dict):
-            return (a.get('published_at') or a.get('fetched_at') or '')
-
+        changes = {}
         for lab, idxs in label_to_indices.items():
-            idxs_sorted = sorted(idxs, key=lambda i: parse_time(articles[i]))
+            idxs_sorted = sorted(idxs, key=lambda i: (timestamp(articles[i]), articles[i]['id']))
             for order, art_idx in enumerate(idxs_sorted):
-                articles[art_idx]['evolution_index'] = order
-                articles[art_idx]['topic_cluster'] = int(lab)
+                changes[articles[art_idx]['id']] = {'evolution_index': order,
+                                                    'topic_cluster': int(lab)}
+
+        self.store.update(changes)
+
+    def _assign_clusters_online(self, threshold: float):
+        from story_clusterer import get_clusterer
+        clusterer = get_clusterer(self.store, threshold)
+        new, cids = clusterer.sync(self.store)
+        if not new:
+            return
+
+        index = get_story_index(self.store)
+        changes, joined = {}, defaultdict(list)
+        for a, cid in zip(new, cids):
+            if a.get('topic_cluster') == cid and a.get('evolution_index') is not None:
+                continue  # replayed after a restart: already placed
+            joined[cid].append(a['id'])
+            if a.get('topic_cluster') != cid:
+                changes[a['id']] = {'topic_cluster': cid}
+        # members are ordered by the story index's times, so no stored record is read; only the
+        # members from the earliest new one on are renumbered
+        for cid, ids in joined.items():
+            fresh = set(ids)
+            chain = index.order([i for i in index.cluster(cid) if i not in fresh] + ids)
+            start = min(pos for pos, art_id in enumerate(chain) if art_id in fresh)
+            for pos in range(start, len(chain)):
+                changes.setdefault(chain[pos], {})['evolution_index'] = pos
 
-        with open(self.path, 'w') as f:
-            json.dump(articles, f, indent=2)
\ No newline at end of file
+        # by id, so cold segments are read one after another
+        self.store.update(dict(sorted(changes.items())))
@@ -0,0 +1,114 @@
+import hashlib, json, os, threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+
+def content_hash(article: Dict) -> str:
+    """Hash of the fields that make a new snapshot (see ``ArticleStore._changed``)."""
+    parts = [article.get('title') or '', article.get('description') or '',
+             article.get('published_at') or '']
+    return hashlib.sha1('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
+
+class FingerprintIndex:
+    """URL -> content hash of the latest version seen, checked before analysis.
+
+    ``split`` separates a fetched batch into articles that still need analysis
+    and ones that can be skipped: a known URL is skipped, or with
+    ``snapshots=True`` only when its content hash is unchanged. The index is
+    persisted to ``path`` (atomic JSON, like the sentiment cache), so a restart
+    does not re-analyze what is already stored. ``save`` only appends the
+    entries remembered since the last save to ``<path>.log``; the whole map is
+    rewritten (and the log cleared) once the log holds as many lines as the map.
+    When the file is missing it is seeded from ``store``. It is only a filter:
+    ``ArticleStore.add`` still makes the final duplicate check.
+    """
+
+    def __init__(self, path: Optional[str] = None, store=None, max_entries: int = 500000):
+        self.path = path
+        self.log_path = f"{path}.log" if path else None
+        self.max_entries = max_entries
+        self.entries: 'OrderedDict[str, str]' = OrderedDict()
+        self._pending: List[Tuple[str, str]] = []  # remembered since the last save
+        self._logged = 0  # lines in the log
+        self._lock = threading.Lock()
+        if not (path and self._load()) and store is not None:
+            self.remember(store.history())
+
+    def split(self, articles: List[Dict], snapshots: bool = False) -> Tuple[List[Dict], List[Dict]]:
+        """Return ``(fresh, skipped)``; repeats of a URL within the batch are skipped too."""
+        fresh, skipped, batch = [], [], set()
+        with self._lock:
+            for art in articles:
+                url = art.get('url')
+                if not url or url in batch:
+                    skipped.append(art)
+                    continue
+                known = self.entries.get(url)
+                if known is not None and not (snapshots and known != content_hash(art)):
+                    skipped.append(art)
+                    continue
+                batch.add(url)
+                fresh.append(art)
+        return fresh, skipped
+
+    def remember(self, articles: List[Dict]):
+        with self._lock:
+            for art in articles:
+                url = art.get('url')
+                if not url:
+                    continue
+                self.entries[url] = digest = content_hash(art)
+                self.entries.move_to_end(url)
+                if self.path:
+                    self._pending.append((url, digest))
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            pending, self._pending = self._pending, []
+            full = self._logged + len(pending) >= len(self.entries) or not os.path.exists(self.path)
+            snapshot = list(self.entries.items()) if full else None
+            self._logged = 0 if full else self._logged + len(pending)
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        if not full:
+            if pending:
+                with open(self.log_path, 'a') as f:
+                    f.write(''.join(json.dumps(entry) + '\n' for entry in pending))
+            return
+        tmp = f"{self.path}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(snapshot, f)
+        os.replace(tmp, self.path)
+        # a crash before this only replays entries the map already holds
+        if os.path.exists(self.log_path):
+            os.remove(self.log_path)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return False
+        self.entries = OrderedDict((url, h) for url, h in saved)
+        try:
+            with open(self.log_path) as f:
+                for line in f:
+                    try:
+                        url, h = json.loads(line)
+                    except ValueError:
+                        break  # torn last line of an interrupted save
+                    self.entries[url] = h
+                    self.entries.move_to_end(url)
+                    self._logged += 1
+        except OSError:
+            pass
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return True
@@ -0,0 +1,100 @@
+import itertools, threading, time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+
+class Job:
+    def __init__(self, job_id: str, key: str):
+        self.id = job_id
+        self.key = key
+        self.status = 'queued'
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.done = threading.Event()
+
+    def to_dict(self) -> Dict:
+        return {'id': self.id, 'key': self.key, 'status': self.status,
+                'result': self.result, 'error': self.error,
+                'submitted_at': self.submitted_at, 'started_at': self.started_at,
+                'finished_at': self.finished_at}
+
+
+class JobQueue:
+    """In-process background jobs with coalescing.
+
+    Jobs run on a single worker thread, so collection runs from the scheduler
+    and from /api/parse never overlap. Submitting a key that is already queued
+    or running returns the existing job instead of starting a duplicate.
+    Finished jobs are kept (up to ``history``) for status lookups.
+    """
+
+    def __init__(self, history: int = 200):
+        self.history = history
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='jobs')
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._jobs: 'OrderedDict[str, Job]' = OrderedDict()
+        self._active: Dict[str, Job] = {}
+
+    def submit(self, key: str, fn, *args, **kwargs):
+        """Queue ``fn(*args, **kwargs)`` under ``key``; returns ``(job, created)``."""
+        with self._lock:
+            job = self._active.get(key)
+            if job is not None:
+                return job, False
+            job = Job(str(next(self._ids)), key)
+            self._active[key] = job
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.history:
+                old_id, old = next(iter(self._jobs.items()))
+                if old.status in ('queued', 'running'):
+                    break
+                del self._jobs[old_id]
+        self.executor.submit(self._run, job, fn, args, kwargs)
+        return job, True
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def depth(self) -> int:
+        """Jobs queued or running."""
+        with self._lock:
+            return len(self._active)
+
+    def shutdown(self, wait: bool = True):
+        self.executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _run(self, job, fn, args, kwargs):
+        job.status, job.started_at = 'running', time.time()
+        try:
+            job.result = fn(*args, **kwargs)
+            job.status = 'done'
+        except Exception as e:
+            job.error, job.status = str(e), 'failed'
+            print(f"Job {job.key} failed: {e}")
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                if self._active.get(job.key) is job:
+                    del self._active[job.key]
+            job.done.set()
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """The process-wide queue shared by the scheduler and the API."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            from metrics import get_metrics
+            _queue = JobQueue()
+            get_metrics().gauge_fn('news_job_queue_depth', _queue.depth)
+        return _queue
@@ -0,0 +1,185 @@
+import bisect, contextlib, cProfile, io, os, pstats, threading, time
+from datetime import datetime
+from typing import Callable, Dict, Optional, Tuple
+
+_LATENCY = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+_PER_ARTICLE = (1e-5, 5e-5, 1e-4, 5e-4, 0.001, 0.005, 0.01, 0.05, 0.1)
+
+# name -> (type, help, histogram buckets)
+METRICS = {
+    'news_provider_request_seconds': ('histogram', 'HTTP request latency per provider', _LATENCY),
+    'news_provider_requests_total': ('counter', 'HTTP responses per provider and status', None),
+    'news_provider_fetch_seconds': ('histogram', 'Time for one provider to walk its pages in a cycle',
+                                    _LATENCY),
+    'news_provider_failures_total': ('counter', 'Provider fetches that failed or timed out', None),
+    'news_stream_pages_waiting': ('gauge', 'Fetched pages waiting for analysis', None),
+    'news_stage_seconds': ('histogram', 'Duration of a pipeline stage for one batch', _LATENCY),
+    'news_analysis_seconds_per_article': ('histogram', 'Analysis time per article of a batch',
+                                          _PER_ARTICLE),
+    'news_articles_total': ('counter', 'Collected articles by outcome', None),
+    'news_cache_requests_total': ('counter', 'Cache lookups by cache and result', None),
+    'news_job_queue_depth': ('gauge', 'Background jobs queued or running', None),
+}
+
+
+class MetricsRegistry:
+    """Counters, gauges and histograms, rendered in the Prometheus text format.
+
+    Metrics are declared in ``METRICS`` and updated by name with labels as
+    keyword arguments (``inc('news_articles_total', 5, outcome='added')``).
+    A disabled registry returns at the first line of every update and
+    ``timer`` hands out a shared no-op context, so instrumented code costs
+    next to nothing. Gauges can also be read from a callback at render time
+    (``gauge_fn``).
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._values: Dict[str, Dict[Tuple, float]] = {name: {} for name in METRICS}
+        self._histograms: Dict[str, Dict[Tuple, list]] = {name: {} for name, (kind, _, _) in
+                                                          METRICS.items() if kind == 'histogram'}
+        self._callbacks: Dict[str, Callable[[], float]] = {}
+
+    # -------------- public --------------
+    def inc(self, name: str, value: float = 1, **labels):
+        if not self.enabled:
+            return
+        key = _key(labels)
+        with self._lock:
+            series = self._values[name]
+            series[key] = series.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._values[name][_key(labels)] = value
+
+    def observe(self, name: str, value: float, **labels):
+        if not self.enabled:
+            return
+        buckets = METRICS[name][2]
+        key = _key(labels)
+        with self._lock:
+            counts = self._histograms[name].get(key)
+            if counts is None:
+                counts = self._histograms[name][key] = [0] * (len(buckets) + 1) + [0.0]
+            counts[bisect.bisect_left(buckets, value)] += 1
+            counts[-1] += value
+
+    def timer(self, name: str, **labels):
+        """Context manager observing its duration in histogram ``name``."""
+        if not self.enabled:
+            return _NO_TIMER
+        return _Timer(self, name, labels)
+
+    def gauge_fn(self, name: str, fn: Callable[[], float]):
+        """Read gauge ``name`` from ``fn()`` when rendering (replaces an earlier callback)."""
+        self._callbacks[name] = fn
+
+    def value(self, name: str, **labels) -> float:
+        """Current value of a counter or gauge, or the observation count of a histogram."""
+        key = _key(labels)
+        with self._lock:
+            if name in self._histograms:
+                counts = self._histograms[name].get(key)
+                return sum(counts[:-1]) if counts is not None else 0
+            return self._values[name].get(key, 0)
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            for name, (kind, help_text, buckets) in METRICS.items():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                if kind == 'histogram':
+                    for key, counts in sorted(self._histograms[name].items()):
+                        total = 0
+                        for le, count in zip(buckets + ('+Inf',), counts[:-1]):
+                            total += count
+                            lines.append(f"{name}_bucket{_labels(key, le=le)} {total}")
+                        lines.append(f"{name}_sum{_labels(key)} {counts[-1]:.6f}")
+                        lines.append(f"{name}_count{_labels(key)} {total}")
+                    continue
+                series = dict(self._values[name])
+                if name in self._callbacks:
+                    try:
+                        series[()] = self._callbacks[name]()
+                    except Exception as e:
+                        print(f"Metric {name} unavailable: {e}")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{name}{_labels(key)} {value:g}")
+        return '\n'.join(lines) + '\n'
+
+
+class _Timer:
+    __slots__ = ('registry', 'name', 'labels', 'start')
+
+    def __init__(self, registry, name, labels):
+        self.registry, self.name, self.labels = registry, name, labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.registry.observe(self.name, time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+_NO_TIMER = contextlib.nullcontext()
+
+
+def _key(labels) -> Tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _labels(key, **extra) -> str:
+    pairs = list(key) + list(extra.items())
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+@contextlib.contextmanager
+def profiled(directory: Optional[str], name: str, top: int = 15):
+    """Run the block under cProfile when ``directory`` is set.
+
+    The profile is written to ``<directory>/<name>-<time>.prof`` (open it with
+    ``python -m pstats`` or snakeviz) and the ``top`` functions by cumulative
+    time are printed. Without a directory the block just runs.
+    """
+    if not directory:
+        yield None
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{name}-{datetime.now():%Y%m%d-%H%M%S}.prof")
+        profiler.dump_stats(path)
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(top)
+        print(f"Profile written to {path}\n{out.getvalue()}")
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_metrics() -> MetricsRegistry:
+    """The process-wide registry; ``Config.METRICS_ENABLED`` decides whether it records."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            from configuration import Config
+            _registry = MetricsRegistry(Config.METRICS_ENABLED)
+        return _registry
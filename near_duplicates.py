@@ -0,0 +1,268 @@
+import base64, json, os, re, threading, zlib
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import numpy as np
+
+TRACKING_PARAMS = {'fbclid', 'gclid', 'dclid', 'msclkid', 'mc_cid', 'mc_eid', 'igshid', 'cmpid',
+                   'ocid', 'ref', 'ref_src', 'smid', 'smtyp', 'cid', 'ito', 'taid', '_ga', 'yclid'}
+_PRIME = (1 << 31) - 1
+
+
+def canonical_url(url: Optional[str]) -> Optional[str]:
+    """``url`` without tracking parameters (``utm_*``, ``fbclid`` ...) and fragment.
+
+    Scheme and host are lower-cased and the remaining query parameters sorted,
+    so links to the same page shared through different campaigns compare equal.
+    """
+    if not url:
+        return url
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        return url
+    if not parts.netloc:
+        return url
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                   if not k.lower().startswith('utm_') and k.lower() not in TRACKING_PARAMS)
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or '/',
+                       urlencode(query), ''))
+
+
+def _b64(sig) -> str:
+    return base64.b64encode(sig.tobytes()).decode()
+
+
+class NearDuplicateIndex:
+    """MinHash/LSH groups of near-identical articles (syndicated wire copies).
+
+    An article's title and description are cut into word 3-gram shingles and
+    summarised by a ``num_perm``-value MinHash signature. The signature is split
+    into ``bands`` bands; articles that agree on a whole band land in the same
+    bucket, and a bucket candidate joins its group when the estimated Jaccard
+    similarity to the group's first member reaches ``threshold``. Lookups touch
+    ``bands`` buckets of at most ``bucket_size`` groups each, so the cost per
+    article does not grow with the corpus.
+
+    Group ids are never renumbered and are stored on articles as
+    ``dup_group``; a group remembers its member ids and sources, which show how
+    a story spread. The least recently touched groups beyond ``max_groups``
+    are forgotten. The index is persisted to ``path`` (atomic JSON): ``save``
+    appends the groups opened and members stored since the last save to
+    ``<path>.log`` and rewrites the whole file only once the log holds as many
+    lines as there are groups.
+    """
+
+    def __init__(self, path: Optional[str] = None, threshold: float = 0.7, num_perm: int = 64,
+                 bands: int = 16, max_groups: int = 100000, bucket_size: int = 8, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.path = path
+        self.log_path = f"{path}.log" if path else None
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.max_groups = max_groups
+        self.bucket_size = bucket_size
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, _PRIME, size=num_perm).astype(np.uint64)
+        self._b = rng.randint(0, _PRIME, size=num_perm).astype(np.uint64)
+        self.groups: 'OrderedDict[int, Dict]' = OrderedDict()
+        self._buckets: Dict[Tuple[int, bytes], List[int]] = {}
+        self.next_id = 0
+        self._pending: List[List] = []  # ['open', gid, sig, url] / ['member', gid, id, url, source]
+        self._logged = 0  # lines in the log
+        self._lock = threading.Lock()
+        if path:
+            self._load()
+
+    # -------------- public --------------
+    def signature(self, article: Dict) -> Optional[np.ndarray]:
+        text = f"{article.get('title') or ''} {article.get('description') or ''}".lower()
+        words = re.findall(r'\w+', text)
+        if not words:
+            return None
+        shingles = {' '.join(words[i:i + 3]) for i in range(max(len(words) - 2, 1))}
+        h = np.fromiter((zlib.crc32(s.encode()) for s in shingles), dtype=np.uint64,
+                        count=len(shingles))
+        return ((self._a[:, None] * h[None, :] + self._b[:, None]) % _PRIME).min(axis=1).astype(np.uint32)
+
+    def assign(self, articles: List[Dict]) -> List[Optional[int]]:
+        """Set ``dup_group`` on each article (joining or opening a group) and return the ids.
+
+        Articles without any title or description text get no group.
+        """
+        out = []
+        with self._lock:
+            for art in articles:
+                sig = self.signature(art)
+                gid = None
+                if sig is not None:
+                    gid = self._match(sig)
+                    if gid is None:
+                        gid = self._open(sig, art)
+                    self.groups.move_to_end(gid)
+                art['dup_group'] = gid
+                out.append(gid)
+            self._evict()
+        return out
+
+    def remember(self, stored: List[Dict]):
+        """Record stored articles (with their ids) as members of their groups."""
+        with self._lock:
+            for art in stored:
+                group = self.groups.get(art.get('dup_group'))
+                if group is None:
+                    continue
+                source = art.get('source') or 'unknown'
+                self._member(group, art['id'], art.get('url'), source)
+                if self.path:
+                    self._pending.append(['member', art['dup_group'], art['id'], art.get('url'), source])
+
+    def first(self, gid: Optional[int]) -> Optional[Tuple[int, str]]:
+        """``(id, url)`` of the first stored member of a group, if any."""
+        with self._lock:
+            group = self.groups.get(gid)
+            if group is None or group['first'] is None:
+                return None
+            return group['first'], group['url']
+
+    def summary(self, gid: int) -> Optional[Dict]:
+        with self._lock:
+            group = self.groups.get(gid)
+            return None if group is None else self._summary(gid, group)
+
+    def spread(self, min_size: int = 2, limit: Optional[int] = None) -> List[Dict]:
+        """Groups with at least ``min_size`` stored members, most sources first."""
+        with self._lock:
+            out = [self._summary(gid, g) for gid, g in self.groups.items()
+                   if len(g['members']) >= min_size]
+        out.sort(key=lambda g: (-len(g['sources']), -g['size'], g['group']))
+        return out[:limit] if limit is not None else out
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            pending, self._pending = self._pending, []
+            full = self._logged + len(pending) >= len(self.groups) or not os.path.exists(self.path)
+            self._logged = 0 if full else self._logged + len(pending)
+            if full:
+                state = {'next_id': self.next_id, 'params': [self.num_perm, self.bands],
+                         'groups': [[gid, _b64(g['sig']), g['first'], g['url'], g['members'],
+                                     g['sources']] for gid, g in self.groups.items()]}
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        if not full:
+            if pending:
+                with open(self.log_path, 'a') as f:
+                    f.write(''.join(json.dumps(op) + '\n' for op in pending))
+            return
+        tmp = f"{self.path}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp, self.path)
+        # a crash before this replays operations the file already holds, which is harmless
+        if os.path.exists(self.log_path):
+            os.remove(self.log_path)
+
+    def __len__(self):
+        return len(self.groups)
+
+    # -------------- private --------------
+    def _band_keys(self, sig):
+        return [(b, sig[b * self.rows:(b + 1) * self.rows].tobytes()) for b in range(self.bands)]
+
+    def _match(self, sig) -> Optional[int]:
+        best, best_sim = None, self.threshold
+        seen = set()
+        for key in self._band_keys(sig):
+            for gid in self._buckets.get(key, ()):
+                if gid in seen:
+                    continue
+                seen.add(gid)
+                sim = float(np.mean(self.groups[gid]['sig'] == sig))
+                if sim >= best_sim:
+                    best, best_sim = gid, sim
+        return best
+
+    def _open(self, sig, art) -> int:
+        gid = self.next_id
+        self.next_id += 1
+        self.groups[gid] = {'sig': sig, 'first': None, 'url': art.get('url'), 'members': [],
+                            'sources': []}
+        self._index(gid, sig)
+        if self.path:
+            self._pending.append(['open', gid, _b64(sig), art.get('url')])
+        return gid
+
+    @staticmethod
+    def _member(group, art_id, url, source):
+        if art_id in group['members']:
+            return  # replayed from the log after a full save that already has it
+        if group['first'] is None:
+            group['first'], group['url'] = art_id, url
+        group['members'].append(art_id)
+        if source not in group['sources']:
+            group['sources'].append(source)
+
+    def _index(self, gid, sig):
+        for key in self._band_keys(sig):
+            bucket = self._buckets.setdefault(key, [])
+            bucket.append(gid)
+            if len(bucket) > self.bucket_size:
+                del bucket[0]
+
+    def _evict(self):
+        while len(self.groups) > self.max_groups:
+            gid, group = self.groups.popitem(last=False)
+            for key in self._band_keys(group['sig']):
+                bucket = self._buckets.get(key)
+                if bucket and gid in bucket:
+                    bucket.remove(gid)
+                    if not bucket:
+                        del self._buckets[key]
+
+    @staticmethod
+    def _summary(gid, group) -> Dict:
+        return {'group': gid, 'size': len(group['members']), 'sources': list(group['sources']),
+                'first': group['first'], 'members': list(group['members'])}
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+            self.next_id = state['next_id']  # ids stay unique even if the groups are dropped
+            # signatures from other parameters do not compare
+            same = state['params'] == [self.num_perm, self.bands]
+            groups = state['groups'] if same else []
+        except (OSError, ValueError, KeyError):
+            return
+        for gid, sig, first, url, members, sources in groups:
+            sig = np.frombuffer(base64.b64decode(sig), dtype=np.uint32)
+            self.groups[gid] = {'sig': sig, 'first': first, 'url': url, 'members': members,
+                                'sources': sources}
+            self._index(gid, sig)
+        try:
+            with open(self.log_path) as f:
+                lines = f.readlines()
+        except OSError:
+            return
+        for line in lines:
+            try:
+                op = json.loads(line)
+            except ValueError:
+                break  # torn last line of an interrupted save
+            self._logged += 1
+            if op[0] == 'open':
+                self.next_id = max(self.next_id, op[1] + 1)
+                if same and op[1] not in self.groups:
+                    sig = np.frombuffer(base64.b64decode(op[2]), dtype=np.uint32)
+                    self.groups[op[1]] = {'sig': sig, 'first': None, 'url': op[3], 'members': [],
+                                          'sources': []}
+                    self._index(op[1], sig)
+            elif op[1] in self.groups:
+                self._member(self.groups[op[1]], *op[2:])
+                self.groups.move_to_end(op[1])
+        self._evict()
@@ -1,7 +1,17 @@
-import requests, itertools, time
+import queue, threading, requests, time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import List, Dict
+from requests.adapters import HTTPAdapter
 from configuration import Config
+from metrics import get_metrics
+from near_duplicates import canonical_url
+from provider_cursors import ProviderCursors
+from rate_limit import CircuitBreaker, ProviderUnavailable, TokenBucket, backoff_delay, retry_after_seconds
+from topics import TopicRegistry
+
+# topic categories whose thenewsapi name differs (newsdata uses the names in Config.CATEGORIES)
+THENEWSAPI_CATEGORIES = {'technology': 'tech'}
 
 class NewsCollector:
     def __init__(self, cfg: Config):
@@ -11,81 +21,335 @@ class NewsCollector:
             self._from_newsdata,
             self._from_thenewsapi
         ]
+        # one keep-alive session per provider so connections are reused across pages and cycles
+        self.sessions = {self._provider(ep): self._make_session() for ep in self.endpoints}
+        self.buckets = {name: TokenBucket(cfg.PROVIDER_RATE_LIMITS.get(name, 0), cfg.PROVIDER_BURST)
+                        for name in self.sessions}
+        self.breakers = {name: CircuitBreaker(cfg.CIRCUIT_FAILURE_THRESHOLD, cfg.CIRCUIT_COOLDOWN)
+                         for name in self.sessions}
+        self.executor = ThreadPoolExecutor(max_workers=len(self.endpoints),
+                                           thread_name_prefix='collector')
+        self.cursors = ProviderCursors(cfg.PROVIDER_CURSOR_FILE)
+        self.topics = TopicRegistry(cfg)
     # -------------- public --------------
-    def collect_latest_news(self):
-        articles = []
+    def stream_latest_news(self, topic=None):
+        """Yield lists of new articles page by page as the providers deliver them.
+
+        All providers are fetched concurrently; a slow or failing provider only
+        loses its own results. ``topic`` (a ``topics.Topic``, default the first
+        registered one) supplies the queries and filters. Each provider asks
+        only for items newer than its persisted cursor for the topic, within
+        ``Config.PROVIDER_PAGE_BUDGET`` pages; cursors advance only for
+        providers that finished within their timeout.
+
+        At most ``Config.STREAM_QUEUE_PAGES`` pages wait for the consumer; a
+        provider that gets further ahead blocks until one is taken (or its
+        timeout passes), so memory stays bounded however many pages it walks.
+        URLs already yielded in this cycle are left out of later pages.
+        """
+        topic = topic or self.topics.default()
+        metrics = get_metrics()
+        start = time.monotonic()
+        feed = queue.Queue()
+        slots = threading.BoundedSemaphore(self.cfg.STREAM_QUEUE_PAGES)
+        deadlines = {}
+        for ep in self.endpoints:
+            name = self._provider(ep)
+            deadlines[name] = start + self._timeout(name)
+            self.executor.submit(self._run_provider, ep, deadlines[name], topic, feed, slots)
+
+        seen = set()
         try:
-            for ep in self.endpoints:
-                articles.extend(ep())
-        except Exception as e:
-            print(f"{ep.__name__} failed, error: {e}")
-        
-        seen, deduped = set(), []
-
-        for art in articles:
-            if art['url'] not in seen:
-                seen.add(art['url'])
-                deduped.append(art)
-        return deduped
+            while deadlines:
+                try:
+                    name, kind, value = feed.get(timeout=max(min(deadlines.values()) - time.monotonic(), 0))
+                except queue.Empty:
+                    for name, deadline in list(deadlines.items()):
+                        if deadline <= time.monotonic():
+                            print(f"_from_{name} timed out after {self._timeout(name)}s, skipping")
+                            metrics.inc('news_provider_failures_total', provider=name, reason='timeout')
+                            del deadlines[name]
+                    continue
+                if kind == 'page':
+                    slots.release()
+                    metrics.inc('news_stream_pages_waiting', -1)
+                if name not in deadlines:
+                    continue  # a provider that already timed out
+                if kind == 'page':
+                    page = [a for a in value if a['url'] not in seen]
+                    seen.update(a['url'] for a in page)
+                    if page:
+                        yield page
+                elif kind == 'done':
+                    del deadlines[name]
+                    self.cursors.set(f"{topic.name}:{name}", value)
+                else:
+                    del deadlines[name]
+                    metrics.inc('news_provider_failures_total', provider=name,
+                                reason='unavailable' if isinstance(value, ProviderUnavailable) else 'error')
+                    if isinstance(value, ProviderUnavailable):
+                        print(f"Skipping {name}: {value}")
+                    else:
+                        print(f"_from_{name} failed, error: {value}")
+        finally:
+            self.cursors.save()
+
+    def collect_latest_news(self, topic=None):
+        """``stream_latest_news`` collected into one list."""
+        return [a for page in self.stream_latest_news(topic) for a in page]
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        for s in self.sessions.values():
+            s.close()
     # -------------- private --------------
-    def _from_newsapi(self):
-        url = "https://newsapi.org/v2/everything"
+    def _make_session(self):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.cfg.HTTP_POOL_SIZE,
+                              pool_maxsize=self.cfg.HTTP_POOL_SIZE)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    @staticmethod
+    def _provider(ep):
+        return ep.__name__[len('_from_'):]
+
+    def _timeout(self, provider):
+        return self.cfg.PROVIDER_TIMEOUTS.get(provider, 15)
+
+    def _run_provider(self, ep, deadline, topic, feed, slots):
+        """Run one provider on its thread, putting ``(name, kind, value)`` messages on ``feed``.
+
+        Each page takes one of ``slots`` (the consumer gives it back), and waits
+        for it no longer than ``deadline``; the final ``done`` (with the new
+        cursor) or ``error`` message is not bounded.
+        """
+        name = self._provider(ep)
+        metrics = get_metrics()
+
+        def emit(articles):
+            if not slots.acquire(timeout=max(deadline - time.monotonic(), 0)):
+                raise TimeoutError(f"{name} deadline exceeded waiting for the consumer")
+            metrics.inc('news_stream_pages_waiting')
+            feed.put((name, 'page', articles))
+
+        try:
+            with metrics.timer('news_provider_fetch_seconds', provider=name):
+                cursor = ep(deadline=deadline, cursor=self.cursors.get(f"{topic.name}:{name}"),
+                            topic=topic, emit=emit)
+        except Exception as e:
+            feed.put((name, 'error', e))
+        else:
+            feed.put((name, 'done', cursor))
+
+    def _get(self, provider, url, params, deadline, headers=None):
+        """GET through the provider's rate limit and circuit breaker, retrying 429/5xx.
+
+        Retries back off exponentially with jitter (at least ``Retry-After``)
+        as long as the wait fits before ``deadline``. Other responses are
+        returned as they are. Any exit without a response, including running
+        out of time before a request is sent, counts as a breaker failure, so a
+        half-open trial always reports back.
+        """
+        breaker = self.breakers[provider]
+        if not breaker.allow():
+            raise ProviderUnavailable(f"{provider} circuit open, retrying in {breaker.remaining():.0f}s")
+        try:
+            resp = self._attempts(provider, url, params, deadline, headers)
+        except BaseException:
+            breaker.record_failure()
+            raise
+        breaker.record_success()
+        return resp
+
+    def _attempts(self, provider, url, params, deadline, headers):
+        attempt = 0
+        while True:
+            self.buckets[provider].acquire(deadline)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"{provider} deadline exceeded")
+            retry_after = None
+            sent = time.perf_counter()
+            try:
+                resp = self.sessions[provider].get(
+                    url, params=params, headers=headers,
+                    timeout=(min(self.cfg.HTTP_CONNECT_TIMEOUT, remaining), remaining))
+            except requests.RequestException as e:
+                error = e
+                self._record(provider, sent, type(e).__name__)
+            else:
+                self._record(provider, sent, resp.status_code)
+                if resp.status_code != 429 and resp.status_code < 500:
+                    return resp
+                error = requests.HTTPError(f"{provider} answered {resp.status_code}", response=resp)
+                retry_after = retry_after_seconds(resp.headers.get('Retry-After'))
+            delay = backoff_delay(attempt, self.cfg.HTTP_BACKOFF_BASE, self.cfg.HTTP_BACKOFF_MAX,
+                                  retry_after)
+            attempt += 1
+            if attempt > self.cfg.HTTP_MAX_RETRIES or time.monotonic() + delay >= deadline:
+                raise error
+            print(f"{error}, retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+    @staticmethod
+    def _record(provider, sent, status):
+        metrics = get_metrics()
+        metrics.observe('news_provider_request_seconds', time.perf_counter() - sent, provider=provider)
+        metrics.inc('news_provider_requests_total', provider=provider, status=status)
+
+    def _poll(self, fetch_page, cursor, deadline, topic, emit):
+        """Page through ``fetch_page`` newest first, stopping at the cursor.
+
+        ``fetch_page(topic, token, since, headers, deadline)`` returns ``(response,
+        raw items, next token)``. The head walk starts from the newest items
+        and sends ``If-None-Match`` / ``If-Modified-Since``; it stops at the
+        first page that reaches back to ``cursor['latest']``. If the page budget runs out
+        first, the gap is remembered as ``page`` / ``floor`` and walked with
+        the leftover budget of later cycles. Each page's new articles are
+        passed to ``emit`` as soon as it arrives. Returns the new cursor.
+        """
+        cursor = dict(cursor or {})
+        latest = newest = cursor.get('latest')
+        budget = self.cfg.PROVIDER_PAGE_BUDGET
+
+        def walk(token, since, head):
+            nonlocal budget, newest
+            while budget > 0:
+                budget -= 1
+                headers = {}
+                if head and token is None:
+                    if cursor.get('etag'):
+                        headers['If-None-Match'] = cursor['etag']
+                    if cursor.get('last_modified'):
+                        headers['If-Modified-Since'] = cursor['last_modified']
+                resp, items, next_token = fetch_page(topic, token, since, headers, deadline)
+                if resp.status_code == 304:
+                    return None
+                if head and token is None:
+                    cursor['etag'] = resp.headers.get('ETag')
+                    cursor['last_modified'] = resp.headers.get('Last-Modified')
+                stamps = [self._published(r) for r in items]
+                kept = [(r, p) for r, p in zip(items, stamps) if since is None or p is None or p >= since]
+                if kept:
+                    emit(self._transform([r for r, _ in kept], topic))
+                    newest = max([p for _, p in kept if p] + ([newest] if newest else []), default=None)
+                reached = since is not None and any(p is not None and p <= since for p in stamps)
+                if reached or not next_token or next_token == token:
+                    return None
+                token = next_token
+            return token
+
+        leftover = walk(None, latest, head=True)
+        if leftover is not None and latest is not None:
+            # keep the older floor: walking down from the new token passes the old gap too
+            cursor['page'], cursor['floor'] = leftover, cursor.get('floor') or latest
+        elif cursor.get('page'):
+            cursor['page'] = walk(cursor['page'], cursor.get('floor'), head=False)
+            if cursor['page'] is None:
+                cursor.pop('floor', None)
+        cursor['latest'] = newest
+        return cursor
+
+    def _from_newsapi(self, deadline, emit, cursor=None, topic=None):
+        return self._poll(self._newsapi_page, cursor, deadline, topic or self.topics.default(), emit)
+
+    def _newsapi_page(self, topic, token, since, headers, deadline):
         params = {
             "apiKey" : self.cfg.NEWSAPI_KEY,
-            'q' : "affirmative action",
+            'q' : topic.query('OR'),
             'language' : 'en',
-            'page' : 1,
+            'sortBy' : 'publishedAt',
+            'pageSize' : self.cfg.MAX_ARTICLES_PER_REQUEST,
         }
-        resp = requests.get(url, params=params)
+        if topic.sources:
+            params['sources'] = ','.join(topic.sources[:20])  # API maximum
+        if since:
+            params['from'] = since
+        if token:
+            params['to'] = token  # keyset paging: continue below the oldest item seen
+        resp = self._get('newsapi', self.cfg.NEWSAPI_URL, params, deadline, headers)
+        if resp.status_code == 304:
+            return resp, [], None
         data = resp.json()
         if data.get('status') != 'ok':
             print("APINEWS Error:", data.get('message', 'Unknown error'))
-            return []
-        return self._transform(data.get("articles", []))
-    def _from_newsdata(self):
-        url = "https://newsdata.io/api/1/latest"
+            return resp, [], None
+        items = data.get("articles", [])
+        more = len(items) < data.get('totalResults', 0)
+        return resp, items, self._published(items[-1]) if items and more else None
+
+    def _from_newsdata(self, deadline, emit, cursor=None, topic=None):
+        # pages are chained through the nextPage token, so they are walked in order on
+        # this provider's thread while the other providers run alongside
+        return self._poll(self._newsdata_page, cursor, deadline, topic or self.topics.default(), emit)
+
+    def _newsdata_page(self, topic, token, since, headers, deadline):
+        # /latest has no date filter; _poll stops at the first item older than `since`
         params = {
             'apikey' : self.cfg.NEWSDATA_KEY,
-            'q' : 'affirmative action',
+            'q' : topic.query('OR'),
             'language' : 'en',
-            'page' : 0,
         }
-        articles = []
-        while True:
-            resp_raw = requests.get(url, params=params)
-            try:
-                resp = resp_raw.json()
-            except ValueError:
-                print('Non-JSON Response:', resp_raw.text)
-                break
-            results = resp.get('results', []) if isinstance(resp, dict) else []
-            articles.extend(results)
-            next_page = resp.get('nextPage') if isinstance(resp, dict) else None
-            if not next_page:
-                break
-            params['page'] = next_page
-        return self._transform(articles)
-    def _from_thenewsapi(self):
-         url = "https://api.thenewsapi.com/v1/news/all"
-         params = {
+        if topic.categories:
+            params['category'] = ','.join(topic.categories[:5])  # API maximum
+        if token:
+            params['page'] = token
+        resp_raw = self._get('newsdata', self.cfg.NEWSDATA_URL, params, deadline, headers)
+        if resp_raw.status_code == 304:
+            return resp_raw, [], None
+        try:
+            resp = resp_raw.json()
+        except ValueError:
+            print('Non-JSON Response:', resp_raw.text)
+            return resp_raw, [], None
+        if not isinstance(resp, dict):
+            return resp_raw, [], None
+        return resp_raw, resp.get('results') or [], resp.get('nextPage')
+
+    def _from_thenewsapi(self, deadline, emit, cursor=None, topic=None):
+        return self._poll(self._thenewsapi_page, cursor, deadline, topic or self.topics.default(), emit)
+
+    def _thenewsapi_page(self, topic, token, since, headers, deadline):
+        params = {
             "api_token": self.cfg.THENEWSAPI_KEY,
-            "search": "affirmative action",
+            "search": topic.query('|'),
             "language": "en",
             "limit": self.cfg.MAX_ARTICLES_PER_REQUEST,
         }
-         resp = requests.get(url, params=params)
-         data = resp.json()
-         results = data.get('data', []) if isinstance(data, dict) else []
-         return self._transform(results)
-    
-    def _transform(self, raw):
+        if topic.categories:
+            params['categories'] = ','.join(THENEWSAPI_CATEGORIES.get(c, c) for c in topic.categories)
+        if since:
+            params['published_after'] = since[:19]
+        if token:
+            params['published_before'] = token[:19]
+        resp = self._get('thenewsapi', self.cfg.THENEWSAPI_URL, params, deadline, headers)
+        if resp.status_code == 304:
+            return resp, [], None
+        data = resp.json()
+        if not isinstance(data, dict):
+            return resp, [], None
+        items = data.get('data', [])
+        # the plan may cap the page size below the requested limit
+        more = len(items) >= (data.get('meta') or {}).get('limit', params['limit'])
+        return resp, items, self._published(items[-1]) if items and more else None
+
+    @staticmethod
+    def _published(r):
+        return r.get('publishedAt') or r.get('pubDate') or r.get('published_at')
+
+    def _transform(self, raw, topic=None):
+        # newsapi: source {id, name} + url; newsdata: source_id + link; thenewsapi: source string + url
         def clean(r):
+            source = r.get('source')
             return {
-                'source' : r.get('source', {}).get("name") or r.get('source_id'),
-                'title' : r.get('title', ''),
-                'description' : r.get('description', ''),
-                'url' : r.get('url'),
-                'published_at' : r.get('publishedAt') or r.get('pubDate'),
-                'fetched_at' : datetime.now().isoformat()
+                'source' : source.get('name') if isinstance(source, dict) else source or r.get('source_id'),
+                'title' : r.get('title') or '',
+                'description' : r.get('description') or '',
+                'url' : canonical_url(r.get('url') or r.get('link')),
+                'published_at' : NewsCollector._published(r),
+                'fetched_at' : datetime.now().isoformat(),
+                'topic' : topic.name if topic else None,
             }
-        return [clean(x) for x in raw if x.get('url')]
+        return [clean(x) for x in raw if x.get('url') or x.get('link')]
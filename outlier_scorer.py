@@ -0,0 +1,44 @@
+from collections import deque
+from typing import List, Optional
+
+
+class OutlierScorer:
+    """Outlier score ``1 - mean cosine similarity`` of each title to a corpus.
+
+    With l2-normalised TF-IDF rows ``X``, the mean similarity of row ``i`` to all
+    ``n`` rows is ``X[i] . X.sum(axis=0) / n``, so the score needs one sparse
+    column sum and one sparse matrix-vector product (O(nnz)) instead of the
+    dense n x n ``cosine_similarity`` matrix.
+
+    ``window`` > 0 keeps the most recent ``window`` titles as a rolling
+    reference corpus: each batch is scored against reference + batch, and then
+    joins the reference. With ``window=0`` a batch is only compared to itself.
+    ``remember=False`` scores against the window without adding the batch to it.
+    """
+
+    def __init__(self, window: int = 0):
+        self.window = window
+        self.reference = deque(maxlen=window or None)
+
+    def score(self, titles: List[str], reference: Optional[List[str]] = None,
+              remember: bool = True):
+        import numpy as np
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        titles = list(titles)
+        if reference is None:
+            reference = list(self.reference) if self.window else []
+        if self.window and remember:
+            self.reference.extend(titles)
+        if not titles:
+            return np.zeros(0)
+
+        corpus = list(reference) + titles
+        try:
+            X = TfidfVectorizer().fit_transform(corpus)
+        except ValueError:  # empty vocabulary: nothing to compare
+            return np.zeros(len(titles))
+        total = np.asarray(X.sum(axis=0)).ravel()
+        batch = X[len(reference):]
+        mean_sim = batch @ total / X.shape[0]
+        return 1 - mean_sim
@@ -0,0 +1,49 @@
+import json, os, threading
+from typing import Dict, Optional
+
+
+class ProviderCursors:
+    """Per-provider polling state, persisted between runs.
+
+    Each provider has a dict with ``latest`` (newest ``published_at`` fetched),
+    ``etag`` / ``last_modified`` from the last head request, and, when a cycle
+    ran out of page budget before reaching ``latest``, ``page`` (where to
+    continue) and ``floor`` (how far back to continue). Saved as atomic JSON.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.state: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        if path:
+            self._load()
+
+    def get(self, provider: str) -> Dict:
+        with self._lock:
+            return dict(self.state.get(provider, {}))
+
+    def set(self, provider: str, cursor: Dict):
+        with self._lock:
+            self.state[provider] = {k: v for k, v in cursor.items() if v is not None}
+
+    def clear(self):
+        with self._lock:
+            self.state = {}
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            snapshot = dict(self.state)
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(snapshot, f)
+        os.replace(tmp, self.path)
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                self.state = json.load(f)
+        except (OSError, ValueError):
+            self.state = {}
@@ -0,0 +1,103 @@
+import random, threading, time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+
+class ProviderUnavailable(Exception):
+    """Raised instead of calling a provider whose circuit breaker is open."""
+
+
+class TokenBucket:
+    """``rate`` requests per second on average, bursts of up to ``burst``."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, deadline: Optional[float] = None):
+        """Take one token, sleeping until one is available; TimeoutError past ``deadline``."""
+        if not self.rate:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            if deadline is not None and now + wait > deadline:
+                raise TimeoutError("rate limit wait would pass the deadline")
+            time.sleep(wait)
+
+
+class CircuitBreaker:
+    """Closed -> open after ``threshold`` failures in a row -> half-open after ``cooldown``.
+
+    While open, ``allow`` refuses calls. After the cooldown one trial call is
+    let through; success closes the breaker, failure opens it again. A trial
+    that never reports back does not hold the breaker half-open for good:
+    another one is let through after a further cooldown.
+    """
+
+    def __init__(self, threshold: int = 5, cooldown: float = 300):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.state = 'closed'
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            if self.state in ('open', 'half-open') and now - self.opened_at >= self.cooldown:
+                self.state = 'half-open'
+                self.opened_at = now  # when the trial started
+                return True
+            return self.state == 'closed'
+
+    def remaining(self) -> float:
+        return max(self.opened_at + self.cooldown - time.monotonic(), 0.0)
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.state = 'closed'
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == 'half-open' or self.failures >= self.threshold:
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+
+
+def retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """Parse a ``Retry-After`` header (delta seconds or an HTTP date)."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+def backoff_delay(attempt: int, base: float, cap: float, retry_after: Optional[float] = None) -> float:
+    """Exponential backoff with full jitter; a server's ``Retry-After`` is a lower bound."""
+    delay = random.uniform(0, min(cap, base * 2 ** attempt))
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
@@ -0,0 +1,105 @@
+import math, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+
+class ScheduledJob:
+    def __init__(self, name: str, fn: Callable, interval: Optional[float] = None,
+                 when: Optional[Callable[[], float]] = None, max_lateness: Optional[float] = None):
+        self.name = name
+        self.fn = fn
+        self.interval = interval
+        self.when = when
+        self.max_lateness = max_lateness
+        self.due = when() if when else time.monotonic() + interval
+        self.future = None
+        self.runs = self.skipped = 0
+
+
+class Scheduler:
+    """Deadline-driven job scheduler on one background thread.
+
+    The thread sleeps on a condition until the earliest job is due (or a job
+    is added / shutdown is requested), so an idle scheduler does no work. Due
+    jobs run on a small thread pool, so a slow job never delays the others.
+    A job whose previous run is still going is skipped for that slot (no
+    overlap), and a slot missed by more than ``max_lateness`` is skipped
+    rather than run late; interval jobs then continue on their next slot
+    instead of catching up on every missed one. ``when`` jobs ask a callable
+    for their next due time after each run.
+    """
+
+    def __init__(self, workers: int = 2):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='scheduler')
+        self.jobs: Dict[str, ScheduledJob] = {}
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopping = False
+
+    def every(self, name: str, interval: float, fn: Callable, max_lateness: Optional[float] = None):
+        """Run ``fn`` every ``interval`` seconds, the first time one interval from now."""
+        return self._add(ScheduledJob(name, fn, interval=interval, max_lateness=max_lateness))
+
+    def dynamic(self, name: str, fn: Callable, when: Callable[[], float]):
+        """Run ``fn`` whenever the monotonic time returned by ``when()`` is reached."""
+        return self._add(ScheduledJob(name, fn, when=when))
+
+    def start(self):
+        self._stopping = False
+        self._thread = threading.Thread(target=self._loop, name='scheduler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, wait: bool = True):
+        """Stop dispatching; with ``wait`` let running jobs finish."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+        self.executor.shutdown(wait=wait, cancel_futures=True)
+
+    # -------------- private --------------
+    def _add(self, job):
+        with self._cond:
+            self.jobs[job.name] = job
+            self._cond.notify_all()
+        return job
+
+    def _loop(self):
+        with self._cond:
+            while not self._stopping:
+                job = min(self.jobs.values(), key=lambda j: j.due, default=None)
+                now = time.monotonic()
+                if job is None or job.due > now:
+                    self._cond.wait(None if job is None or math.isinf(job.due) else job.due - now)
+                    continue
+                self._dispatch(job, now)
+
+    def _dispatch(self, job, now):
+        late = now - job.due
+        if job.future is not None and not job.future.done():
+            job.skipped += 1
+            print(f"{job.name} is still running, skipping this run")
+        elif job.max_lateness is not None and late > job.max_lateness:
+            job.skipped += 1
+            print(f"{job.name} is {late:.0f}s late, skipping this run")
+        else:
+            job.runs += 1
+            job.future = self.executor.submit(self._run, job)
+        if job.interval is not None:
+            # next slot after now; missed slots are dropped, not queued up
+            job.due += job.interval * max(math.floor(late / job.interval) + 1, 1)
+        else:
+            job.due = math.inf  # rescheduled by _run when it finishes
+
+    def _run(self, job):
+        try:
+            job.fn()
+        except Exception as e:
+            print(f"Scheduled job {job.name} failed: {e}")
+        finally:
+            if job.when is not None:
+                with self._cond:
+                    job.due = job.when()
+                    self._cond.notify_all()
@@ -1,10 +1,128 @@
+import hashlib, json, multiprocessing, os, threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from textblob import TextBlob
-from typing import Dict
+from typing import Dict, List, Optional
+
+from metrics import get_metrics
+
+
+def _score(text):
+    # module level so it can be pickled into worker processes
+    pol, subj = TextBlob(text).sentiment
+    return pol, subj
+
 
 class SentimentAnalyzer:
+    """TextBlob sentiment behind an LRU cache keyed by a hash of the text.
+
+    ``cache_file`` persists the cache between runs (``save_cache``), and
+    ``analyze_batch`` can score the cache misses of a batch on a process pool.
+    The pool is started on first use (forkserver, or spawn where that is
+    missing, so workers never copy the threads of a running server), reused
+    for later batches and shut down by ``close``. Batches with fewer than
+    ``pool_min_batch`` misses are scored in-process, where the pool does not
+    pay for its round trips.
+    """
+
+    def __init__(self, cache_size: int = 50000, cache_file: Optional[str] = None, workers: int = 0,
+                 pool_min_batch: int = 1000):
+        self.cache_size = cache_size
+        self.cache_file = cache_file
+        self.workers = workers
+        self.pool_min_batch = pool_min_batch
+        self._pool = None
+        self._pool_workers = 0
+        self.cache = OrderedDict()
+        self.hits = self.misses = 0
+        self._lock = threading.Lock()
+        if cache_file:
+            self._load_cache()
+
     def analyze(self, text):
-        blob = TextBlob(text)
-        pol, subj = blob.sentiment.polarity, blob.sentiment.subjectivity
-        return {'polarity' : pol, 'subjectivity' : subj}
-    
-    
\ No newline at end of file
+        return self.analyze_batch([text], workers=0)[0]
+
+    def analyze_batch(self, texts: List[str], workers: Optional[int] = None) -> List[Dict]:
+        keys = [self._key(t) for t in texts]
+        results, missing = {}, {}
+        with self._lock:
+            for key, text in zip(keys, texts):
+                if key in self.cache:
+                    self.cache.move_to_end(key)
+                    results[key] = self.cache[key]
+                    self.hits += 1
+                elif key in missing:
+                    self.hits += 1  # repeated within the batch, scored once
+                else:
+                    missing[key] = text
+                    self.misses += 1
+        metrics = get_metrics()
+        metrics.inc('news_cache_requests_total', len(missing), cache='sentiment', result='miss')
+        metrics.inc('news_cache_requests_total', len(texts) - len(missing), cache='sentiment', result='hit')
+
+        workers = min(self.workers if workers is None else workers, os.cpu_count() or 1)
+        if missing:
+            todo = list(missing.items())
+            if workers > 1 and len(todo) >= max(self.pool_min_batch, 2 * workers):
+                scores = list(self._executor(workers).map(
+                    _score, [t for _, t in todo], chunksize=max(len(todo) // (4 * workers), 1)))
+            else:
+                scores = [_score(t) for _, t in todo]
+            with self._lock:
+                for (key, _), score in zip(todo, scores):
+                    results[key] = score
+                    self._remember(key, score)
+
+        return [{'polarity': results[k][0], 'subjectivity': results[k][1]} for k in keys]
+
+    def save_cache(self):
+        if not self.cache_file:
+            return
+        with self._lock:
+            snapshot = dict(self.cache)
+        os.makedirs(os.path.dirname(os.path.abspath(self.cache_file)), exist_ok=True)
+        tmp = f"{self.cache_file}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(snapshot, f)
+        os.replace(tmp, self.cache_file)
+
+    def close(self):
+        """Shut the worker pool down; a later pooled batch starts a new one."""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown()
+
+    # -------------- private --------------
+    def _executor(self, workers) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is not None and self._pool_workers != workers:
+                self._pool.shutdown(wait=False)
+                self._pool = None
+            if self._pool is None:
+                methods = multiprocessing.get_all_start_methods()
+                ctx = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+                self._pool = ProcessPoolExecutor(max_workers=workers, mp_context=ctx)
+                self._pool_workers = workers
+            return self._pool
+
+    @staticmethod
+    def _key(text):
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    def _remember(self, key, score):
+        if self.cache_size <= 0:
+            return
+        self.cache[key] = score
+        self.cache.move_to_end(key)
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    def _load_cache(self):
+        try:
+            with open(self.cache_file) as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return
+        for key, score in saved.items():
+            self._remember(key, tuple(score))
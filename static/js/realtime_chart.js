@@ -1,17 +1,16 @@
-const url = "/api/stories";
-async function load() {
-  const res = await fetch(url);
-  const data = await res.json();
-
-  // group by evolution_index
-  const grouped = {};
-  data.forEach(a => {
-    const idx = (a.evolution_index === undefined || a.evolution_index === null) ? 0 : a.evolution_index;
-    const k = `${a.source}-${idx}`;
-    if (!grouped[k]) grouped[k] = 0;
-    grouped[k] += 1;
-  });
+const url = "/api/stats/evolution";
+let grouped = {};
 
+function keyOf(source, idx) {
+  return `${source || "unknown"}-${(idx === undefined || idx === null) ? 0 : idx}`;
+}
+
+function bump(k, n) {
+  grouped[k] = (grouped[k] || 0) + n;
+  if (grouped[k] <= 0) delete grouped[k];
+}
+
+function draw() {
   const labels = Object.keys(grouped);
   const values = Object.values(grouped);
 
@@ -29,5 +28,49 @@ async function load() {
     });
   }
 }
-setInterval(load, 60000); // refresh every minute
-load();
+
+async function load() {
+  const res = await fetch(url);
+  const stats = await res.json();
+
+  // counts per source-evolution_index, precomputed by the server
+  grouped = Object.assign({}, stats.by_source_index || {});
+  draw();
+  // the stream event these counts include
+  return res.headers.get("X-Stream-Seq");
+}
+
+function listen(seq) {
+  // deltas pushed by /api/stream as soon as articles are stored, starting right after the
+  // counts just loaded (EventSource cannot send Last-Event-ID on its first connection)
+  const stream = seq === null ? "/api/stream" : `/api/stream?last_id=${encodeURIComponent(seq)}`;
+  const events = new EventSource(stream);
+  events.addEventListener("articles", e => {
+    JSON.parse(e.data).forEach(a => bump(keyOf(a.source, a.evolution_index), 1));
+    draw();
+  });
+  events.addEventListener("updates", e => {
+    JSON.parse(e.data).forEach(u => {
+      if (!("evolution_index" in u.fields)) return;
+      bump(keyOf(u.source, u.previous.evolution_index), -1);
+      bump(keyOf(u.source, u.fields.evolution_index), 1);
+    });
+    draw();
+  });
+  // reconnects resume after the last event id; "reset" means reload and follow from there
+  events.addEventListener("reset", () => {
+    events.close();
+    start();
+  });
+}
+
+async function start() {
+  listen(await load());
+}
+
+if (window.EventSource) {
+  start();
+} else {
+  load();
+  setInterval(load, 60000); // no SSE support: refresh every minute
+}
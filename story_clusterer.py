@@ -0,0 +1,196 @@
+import math, os, threading
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+
+class StoryClusterer:
+    """Online title clustering: hashed term vectors assigned to the nearest centroid.
+
+    Titles are vectorized with a stateless ``HashingVectorizer`` so no vocabulary
+    has to be refitted. Each cluster keeps the sum of its member vectors as a row
+    of a sparse centroid matrix, so a batch of new titles is scored against all
+    centroids with one sparse product. A title joins the most similar cluster if
+    the cosine similarity to its centroid reaches ``threshold``, otherwise it
+    opens a new cluster. Cluster ids are never renumbered; they are persisted as
+    ``topic_cluster`` on the stored articles.
+
+    New vectors are summed into a small ``delta`` matrix that is folded into
+    ``centroids`` once it holds a quarter as many entries, and both grow in
+    blocks of rows, so a sync costs about the size of the new titles rather than
+    a copy of every centroid. With ``path`` the centroids and the last article
+    id they cover are saved every ``checkpoint`` articles; after a restart only
+    the articles stored since are replayed.
+    """
+
+    def __init__(self, threshold: float = 0.4, n_features: int = 2 ** 20, chunk_size: int = 1000,
+                 path: Optional[str] = None, checkpoint: int = 20000):
+        from sklearn.feature_extraction.text import HashingVectorizer
+        from scipy import sparse
+        import numpy as np
+        self.threshold = threshold
+        self.chunk_size = chunk_size
+        self.path = path
+        self.checkpoint = checkpoint
+        self.vectorizer = HashingVectorizer(n_features=n_features, stop_words='english',
+                                            alternate_sign=False, norm='l2')
+        self.centroids = sparse.csr_matrix((0, n_features))  # row = cluster id, sum of members
+        self.delta = sparse.csr_matrix((0, n_features))  # added since the last merge
+        self.norms = np.zeros(0)
+        self.built = 0  # clusters with a centroid row
+        self.next_id = 0
+        self.last_id = -1
+        self.saved_id = -1
+        self.lock = threading.Lock()
+        if path:
+            self._load()
+
+    # -------------- public --------------
+    def assign(self, titles: List[str], labels: Optional[List[Optional[int]]] = None) -> List[int]:
+        """Return a cluster id per title, updating centroids as it goes.
+
+        ``labels`` pins titles that already carry a cluster id (replay).
+        """
+        out = []
+        for lo in range(0, len(titles), self.chunk_size):
+            hi = lo + self.chunk_size
+            X = self.vectorizer.transform(titles[lo:hi])
+            out += self._assign_chunk(X, labels[lo:hi] if labels is not None else None)
+        return out
+
+    def sync(self, store):
+        """Cluster every article stored since the last call; return (articles, cluster ids)."""
+        with self.lock:
+            new = store.since(self.last_id)
+            if not new:
+                return [], []
+            titles = [(a.get('title') or '').strip() for a in new]
+            labels = [a.get('topic_cluster') for a in new]
+            cids = self.assign(titles, labels)
+            self.last_id = new[-1]['id']
+            if self.path and self.last_id - self.saved_id >= self.checkpoint:
+                self._save()
+            return new, cids
+
+    def save(self):
+        if not self.path:
+            return
+        with self.lock:
+            self._save()
+
+    # -------------- private --------------
+    def _assign_chunk(self, X, labels):
+        import numpy as np
+        # best existing centroid per title, as the centroids were at the start of the chunk
+        best_cid = np.full(X.shape[0], -1)
+        best_sim = np.zeros(X.shape[0])
+        if self.built:
+            inv = np.divide(1.0, self.norms, out=np.zeros_like(self.norms), where=self.norms > 0)
+            sims = (X @ self.centroids.T + X @ self.delta.T).multiply(inv[None, :]).tocsr()
+            best_cid = np.asarray(sims.argmax(axis=1)).ravel()
+            best_sim = sims.max(axis=1).toarray().ravel()
+        # clusters opened inside this chunk are tracked in a small inverted index
+        local_post: Dict[int, Dict[int, float]] = defaultdict(dict)
+        local_norm_sq: Dict[int, float] = {}
+        out = []
+        for i in range(X.shape[0]):
+            label = labels[i] if labels is not None else None
+            feats = X.indices[X.indptr[i]:X.indptr[i + 1]]
+            vals = X.data[X.indptr[i]:X.indptr[i + 1]]
+            local_dots: Dict[int, float] = defaultdict(float)
+            for f, v in zip(feats, vals):
+                for cid, w in local_post.get(f, {}).items():
+                    local_dots[cid] += v * w
+            if label is None:
+                best = self.threshold
+                if best_sim[i] >= best and best_cid[i] < self.built:
+                    label, best = int(best_cid[i]), best_sim[i]
+                for cid, dot in local_dots.items():
+                    sim = dot / math.sqrt(local_norm_sq[cid])
+                    if sim >= best:
+                        label, best = cid, sim
+                if label is None:
+                    label = self.next_id
+            if label >= self.built:
+                # a cluster this process has not built a centroid for yet
+                local_norm_sq[label] = local_norm_sq.get(label, 0.0) + 2 * local_dots.get(label, 0.0) \
+                    + float(np.dot(vals, vals))
+                for f, v in zip(feats, vals):
+                    local_post[f][label] = local_post[f].get(label, 0.0) + float(v)
+            self.next_id = max(self.next_id, label + 1)
+            out.append(label)
+        self._fold(X, out)
+        return out
+
+    def _fold(self, X, labels):
+        """Add the chunk's vectors into their centroid rows."""
+        from scipy import sparse
+        import numpy as np
+        k = self.next_id
+        if self.centroids.shape[0] < k:
+            # grow in blocks; resizing a CSR matrix only extends its row pointers
+            rows = max(k, 2 * self.centroids.shape[0], 64)
+            self.centroids.resize((rows, X.shape[1]))
+            self.delta.resize((rows, X.shape[1]))
+            self.norms = np.concatenate([self.norms, np.zeros(rows - len(self.norms))])
+        rows = self.centroids.shape[0]
+        assign = sparse.csr_matrix((np.ones(len(labels)), (labels, np.arange(len(labels)))),
+                                   shape=(rows, X.shape[0]))
+        self.delta = (self.delta + assign @ X).tocsr()
+        if self.delta.nnz * 4 > self.centroids.nnz:
+            self.centroids = (self.centroids + self.delta).tocsr()
+            self.delta = sparse.csr_matrix((rows, X.shape[1]))
+        touched = np.unique(labels)
+        sums = self.centroids[touched] + self.delta[touched]
+        self.norms[touched] = np.sqrt(np.asarray(sums.multiply(sums).sum(axis=1)).ravel())
+        self.built = k
+
+    def _save(self):
+        from scipy import sparse
+        import numpy as np
+        merged = (self.centroids + self.delta).tocsr()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, 'wb') as f:
+            np.savez(f, data=merged.data, indices=merged.indices, indptr=merged.indptr,
+                     shape=np.array(merged.shape), norms=self.norms,
+                     ids=np.array([self.built, self.next_id, self.last_id]))
+        os.replace(tmp, self.path)
+        self.centroids = merged
+        self.delta = sparse.csr_matrix(merged.shape)
+        self.saved_id = self.last_id
+
+    def _load(self):
+        from scipy import sparse
+        import numpy as np
+        try:
+            with np.load(self.path) as state:
+                shape = tuple(int(n) for n in state['shape'])
+                if shape[1] != self.centroids.shape[1]:
+                    return  # hashed with another number of features
+                centroids = sparse.csr_matrix((state['data'], state['indices'], state['indptr']),
+                                              shape=shape)
+                norms = state['norms']
+                built, next_id, last_id = (int(n) for n in state['ids'])
+        except (OSError, ValueError, KeyError):
+            return
+        self.centroids, self.norms = centroids, norms
+        self.delta = sparse.csr_matrix(shape)
+        self.built, self.next_id = built, next_id
+        self.last_id = self.saved_id = last_id
+
+
+_clusterers: Dict[tuple, StoryClusterer] = {}
+_clusterers_lock = threading.Lock()
+
+
+def get_clusterer(store, threshold: float = 0.4) -> StoryClusterer:
+    """Process-wide clusterer per store, so centroids survive between requests.
+
+    The centroids are saved next to the store's segments, one file per threshold.
+    """
+    key = (store.path, threshold)
+    with _clusterers_lock:
+        if key not in _clusterers:
+            _clusterers[key] = StoryClusterer(
+                threshold=threshold, path=os.path.join(store.directory, f'clusters-{threshold:g}.npz'))
+        return _clusterers[key]
@@ -0,0 +1,217 @@
+import bisect, hashlib, json, os, re, threading
+from typing import Dict, List, Optional
+
+from article_store import timestamp
+
+
+def url_fingerprint(url: str) -> str:
+    """Story key of a URL: MD5 of the URL without scheme and query string."""
+    slug = re.sub(r"https?://", "", url or "").split('?')[0]
+    return hashlib.md5(slug.encode()).hexdigest()
+
+
+class StoryIndex:
+    """Secondary indexes over the store, maintained on insert.
+
+    ``fingerprints`` maps a URL fingerprint to its snapshots as ``[time, id]``
+    pairs in time order, ``sources`` and ``clusters`` map a source or
+    ``topic_cluster`` to ids, and ``times`` is every ``[time, id]`` sorted, so
+    a story, a cluster or a time range is found in O(log n + k). ``pending``
+    holds the snapshots still waiting for an ``evolution_index``. The index
+    follows store events and is saved to ``path`` (atomic JSON) together with
+    the store log position it covers; on start it only reads the lines
+    appended since (``ArticleStore.log_since``). That replay is what makes
+    ``checkpoint`` cheap: it only rewrites the file once enough store lines
+    were applied since the last save.
+    """
+
+    def __init__(self, store, path: Optional[str] = None):
+        self.store = store
+        self.path = path
+        self._lock = threading.RLock()
+        self._generation = 0
+        self._unsaved = 0  # store lines applied since the last save
+        self._clear()
+        if path:
+            self._load()
+        self._stale = True
+        store.subscribe(self._on_event, replay=False)
+
+    def _clear(self):
+        self.fingerprints: Dict[str, List[List]] = {}
+        self.sources: Dict[str, List[int]] = {}
+        self.clusters: Dict[int, List[int]] = {}
+        self.times: List[List] = []
+        self.pending: Dict[int, str] = {}  # id -> fingerprint of snapshots without evolution_index
+        self.position = None
+        self._time_of: Dict[int, float] = {}
+        self._cluster_of: Dict[int, int] = {}
+
+    # -------------- public --------------
+    def timeline(self, fingerprint: str) -> List[int]:
+        """Ids of a story's snapshots, oldest first."""
+        self._sync()
+        with self._lock:
+            return [i for _, i in self.fingerprints.get(fingerprint, [])]
+
+    def chains(self) -> Dict[str, List[int]]:
+        """Every story's snapshot ids, oldest first, by fingerprint."""
+        self._sync()
+        with self._lock:
+            return {fp: [i for _, i in chain] for fp, chain in self.fingerprints.items()}
+
+    def unnumbered(self) -> Dict[str, int]:
+        """Stories with snapshots that have no ``evolution_index`` yet -> chain position of the first."""
+        self._sync()
+        with self._lock:
+            first: Dict[str, int] = {}
+            for art_id, fp in self.pending.items():
+                pos = bisect.bisect_left(self.fingerprints[fp], [self._time_of[art_id], art_id])
+                first[fp] = min(pos, first.get(fp, pos))
+            return first
+
+    def by_source(self, source: str) -> List[int]:
+        self._sync()
+        with self._lock:
+            return list(self.sources.get(source, []))
+
+    def cluster(self, cid: int) -> List[int]:
+        """Ids of a topic cluster's articles, oldest first."""
+        self._sync()
+        with self._lock:
+            return sorted(self.clusters.get(cid, []), key=lambda i: (self._time_of.get(i, 0.0), i))
+
+    def order(self, ids: List[int]) -> List[int]:
+        """``ids`` oldest first by their indexed time."""
+        self._sync()
+        with self._lock:
+            return sorted(ids, key=lambda i: (self._time_of.get(i, 0.0), i))
+
+    def between(self, start: Optional[float] = None, end: Optional[float] = None) -> List[int]:
+        """Ids of articles timed in ``[start, end)`` (epoch seconds), oldest first."""
+        self._sync()
+        with self._lock:
+            lo = 0 if start is None else bisect.bisect_left(self.times, [start, -1])
+            hi = len(self.times) if end is None else bisect.bisect_left(self.times, [end, -1])
+            return [i for _, i in self.times[lo:hi]]
+
+    def save(self):
+        if not self.path:
+            return
+        self._catch_up()
+        with self._lock:
+            state = {'position': self.position, 'fingerprints': self.fingerprints,
+                     'sources': self.sources, 'clusters': self.clusters, 'times': self.times,
+                     'pending': self.pending}
+            tmp = f"{self.path}.tmp"
+            with open(tmp, 'w') as f:
+                json.dump(state, f)
+            os.replace(tmp, self.path)
+            self._unsaved = 0
+
+    def checkpoint(self, min_lines: int):
+        """``save`` once at least ``min_lines`` store lines were applied since the last save."""
+        if self._unsaved >= min_lines:
+            self.save()
+
+    # -------------- maintenance --------------
+    # the store lock is taken before ours (events arrive under it), never inside it
+    def _sync(self):
+        self.store.refresh()  # delivers other processes' writes as events
+        if self._stale:
+            self._catch_up()
+
+    def _catch_up(self):
+        """Apply the store lines written since ``position``; re-applying one is harmless."""
+        with self._lock:
+            position, generation = self.position, self._generation
+        end, parts = self.store.log_since(position)
+        with self._lock:
+            if generation != self._generation:
+                return  # the store reloaded meanwhile; the next lookup starts over
+            for _, _, lines in parts:
+                for obj in lines:
+                    if '_patch' in obj:
+                        self._patched(obj['_patch'], obj.get('fields', {}))
+                    else:
+                        self._add(obj)
+                    self._unsaved += 1
+            self.position = end
+            self._stale = False
+
+    def _on_event(self, event, payload):
+        with self._lock:
+            if event == 'reset':
+                self._clear()
+                self._generation += 1
+                self._stale = True  # rebuilt from the log on the next lookup
+            elif event == 'add':
+                for rec in payload:
+                    self._add(rec)
+                self._unsaved += len(payload)
+            elif event == 'update':
+                for rec, old in payload:
+                    self._patched(rec['id'], {k: rec.get(k) for k in old})
+                self._unsaved += len(payload)
+
+    def _add(self, rec):
+        art_id = rec['id']
+        if art_id in self._time_of:
+            # seen before; a compacted segment carries its patches folded in
+            self._patched(art_id, {k: rec[k] for k in ('topic_cluster', 'evolution_index') if k in rec})
+            return
+        ts = timestamp(rec)
+        self._time_of[art_id] = ts
+        fp = url_fingerprint(rec.get('url'))
+        bisect.insort(self.fingerprints.setdefault(fp, []), [ts, art_id])
+        if rec.get('evolution_index') is None:
+            self.pending[art_id] = fp
+        bisect.insort(self.times, [ts, art_id])
+        bisect.insort(self.sources.setdefault(rec.get('source') or 'unknown', []), art_id)
+        if rec.get('topic_cluster') is not None:
+            self._set_cluster(art_id, rec['topic_cluster'])
+
+    def _patched(self, art_id, fields):
+        if 'topic_cluster' in fields and fields['topic_cluster'] != self._cluster_of.get(art_id):
+            self._set_cluster(art_id, fields['topic_cluster'])
+        if fields.get('evolution_index') is not None:
+            self.pending.pop(art_id, None)
+
+    def _set_cluster(self, art_id, cid):
+        old = self._cluster_of.pop(art_id, None)
+        if old is not None:
+            ids = self.clusters[old]
+            del ids[bisect.bisect_left(ids, art_id)]
+            if not ids:
+                del self.clusters[old]
+        if cid is not None:
+            self._cluster_of[art_id] = cid
+            bisect.insort(self.clusters.setdefault(cid, []), art_id)
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+            self.fingerprints = state['fingerprints']
+            self.sources = state['sources']
+            self.clusters = {int(k): v for k, v in state['clusters'].items()}
+            self.times = state['times']
+            self.pending = {int(k): v for k, v in state['pending'].items()}
+            self.position = state['position']
+        except (OSError, ValueError, KeyError):
+            self._clear()
+            return
+        self._time_of = {i: ts for ts, i in self.times}
+        self._cluster_of = {i: cid for cid, ids in self.clusters.items() for i in ids}
+
+
+_indexes: Dict[str, StoryIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_story_index(store) -> StoryIndex:
+    """Process-wide index per store, saved next to the store's segments."""
+    with _indexes_lock:
+        if store.path not in _indexes:
+            _indexes[store.path] = StoryIndex(store, os.path.join(store.directory, 'index.json'))
+        return _indexes[store.path]
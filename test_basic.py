@@ -1,3 +1,6 @@
+import pytest
+
+
 def test_sentiment():
     from sentiment_analyzer import SentimentAnalyzer
     s = SentimentAnalyzer().analyze("Great Success")
@@ -7,4 +10,942 @@ def test_bias():
     from bias_detector import BiasDetector
     from configuration import Config
     dummy = {"title": "Shocking truth revealed", "description": ""}
-    assert BiasDetector(Config()).detect_bias(dummy) > 0
\ No newline at end of file
+    assert BiasDetector(Config()).detect_bias(dummy) > 0
+
+def test_collector_slow_provider_does_not_block_others():
+    from configuration import Config
+    from news_collector import NewsCollector
+    from benchmarks.fake_provider import FakeProviderServer
+    with FakeProviderServer(latency={'newsapi': 1.0}, pages=2, per_page=3) as server:
+        cfg = server.configure(Config())
+        cfg.PROVIDER_TIMEOUTS = {'newsapi': 0.2, 'newsdata': 5, 'thenewsapi': 5}
+        cfg.PROVIDER_CURSOR_FILE = None
+        collector = NewsCollector(cfg)
+        arts = collector.collect_latest_news()
+        collector.close()
+    urls = {a['url'] for a in arts}
+    assert not any('/newsapi/' in u for u in urls)
+    assert len(urls) == 2 * 3 + 2 * 3
+    assert 'newsapi' not in collector.cursors.state
+
+
+def test_article_store_append_update_reload(tmp_path):
+    from article_store import ArticleStore
+    path = str(tmp_path / "articles.jsonl")
+    store = ArticleStore(path)
+    a = {"url": "u1", "title": "t", "description": "", "published_at": "2024-01-01"}
+    b = {"url": "u2", "title": "t2", "description": "", "published_at": "2024-01-02"}
+    assert len(store.add([a, b])) == 2
+    assert store.add([dict(a)]) == []
+    assert len(store.add([dict(a, title="t changed")], snapshots=True)) == 1
+    store.update({a["id"]: {"evolution_index": 0}})
+
+    other = ArticleStore(path)
+    assert [x["url"] for x in other.all()] == ["u1", "u2", "u1"]
+    assert other.get(a["id"])["evolution_index"] == 0
+    store.add([{"url": "u3", "title": "", "description": "", "published_at": None}])
+    assert len(other.all()) == 4
+
+
+def test_article_store_imports_legacy_json(tmp_path):
+    import json
+    from article_store import ArticleStore
+    legacy = tmp_path / "articles.json"
+    legacy.write_text(json.dumps([{"url": "u1", "title": "t"}]))
+    store = ArticleStore(str(tmp_path / "articles.jsonl"), legacy_path=str(legacy))
+    assert store.latest("u1")["id"] == 0
+
+
+def test_online_title_clusters_are_stable(tmp_path, monkeypatch):
+    import story_clusterer
+    from article_store import ArticleStore
+    from evolution_tracker import EvolutionTracker
+    store = ArticleStore(str(tmp_path / "articles.jsonl"))
+    def art(i, title):
+        return {"url": f"u{i}", "title": title, "description": "",
+                "published_at": f"2024-01-0{i}", "fetched_at": ""}
+    store.add([art(1, "Court ruling on college admissions"),
+               art(2, "Senate budget vote delayed again")])
+    tracker = EvolutionTracker(store)
+    tracker.build_timeline_by_title_similarity()
+    before = {a["url"]: a["topic_cluster"] for a in store.all()}
+    assert before["u1"] != before["u2"]
+
+    store.add([art(3, "Court ruling reshapes college admissions")])
+    tracker.build_timeline_by_title_similarity()
+    after = {a["url"]: a for a in store.all()}
+    assert {u: after[u]["topic_cluster"] for u in before} == before
+    assert after["u3"]["topic_cluster"] == before["u1"]
+    assert after["u3"]["evolution_index"] == 1
+
+    # an older member is inserted in front; the order comes from the story index, and only the
+    # renumbered records are read (by the update itself)
+    store.add([art(0, "College admissions court ruling appealed")])
+    reads, get = [], store.get
+    monkeypatch.setattr(store, "get", lambda art_id: reads.append(art_id) or get(art_id))
+    tracker.build_timeline_by_title_similarity()
+    monkeypatch.undo()
+    assert sorted(reads) == [0, 2, 3]
+    assert [store.latest(f"u{i}")["evolution_index"] for i in (0, 1, 3)] == [0, 1, 2]
+
+    # after a restart the already numbered articles are replayed without any store write
+    monkeypatch.setattr(story_clusterer, "_clusterers", {})
+    version = store.version
+    tracker.build_timeline_by_title_similarity()
+    assert store.version == version
+
+
+def test_story_clusterer_saves_centroids_and_replays_only_new_articles(tmp_path):
+    from article_store import ArticleStore
+    from story_clusterer import StoryClusterer
+    store = ArticleStore(str(tmp_path / "articles.jsonl"))
+    titles = ["Court ruling on college admissions", "Senate budget vote delayed again",
+              "Storm floods coastal towns", "Court ruling reshapes college admissions"]
+    store.add([{"url": f"u{i}", "title": t} for i, t in enumerate(titles)])
+    path = str(tmp_path / "clusters.npz")
+    clusterer = StoryClusterer(path=path, checkpoint=2, chunk_size=2)
+    _, cids = clusterer.sync(store)
+    assert cids[0] == cids[3] and len(set(cids)) == 3
+    store.update({i: {"topic_cluster": c} for i, c in enumerate(cids)})
+
+    store.add([{"url": "u4", "title": "Senate budget vote delayed once more"}])
+    since, restarted = [], StoryClusterer(path=path)
+    assert restarted.last_id == 3
+    real = store.since
+    store.since = lambda after: since.append(after) or real(after)
+    new, more = restarted.sync(store)
+    assert since == [3] and [a["url"] for a in new] == ["u4"] and more == [cids[1]]
+    fresh = StoryClusterer()
+    assert fresh.assign(titles + ["Senate budget vote delayed once more"])[-1] == more[0]
+
+
+def _dense_outlier_scores(titles):
+    # the original _manipulation_score_advanced: dense n x n cosine similarity
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.metrics.pairwise import cosine_similarity
+    return 1 - cosine_similarity(TfidfVectorizer().fit_transform(titles)).mean(axis=1)
+
+
+def test_outlier_scorer_matches_dense_scores():
+    import numpy as np
+    from outlier_scorer import OutlierScorer
+    from benchmarks.synthetic import make_articles
+    titles = [a["title"] for a in make_articles(300)] + ["", "a", "Totally unrelated headline"]
+    assert np.allclose(OutlierScorer().score(titles), _dense_outlier_scores(titles))
+
+
+def test_outlier_scorer_rolling_reference():
+    import numpy as np
+    from outlier_scorer import OutlierScorer
+    from benchmarks.synthetic import make_articles
+    titles = [a["title"] for a in make_articles(200)]
+    scorer = OutlierScorer(window=150)
+    scorer.score(titles[:120])
+    got = scorer.score(titles[120:])
+    assert np.allclose(got, _dense_outlier_scores(titles[:200])[120:])
+    assert len(scorer.reference) == 150
+
+
+def test_sentiment_batch_cache_roundtrip(tmp_path):
+    from sentiment_analyzer import SentimentAnalyzer
+    path = str(tmp_path / "cache.json")
+    texts = ["Great Success", "Terrible failure", "Great Success"]
+    s = SentimentAnalyzer(cache_file=path)
+    first = s.analyze_batch(texts)
+    assert first[0] == first[2] == s.analyze("Great Success")
+    assert (s.hits, s.misses) == (2, 2)
+    s.save_cache()
+
+    warm = SentimentAnalyzer(cache_file=path)
+    assert warm.analyze_batch(texts) == first
+    assert warm.misses == 0
+
+
+def test_sentiment_pool_is_reused_and_skipped_for_small_batches(monkeypatch):
+    import sentiment_analyzer
+    from sentiment_analyzer import SentimentAnalyzer
+    monkeypatch.setattr(sentiment_analyzer.os, "cpu_count", lambda: 4)
+    texts = [f"story {i} is good" for i in range(8)] + [f"story {i} is bad" for i in range(8)]
+    serial = SentimentAnalyzer().analyze_batch(texts)
+    s = SentimentAnalyzer(workers=2, pool_min_batch=8)
+    assert s.analyze_batch(texts[:4]) == serial[:4] and s._pool is None  # too small for the pool
+    try:
+        assert s.analyze_batch(texts[4:12]) == serial[4:12]
+        pool = s._pool
+        assert pool is not None and s._pool_workers == 2
+        more = [f"another {i} fine story" for i in range(8)]
+        assert s.analyze_batch(texts[12:] + more)[:4] == serial[12:] and s.misses == 4 + 8 + 12
+        assert s._pool is pool  # started once, reused
+    finally:
+        s.close()
+    assert s._pool is None
+
+
+@pytest.mark.parametrize("backend", ["automaton", "regex"])
+def test_keyword_matcher_matches_substring_loops(backend, monkeypatch):
+    import bias_detector
+    from bias_detector import BiasDetector
+    from configuration import Config
+    from benchmarks.synthetic import make_articles
+    if backend == "regex":
+        monkeypatch.setattr(bias_detector, "ahocorasick", None)
+    elif bias_detector.ahocorasick is None:
+        pytest.skip("pyahocorasick not installed")
+    cfg = Config()
+    cfg.KEYWORDS_FILE = None
+    detector = BiasDetector(cfg)
+    arts = make_articles(200) + [{"title": "SHOCKING truth: Top secret exposed", "description": "stop"}]
+    for art, (hits, title_hits) in zip(arts, detector.keyword_hits_batch(arts)):
+        text = f"{art['title']} {art['description']}".lower()
+        for cat, words in cfg.BIAS_KEYWORDS.items():
+            assert hits[cat] == len({w.lower().replace("’", "'") for w in words if w.lower() in text.replace("’", "'")})
+        title = art["title"].lower()
+        assert title_hits["title_clickbait"] == sum(w in title for w in cfg.CLICKBAIT_WORDS)
+
+
+def test_bias_keywords_hot_reload(tmp_path):
+    import json
+    from bias_detector import BiasDetector
+    from configuration import Config
+    cfg = Config()
+    cfg.KEYWORDS_FILE = str(tmp_path / "keywords.json")
+    cfg.KEYWORDS_RELOAD_INTERVAL = 0
+    detector = BiasDetector(cfg)
+    art = {"title": "Quarterly zorblax report", "description": ""}
+    assert detector.detect_bias(art) == 0
+    (tmp_path / "keywords.json").write_text(json.dumps({"inflammatory": ["zorblax"]}))
+    assert detector.detect_bias(art) == 1.5
+
+
+def test_analysis_pipeline_columns():
+    import numpy as np
+    from configuration import Config
+    from analysis_pipeline import AnalysisPipeline
+    from benchmarks.synthetic import make_articles
+    cfg = Config()
+    cfg.SENTIMENT_CACHE_FILE = None
+    cfg.KEYWORDS_FILE = None
+    pipeline = AnalysisPipeline(cfg)
+    arts = make_articles(50)
+    res = pipeline.run(arts)
+    assert len(res) == 50 and res.outlier_score.shape == (50,)
+    for i, art in enumerate(arts):
+        sent = pipeline.sentiment_analyzer.analyze(f"{art['title']} {art['description']}")
+        hits, title_hits = pipeline.bias_detector.keyword_hits(art)
+        expected = (2 if abs(sent["polarity"]) >= 0.7 else 0) + (1.5 if sent["subjectivity"] >= 0.8 else 0)
+        expected = min(expected + pipeline.bias_detector.bias_score(hits) + title_hits["title_clickbait"], 10)
+        assert res.manipulation_score[i] == expected
+        assert res.is_high_manipulation[i] == (expected > cfg.MANIPULATION_THRESHOLD)
+    assert np.all(res.bias_hits["clickbait"] >= 0)
+    analyzed = pipeline.analyze(arts[:2])
+    assert isinstance(analyzed[0]["analysis"]["is_high_manipulation"], bool)
+    # a one-article tail batch is scored against the earlier batches, not only itself
+    assert pipeline.run(make_articles(1, seed=7)).outlier_score[0] > 0
+
+
+def test_outlier_window_is_kept_per_topic():
+    import numpy as np
+    from configuration import Config
+    from analysis_pipeline import AnalysisPipeline
+    cfg = Config()
+    cfg.SENTIMENT_CACHE_FILE = None
+    cfg.KEYWORDS_FILE = None
+    cfg.OUTLIER_REFERENCE_WINDOW = 100
+    pipeline = AnalysisPipeline(cfg)
+    tech = [{"title": f"Chip maker ships faster processor {i}", "description": ""} for i in range(5)]
+    sports = [{"title": f"Striker scores late winner in derby {i}", "description": ""} for i in range(5)]
+    pipeline.run(tech, topic="tech")
+    pipeline.run(sports, topic="sports")
+    assert len(pipeline.outlier_scorer("tech").reference) == 5
+    assert len(pipeline.outlier_scorer("sports").reference) == 5
+    # a tech title is ordinary next to tech titles only
+    probe = [{"title": "Chip maker ships faster processor", "description": ""}]
+    in_topic = pipeline.run(probe, topic="tech").outlier_score[0]
+    assert in_topic < pipeline.run(probe, topic="sports").outlier_score[0]
+
+    # scoring without remembering leaves the window alone
+    scorer = pipeline.outlier_scorer("tech")
+    before = list(scorer.reference)
+    got = scorer.score(["Striker scores late winner"], remember=False)
+    assert list(scorer.reference) == before and np.all(got > 0)
+
+
+def test_job_queue_coalesces_and_serialises():
+    import threading
+    from job_queue import JobQueue
+    queue = JobQueue()
+    release, running = threading.Event(), []
+    def work(tag):
+        running.append(tag)
+        release.wait(5)
+        return tag
+    first, created = queue.submit("parse:url", work, "a")
+    again, created_again = queue.submit("parse:url", work, "b")
+    other, _ = queue.submit("monitor_cycle", work, "c")
+    assert created and not created_again and again is first
+    assert queue.depth() == 2
+    release.set()
+    assert first.done.wait(5) and other.done.wait(5)
+    assert first.result == "a" and queue.get(other.id).status == "done"
+    assert running == ["a", "c"]
+    queue.shutdown()
+
+
+def test_stories_etag_filters_and_cursor(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    from configuration import Config
+    from article_store import get_store
+    from web.app import create_app
+    store = get_store()
+    store.add([{"url": f"u{i}", "title": f"t{i}", "source": "A" if i % 2 else "B",
+                "fetched_at": f"2024-01-0{i + 1}"} for i in range(5)])
+    client = create_app(Config()).test_client()
+
+    full = client.get("/api/stories")
+    assert [a["url"] for a in full.json] == [f"u{i}" for i in range(5)]
+    etag = full.headers["ETag"]
+    assert client.get("/api/stories", headers={"If-None-Match": etag}).status_code == 304
+
+    page = client.get("/api/stories?limit=2")
+    assert [a["id"] for a in page.json] == [0, 1] and page.headers["X-Next-Cursor"] == "1"
+    rest = client.get("/api/stories?limit=2&cursor=1")
+    assert [a["id"] for a in rest.json] == [2, 3]
+    assert [a["url"] for a in client.get("/api/stories?source=A&since=2024-01-03").json] == ["u3"]
+
+    store.add([{"url": "u9", "title": "new"}])
+    fresh = client.get("/api/stories", headers={"If-None-Match": etag})
+    assert fresh.status_code == 200 and len(fresh.json) == 6
+
+
+def test_evolution_stats_follow_store(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    from collections import Counter
+    from configuration import Config
+    from article_store import ArticleStore, get_store
+    from web.app import create_app
+    store = get_store()
+    store.add([{"url": f"u{i}", "title": f"t{i}", "source": "A" if i % 2 else "B",
+                "fetched_at": f"2024-01-01T0{i}:30"} for i in range(3)])
+    client = create_app(Config()).test_client()
+    first = client.get("/api/stats/evolution")
+    assert first.json["by_source_index"] == {"B-0": 2, "A-0": 1}
+    assert client.get("/api/stats/evolution",
+                      headers={"If-None-Match": first.headers["ETag"]}).status_code == 304
+
+    store.update({0: {"evolution_index": 1, "topic_cluster": 7}})
+    writer = ArticleStore(store.path)  # another process appending to the same file
+    writer.add([{"url": f"w{i}", "title": "w", "source": "C",
+                 "fetched_at": "2024-01-02T10:00"} for i in range(2)])
+
+    stats = client.get("/api/stats/evolution").json
+    records = store.all()
+    assert len(records) == 5 and stats["total"] == 5
+    assert stats["by_source_index"] == dict(Counter(
+        f"{a['source']}-{a.get('evolution_index') or 0}" for a in records))
+    assert stats["by_cluster"] == {"7": 1}
+    assert stats["by_bucket"] == {"2024-01-01T00": 1, "2024-01-01T01": 1, "2024-01-01T02": 1,
+                                  "2024-01-02T10": 2}
+
+    # a stream opened after the counts' position delivers exactly the later changes
+    seq = int(client.get("/api/stats/evolution").headers["X-Stream-Seq"])
+    store.add([{"url": "u9", "title": "t9", "source": "A"}])
+    stream = client.get(f"/api/stream?last_id={seq}")
+    chunks = stream.response
+    assert next(chunks).startswith(b"retry:")
+    assert next(chunks).startswith(f"id: {seq + 1}\nevent: articles".encode())
+    stream.close()
+
+
+def test_store_keeps_old_days_cold(tmp_path, monkeypatch):
+    import os
+    from article_store import ArticleStore
+    path = str(tmp_path / "articles.jsonl")
+    store = ArticleStore(path, hot_days=2, cold_cache=1)
+    day = ["2024-01-01"]
+    monkeypatch.setattr(store, "_today", lambda: day[0])
+    store.add([{"url": "u0", "title": "a"}, {"url": "u1", "title": "b"}])
+    store.update({0: {"evolution_index": 1}})
+    for d, url in (("2024-01-02", "u2"), ("2024-01-03", "u3")):
+        day[0] = d
+        store.add([{"url": url, "title": url}])
+
+    assert [a["url"] for a in store.all()] == ["u2", "u3"]  # 2024-01-01 went cold
+    assert len(store) == 4 and store.get(0)["evolution_index"] == 1
+    assert [a["url"] for a in store.history()] == ["u0", "u1", "u2", "u3"]
+    assert [a["id"] for a in store.since(0)] == [1, 2, 3]
+    assert store.add([{"url": "u1", "title": "b"}]) == []  # cold URLs still dedupe
+    store.update({1: {"topic_cluster": 5}})
+
+    reopened = ArticleStore(path, hot_days=2)
+    assert os.path.exists(str(tmp_path / "articles" / "2024-01-01.summary.json"))
+    assert [a["url"] for a in reopened.all()] == ["u2", "u3"]
+    assert reopened.get(1)["topic_cluster"] == 5 and reopened.latest("u0")["id"] == 0
+
+
+def test_story_index_lookups_and_endpoints(tmp_path, monkeypatch):
+    import json
+    monkeypatch.chdir(tmp_path)
+    from configuration import Config
+    from article_store import ArticleStore, get_store
+    from story_index import StoryIndex, get_story_index, timestamp, url_fingerprint
+    from web.app import create_app
+    store = get_store()
+    store.add([{"url": "https://a.com/x?utm=1", "title": "v1", "source": "A",
+                "published_at": "2024-01-02T00:00:00Z"},
+               {"url": "https://b.com/y", "title": "y", "source": "B",
+                "published_at": "2024-01-01 12:00:00"}])
+    store.add([{"url": "https://a.com/x", "title": "v0", "source": "A",
+                "published_at": "2024-01-01T06:00:00.000000Z"}])
+    index = get_story_index(store)
+    fp = url_fingerprint("http://a.com/x")
+    assert index.timeline(fp) == [2, 0]  # by time, not by id
+    store.update({0: {"topic_cluster": 3}, 1: {"topic_cluster": 3}})
+    assert index.cluster(3) == [1, 0] and index.by_source("A") == [0, 2]
+    assert index.between(timestamp({"published_at": "2024-01-01T10:00"}),
+                         timestamp({"published_at": "2024-01-02"})) == [1]
+    index.save()
+    store.update({1: {"topic_cluster": 4}})
+    index.checkpoint(2)  # one line since the save: the replay on start covers it
+    with open(index.path) as f:
+        assert json.load(f)["clusters"] == {"3": [0, 1]}
+
+    reloaded = StoryIndex(ArticleStore(store.path), index.path)
+    assert reloaded.cluster(3) == [0] and reloaded.cluster(4) == [1]
+    assert reloaded.timeline(fp) == [2, 0]
+
+    client = create_app(Config()).test_client()
+    timeline = client.get(f"/api/stories/{fp}/timeline").json
+    assert [a["title"] for a in timeline["snapshots"]] == ["v0", "v1"]
+    assert client.get("/api/clusters/4").json["articles"][0]["id"] == 1
+    assert client.get("/api/clusters/9").status_code == 404
+
+
+def test_url_timeline_numbers_new_snapshots_incrementally(tmp_path):
+    from article_store import ArticleStore
+    from evolution_tracker import EvolutionTracker
+    store = ArticleStore(str(tmp_path / "articles.jsonl"))
+    tracker = EvolutionTracker(store)
+    def snap(title, published):
+        return {"url": "https://a.com/x", "title": title, "published_at": published}
+    store.add([snap("b", "2024-01-02T00:00:00Z"), snap("d", "2024-01-04 00:00:00")], snapshots=True)
+    tracker.build_timeline()
+    store.add([snap("e", "2024-01-05T00:00:00.000000Z")], snapshots=True)
+    tracker.build_timeline()
+    assert store.version == 6  # appended at the end: only the new snapshot was patched
+    store.add([snap("c", "2024-01-03T00:00:00+00:00")], snapshots=True)
+    tracker.build_timeline()
+    order = sorted(store.all(), key=lambda a: a["evolution_index"])
+    assert [a["title"] for a in order] == ["b", "c", "d", "e"]
+    assert order[1]["published_ts"] == 1704240000.0
+    tracker.build_timeline(incremental=False)
+    assert [a["evolution_index"] for a in store.all()] == [0, 2, 3, 1]
+
+
+def test_story_feed_pushes_deltas_and_resumes(tmp_path):
+    import json, threading
+    from article_store import ArticleStore
+    from web.story_feed import StoryFeed
+    store = ArticleStore(str(tmp_path / "articles.jsonl"))
+    store.add([{"url": "old", "title": "already stored"}])
+    feed = StoryFeed(store, backlog=3, poll_interval=0.05)
+
+    def events(last_id, n):
+        stop = threading.Event()
+        chunks = feed.listen(last_id, stop)
+        assert next(chunks).startswith("retry:")
+        out = []
+        for chunk in chunks:
+            if not chunk.startswith(":"):
+                lines = dict(l.split(": ", 1) for l in chunk.strip().split("\n"))
+                out.append((int(lines["id"]), lines["event"], json.loads(lines["data"])))
+            if len(out) == n:
+                stop.set()
+                return out
+
+    store.add([{"url": "u1", "title": "t1", "source": "A"}])
+    store.update({1: {"evolution_index": 2}})
+    got = events(0, 2)
+    assert [e[1] for e in got] == ["articles", "updates"]
+    assert [a["url"] for a in got[0][2]] == ["u1"]
+    assert got[1][2] == [{"id": 1, "source": "A", "fields": {"evolution_index": 2},
+                          "previous": {"evolution_index": None}}]
+    assert events(1, 1)[0][1] == "updates"
+
+    store.add([{"url": f"x{i}", "title": "x"} for i in range(3)])
+    store.update({2: {"topic_cluster": 1}, 3: {"topic_cluster": 1}})
+    assert events(0, 1)[0][1] == "reset"  # the early events were evicted
+
+
+def test_cycle_skips_unchanged_articles_before_analysis(tmp_path):
+    from configuration import Config
+    from article_store import ArticleStore
+    from analysis_pipeline import AnalysisPipeline
+    from collection_cycle import CollectionCycle
+    from fingerprint_index import FingerprintIndex
+    from topics import TopicRegistry
+    cfg = Config()
+    cfg.SENTIMENT_CACHE_FILE = cfg.KEYWORDS_FILE = cfg.TOPICS_FILE = cfg.NEAR_DUPLICATE_FILE = None
+    batch = [{"url": f"u{i}", "title": f"Title {i}", "description": "", "published_at": "2024-01-01"}
+             for i in range(4)]
+
+    class Collector:
+        topics = TopicRegistry(cfg)
+
+        def stream_latest_news(self, topic=None):
+            yield [dict(a) for a in batch]
+
+    store = ArticleStore(str(tmp_path / "articles.jsonl"))
+    index_file = str(tmp_path / "fingerprints.json")
+    cycle = CollectionCycle(cfg, Collector(), AnalysisPipeline(cfg), store,
+                            FingerprintIndex(index_file, store))
+    assert cycle.run(snapshots=True)["analyzed"] == 4
+    assert cycle.run(snapshots=True)["skipped"] == 4
+
+    batch[0]["title"] = "Title 0, updated"
+    restarted = CollectionCycle(cfg, Collector(), AnalysisPipeline(cfg), store,
+                                FingerprintIndex(index_file, store))
+    assert restarted.run()["analyzed"] == 0
+    result = restarted.run(snapshots=True)
+    assert (result["analyzed"], result["skipped"], result["added"]) == (1, 3, 1)
+    assert store.latest("u0")["title"] == "Title 0, updated"
+
+
+def test_fingerprint_index_appends_between_full_saves(tmp_path):
+    import os
+    from fingerprint_index import FingerprintIndex, content_hash
+    path = str(tmp_path / "fingerprints.json")
+    index = FingerprintIndex(path)
+    index.remember([{"url": f"u{i}", "title": "t"} for i in range(4)])
+    index.save()
+    assert os.path.exists(path) and not os.path.exists(index.log_path)
+    full = os.path.getmtime(path)
+    index.remember([{"url": "u4", "title": "t"}, {"url": "u0", "title": "changed"}])
+    index.save()
+    index.save()  # nothing new
+    assert os.path.getmtime(path) == full
+    with open(index.log_path) as f:
+        assert len(f.readlines()) == 2
+    reloaded = FingerprintIndex(path)
+    assert reloaded.entries == index.entries and list(reloaded.entries)[-1] == "u0"
+    assert reloaded.entries["u0"] == content_hash({"title": "changed"})
+
+    reloaded.remember([{"url": f"u{i}", "title": "again"} for i in range(5)])
+    reloaded.save()  # the log would outgrow the map: rewrite it
+    assert not os.path.exists(index.log_path)
+    assert FingerprintIndex(path).entries == reloaded.entries and len(reloaded) == 5
+
+
+def test_near_duplicates_share_analysis_and_group(tmp_path):
+    import os
+    from configuration import Config
+    from article_store import ArticleStore
+    from analysis_pipeline import AnalysisPipeline
+    from collection_cycle import CollectionCycle
+    from fingerprint_index import FingerprintIndex
+    from near_duplicates import NearDuplicateIndex, canonical_url
+    from topics import TopicRegistry
+    assert (canonical_url("HTTPS://News.com/a?utm_source=x&b=2&fbclid=y&a=1#top")
+            == "https://news.com/a?a=1&b=2")
+    cfg = Config()
+    cfg.SENTIMENT_CACHE_FILE = cfg.KEYWORDS_FILE = cfg.TOPICS_FILE = None
+    wire = ("Supreme Court strikes down race-conscious admissions at Harvard and UNC",
+            "The justices ruled six to three that the programs violate the equal protection clause, "
+            "ending decades of affirmative action in college admissions across the country.")
+    batches = [[{"url": "https://ap.org/1", "source": "AP", "title": wire[0], "description": wire[1]},
+                {"url": "https://b.com/2", "source": "B", "title": wire[0] + " - B",
+                 "description": wire[1]},
+                {"url": "https://c.com/3", "source": "C", "title": "Senate passes budget bill",
+                 "description": "Spending plan heads to the house."}],
+               [{"url": "https://d.com/4", "source": "D", "title": "Update: " + wire[0],
+                 "description": wire[1]}]]
+
+    class Collector:
+        topics = TopicRegistry(cfg)
+
+        def stream_latest_news(self, topic=None):
+            yield batches.pop(0)
+
+    store = ArticleStore(str(tmp_path / "articles.jsonl"))
+    path = str(tmp_path / "dups.json")
+    cycle = CollectionCycle(cfg, Collector(), AnalysisPipeline(cfg), store, FingerprintIndex(None),
+                            NearDuplicateIndex(path))
+    first = cycle.run()
+    assert (first["analyzed"], first["reused"], first["added"]) == (2, 1, 3)
+    assert cycle.run()["reused"] == 1
+    ap, b, c, d = (store.latest(u) for u in ("https://ap.org/1", "https://b.com/2",
+                                             "https://c.com/3", "https://d.com/4"))
+    assert ap["dup_group"] == b["dup_group"] == d["dup_group"] != c["dup_group"]
+    assert b["analysis"] == d["analysis"] == ap["analysis"]
+
+    with open(f"{path}.log") as f:
+        assert len(f.readlines()) == 1  # the second cycle only appended d's membership
+    reloaded = NearDuplicateIndex(path)
+    groups = reloaded.spread()
+    assert [(g["members"], g["sources"]) for g in groups] == [([ap["id"], b["id"], d["id"]],
+                                                                ["AP", "B", "D"])]
+    assert reloaded.next_id == 2
+    new = [{"title": "Another story entirely", "url": "https://e.com/5", "id": 10},
+           {"title": "And one more unrelated headline", "url": "https://f.com/6", "id": 11}]
+    reloaded.assign(new)
+    reloaded.remember(new)
+    reloaded.save()  # the log would outgrow the groups: rewrite the file
+    assert not os.path.exists(f"{path}.log") and len(NearDuplicateIndex(path)) == 4
+
+
+def test_collector_polls_incrementally_within_page_budget(tmp_path):
+    from configuration import Config
+    from news_collector import NewsCollector
+    from benchmarks.fake_provider import FakeProviderServer
+    with FakeProviderServer(pages=4, per_page=5) as server:
+        cfg = server.configure(Config())
+        cfg.PROVIDER_CURSOR_FILE = str(tmp_path / "cursors.json")
+        cfg.PROVIDER_PAGE_BUDGET = 2
+        collector = NewsCollector(cfg)
+        # budget-capped first run; keyset pages (newsapi, thenewsapi) overlap by one item
+        assert len(collector.collect_latest_news()) == 9 + 10 + 9
+        collector.close()
+
+        restarted = NewsCollector(cfg)
+        # only the boundary item at the cursor comes back, then conditional requests get 304
+        assert len(restarted.collect_latest_news()) <= 3
+        server.hits = dict.fromkeys(server.hits, 0)
+        assert restarted.collect_latest_news() == []
+        assert server.hits == {'newsapi': 1, 'newsdata': 1, 'thenewsapi': 1}
+
+        server.publish(12)  # more than one budget's worth
+        first = restarted.collect_latest_news()
+        second = restarted.collect_latest_news()
+        restarted.close()
+    for provider in ('newsapi', 'newsdata', 'thenewsapi'):
+        got = {a['url'] for a in first + second if f'/{provider}/' in a['url']}
+        assert {f'https://example.com/{provider}/{n}' for n in range(20, 32)} <= got
+        assert 'page' not in restarted.cursors.get(provider)
+
+
+def test_collection_streams_pages_with_back_pressure(tmp_path):
+    import time
+    from configuration import Config
+    from article_store import ArticleStore
+    from analysis_pipeline import AnalysisPipeline
+    from collection_cycle import CollectionCycle
+    from fingerprint_index import FingerprintIndex
+    from news_collector import NewsCollector
+    from benchmarks.fake_provider import FakeProviderServer
+    with FakeProviderServer(pages=6, per_page=3) as server:
+        cfg = server.configure(Config())
+        cfg.PROVIDER_CURSOR_FILE = cfg.SENTIMENT_CACHE_FILE = cfg.KEYWORDS_FILE = None
+        cfg.TOPICS_FILE = cfg.NEAR_DUPLICATE_FILE = None
+        cfg.PROVIDER_PAGE_BUDGET, cfg.STREAM_QUEUE_PAGES, cfg.STREAM_BATCH_SIZE = 6, 1, 3
+        collector = NewsCollector(cfg)
+        pages = collector.stream_latest_news()
+        first = next(pages)
+        time.sleep(0.3)
+        # besides the page taken and the one queued, each provider holds at most one page
+        assert len(first) == 3 and sum(server.hits.values()) <= 5
+        assert len([a for page in pages for a in page]) + len(first) == 18 + 2 * 13  # keyset pages overlap by one
+
+        store = ArticleStore(str(tmp_path / "articles.jsonl"))
+        stored_while_fetching = []
+        store.subscribe(lambda event, payload: stored_while_fetching.append(
+            sum(server.hits.values())) if event == 'add' else None, replay=False)
+        server.publish(9)
+        server.hits = dict.fromkeys(server.hits, 0)
+        pipeline, saves = AnalysisPipeline(cfg), []
+        pipeline.sentiment_analyzer.save_cache = lambda: saves.append(1)
+        cycle = CollectionCycle(cfg, collector, pipeline, store, FingerprintIndex(None))
+        assert cycle.run()["added"] == len(store) > 0
+        collector.close()
+    assert stored_while_fetching[0] < sum(server.hits.values())
+    assert len(saves) == 1  # the sentiment cache is written once per cycle, not per batch
+
+
+def test_topic_scheduler_spreads_fetches():
+    from topics import Topic, TopicScheduler
+    topics = [Topic("fast", ["a"], interval=30), Topic("slow", ["b"], interval=120),
+              Topic("other", ["c", "d"], interval=60)]
+    assert topics[2].query("|") == "(c) | (d)"
+    scheduler = TopicScheduler(topics, spacing=10, now=0)
+    runs = [(t, topic.name) for t in range(0, 241)
+            for topic in [scheduler.due(now=t)] if topic is not None]
+    times = [t for t, _ in runs]
+    assert all(b - a >= 10 for a, b in zip(times, times[1:]))
+    assert runs[:3] == [(0, "fast"), (10, "slow"), (20, "other")]
+    count = {n: sum(1 for _, m in runs if m == n) for n in ("fast", "slow", "other")}
+    assert count == {"fast": 9, "slow": 2, "other": 4}
+
+
+def test_collector_uses_topic_queries_and_cursors(tmp_path):
+    from configuration import Config
+    from news_collector import NewsCollector
+    from benchmarks.fake_provider import FakeProviderServer
+    with FakeProviderServer(per_page=2) as server:
+        cfg = server.configure(Config())
+        cfg.PROVIDER_CURSOR_FILE = None
+        cfg.TOPICS_FILE = str(tmp_path / "topics.json")
+        (tmp_path / "topics.json").write_text(
+            '[{"name": "housing", "queries": ["rent control", "zoning"], "categories": []}]')
+        collector = NewsCollector(cfg)
+        housing = collector.topics.get("housing")
+        assert [t.name for t in collector.topics.all()] == ["affirmative-action", "housing"]
+        arts = collector.collect_latest_news(housing)
+        collector.close()
+    assert arts and {a["topic"] for a in arts} == {"housing"}
+    assert "housing:newsdata" in collector.cursors.state
+    assert housing.sources == [] and housing.categories == []  # no filters unless listed
+
+
+@pytest.mark.parametrize("provider, stamp", [("newsapi", "2024-01-01T00:03:00Z"),
+                                             ("newsdata", "2024-01-01 00:03:00"),
+                                             ("thenewsapi", "2024-01-01T00:03:00.000000Z")])
+def test_collector_maps_each_provider_payload(provider, stamp):
+    from configuration import Config
+    from news_collector import NewsCollector
+    from benchmarks.fake_provider import FakeProviderServer
+    with FakeProviderServer(per_page=4) as server:
+        cfg = server.configure(Config())
+        cfg.PROVIDER_CURSOR_FILE = cfg.TOPICS_FILE = None
+        collector = NewsCollector(cfg)
+        arts = [a for a in collector.collect_latest_news() if f"/{provider}/" in a["url"]]
+        collector.close()
+    assert [a["url"] for a in arts] == [f"https://example.com/{provider}/{n}" for n in (3, 2, 1, 0)]
+    assert arts[0]["source"] == f"{provider}-source-3" and arts[0]["published_at"] == stamp
+    assert arts[0]["title"] == f"{provider} headline 3 on affirmative action"
+
+
+def test_collector_retries_rate_limits_and_opens_circuit():
+    import time
+    from configuration import Config
+    from news_collector import NewsCollector
+    from benchmarks.fake_provider import FakeProviderServer
+    with FakeProviderServer(per_page=2, latency={'thenewsapi': 0.5}) as server:
+        cfg = server.configure(Config())
+        cfg.PROVIDER_CURSOR_FILE = None
+        cfg.HTTP_BACKOFF_BASE = 0.01
+        cfg.CIRCUIT_FAILURE_THRESHOLD = 2
+        cfg.PROVIDER_TIMEOUTS = {'newsapi': 5, 'newsdata': 5, 'thenewsapi': 0.3}
+        collector = NewsCollector(cfg)
+        server.inject('newsapi', 429, retry_after=0.2)
+        server.inject('newsdata', 503, 502)
+        t0 = time.monotonic()
+        arts = collector.collect_latest_news()
+        assert time.monotonic() - t0 >= 0.2  # waited for Retry-After
+        assert server.hits['newsapi'] == 2 and server.hits['newsdata'] == 3
+        assert {a['url'].split('/')[3] for a in arts} == {'newsapi', 'newsdata'}
+
+        server.inject('newsdata', *[500] * 8)
+        collector.collect_latest_news()
+        collector.collect_latest_news()
+        hits = server.hits['newsdata']
+        assert collector.breakers['newsdata'].state == 'open'
+        collector.collect_latest_news()
+        assert server.hits['newsdata'] == hits  # skipped while open
+        collector.breakers['newsdata'].opened_at -= cfg.CIRCUIT_COOLDOWN
+        collector.collect_latest_news()
+        assert server.hits['newsdata'] == hits + 1  # one trial request, which succeeded
+        assert collector.breakers['newsdata'].state == 'closed'
+        assert collector.breakers['thenewsapi'].state == 'open'  # read timeouts count too
+        collector.close()
+
+
+def test_half_open_trial_that_times_out_reopens_breaker():
+    import time
+    from configuration import Config
+    from news_collector import NewsCollector
+    from rate_limit import CircuitBreaker
+    from benchmarks.fake_provider import FakeProviderServer
+    with FakeProviderServer(per_page=2) as server:
+        cfg = server.configure(Config())
+        cfg.PROVIDER_CURSOR_FILE = None
+        collector = NewsCollector(cfg)
+        breaker, bucket = collector.breakers['newsapi'], collector.buckets['newsapi']
+        for _ in range(cfg.CIRCUIT_FAILURE_THRESHOLD):
+            breaker.record_failure()
+        breaker.opened_at -= cfg.CIRCUIT_COOLDOWN
+        bucket.tokens, bucket.updated = 0.0, time.monotonic()  # the trial cannot get a token in time
+        with pytest.raises(TimeoutError):
+            collector._get('newsapi', cfg.NEWSAPI_URL, {}, deadline=time.monotonic() + 0.05)
+        assert breaker.state == 'open' and not breaker.allow()
+        breaker.opened_at -= cfg.CIRCUIT_COOLDOWN
+        bucket.tokens = 1.0
+        assert collector._get('newsapi', cfg.NEWSAPI_URL, {}, deadline=time.monotonic() + 5).ok
+        assert breaker.state == 'closed'
+        collector.close()
+
+    stuck = CircuitBreaker(threshold=1, cooldown=0.05)
+    stuck.record_failure()
+    time.sleep(0.06)
+    assert stuck.allow() and stuck.state == 'half-open' and not stuck.allow()
+    time.sleep(0.06)
+    assert stuck.allow()  # a trial that never reported back does not block for good
+
+
+def test_scheduler_prevents_overlap_and_drops_missed_runs():
+    import threading, time
+    from scheduler import Scheduler
+    scheduler = Scheduler(workers=2)
+    release, fast_runs, dynamic_runs = threading.Event(), [], []
+    slow = scheduler.every("slow", 0.05, lambda: release.wait(5))
+    scheduler.every("fast", 0.05, lambda: fast_runs.append(time.monotonic()))
+    due = [time.monotonic() + 0.02 * i for i in range(1, 4)]
+    scheduler.dynamic("dynamic", lambda: dynamic_runs.append(due.pop(0)),
+                      lambda: due[0] if due else float("inf"))
+    scheduler.start()
+    time.sleep(0.5)
+    release.set()
+    scheduler.stop()
+    assert slow.runs == 1 and slow.skipped >= 5  # never overlapped with itself
+    assert len(fast_runs) >= 5  # not held up by the slow job
+    assert len(dynamic_runs) == 3 and not due
+
+
+@pytest.mark.parametrize("parquet", [False, True])
+def test_incremental_backup_and_restore(tmp_path, monkeypatch, parquet):
+    import backup as backup_module
+    from article_store import ArticleStore
+    from backup import IncrementalBackup
+    if parquet and backup_module.pyarrow is None:
+        pytest.skip("pyarrow not installed")
+    if not parquet:
+        monkeypatch.setattr(backup_module, "pyarrow", None)
+    store = ArticleStore(str(tmp_path / "articles.jsonl"))
+    backup = IncrementalBackup(store, str(tmp_path / "backups"), chunk_size=2)
+
+    def art(i, **extra):
+        return dict({"url": f"u{i}", "title": f"t {i}", "source": "123", "published_at": None,
+                     "description": "",
+                     "analysis": {"sentiment": {"polarity": 0.5, "subjectivity": 0.0},
+                                  "bias_score": 3.0, "is_high_manipulation": i % 2 == 0}}, **extra)
+
+    store.add([art(0), art(1), art(2, topic_cluster=4)])
+    first = backup.run()
+    assert all(first["parts"].values()) and first["articles"] == 3 and len(first["segments"]) == 2
+    store.add([art(3)])
+    store.update({0: {"evolution_index": 1}, 3: {"evolution_index": 0}})
+    second = backup.run()
+    assert not any(second["parts"].values()) and (second["articles"], second["patches"]) == (1, 2)
+    assert backup.run()["articles"] == 0  # nothing new
+
+    restored = ArticleStore(str(tmp_path / "restored.jsonl"))
+    backup.restore(restored.path)
+    restored.refresh()
+    assert restored.all() == store.all()
+
+    store.compact()
+    assert all(backup.run()["parts"].values())
+    backup.restore(restored.path, until=first["created_at"])
+    assert len(ArticleStore(restored.path).all()) == 3
+
+
+def test_backfill_streams_chunks_and_resumes(tmp_path):
+    import json
+    from configuration import Config
+    from article_store import ArticleStore
+    from backfill import Backfill
+    cfg = Config()
+    cfg.SENTIMENT_CACHE_FILE = cfg.KEYWORDS_FILE = cfg.FINGERPRINT_FILE = None
+    dump = tmp_path / "dump.jsonl"
+
+    def write(lines, mode):
+        with open(dump, mode) as f:
+            for i in lines:
+                f.write(json.dumps({"url": f"https://x.com/{i}?utm_source=feed", "title": f"Title {i}",
+                                    "source": {"name": "X"}, "publishedAt": "2024-01-01T00:00:00Z"}) + "\n")
+
+    write(range(10), "w")
+    store = ArticleStore(str(tmp_path / "articles.jsonl"))
+    first = Backfill(cfg, str(dump), store, workers=2, chunk_size=3).run()
+    assert (first["read"], first["stored"]) == (10, 10) and first["offset"] == dump.stat().st_size
+    art = store.latest("https://x.com/3")
+    assert art["source"] == "X" and "sentiment" in art["analysis"]
+    assert json.loads((tmp_path / "dump.jsonl.checkpoint.json").read_text())["stored"] == 10
+
+    write(range(10, 15), "a")
+    second = Backfill(cfg, str(dump), store, workers=1, chunk_size=3).run()
+    assert (second["read"], second["stored"]) == (5, 5) and len(store) == 15
+
+    # an export without a final newline keeps its last record; a torn line waits for the next run
+    with open(dump, "a") as f:
+        f.write(json.dumps({"url": "https://x.com/last", "title": "Last"}))
+    assert Backfill(cfg, str(dump), store, workers=1).run()["stored"] == 1
+    with open(dump, "a") as f:
+        f.write('\n{"url": "https://x.com/torn", "ti')
+    torn = Backfill(cfg, str(dump), store, workers=1).run()
+    assert (torn["read"], torn["invalid"]) == (0, 0) and torn["offset"] < dump.stat().st_size
+    with open(dump, "a") as f:
+        f.write('tle": "Torn"}\n')
+    assert Backfill(cfg, str(dump), store, workers=1).run()["stored"] == 1 and len(store) == 17
+
+
+def test_backfill_drops_known_urls_before_analysis(tmp_path, monkeypatch):
+    import json
+    import backfill
+    from configuration import Config
+    from article_store import ArticleStore
+    cfg = Config()
+    cfg.SENTIMENT_CACHE_FILE = cfg.KEYWORDS_FILE = cfg.FINGERPRINT_FILE = None
+    store = ArticleStore(str(tmp_path / "articles.jsonl"))
+    store.add([{"url": "https://x.com/0", "title": "Stored before"}])
+    dump = tmp_path / "dump.jsonl"
+    dump.write_text("".join(json.dumps({"url": f"https://x.com/{i}", "title": f"Title {i}"}) + "\n"
+                            for i in (0, 1, 2, 1, 3, 2)))
+    analyzed, analyze = [], backfill._analyze_chunk
+    monkeypatch.setattr(backfill, "_analyze_chunk",
+                        lambda arts: analyzed.extend(a["url"] for a in arts) or analyze(arts))
+    result = backfill.Backfill(cfg, str(dump), store, workers=1, chunk_size=2).run()
+    assert analyzed == ["https://x.com/1", "https://x.com/2", "https://x.com/3"]
+    assert (result["read"], result["skipped"], result["stored"]) == (6, 3, 3)
+    assert json.loads((tmp_path / "dump.jsonl.checkpoint.json").read_text())["stored"] == 3
+
+
+def test_benchmark_suite_flags_regressions():
+    from benchmarks.suite import compare, run
+    results = run(["bias", "store_add"], [100, 200000], repeat=1, quiet=True)
+    assert sorted(results) == ["bias/100", "store_add/100"]  # 200000 is beyond both cases' limit
+    assert results["store_add/100"]["items"] == 100
+    baseline = {"bias/100": {"seconds": 1.0}, "store_add/100": {"seconds": 0.001}, "gone/1": {"seconds": 1}}
+    slower = {"bias/100": {"seconds": 1.5}, "store_add/100": {"seconds": 0.002}}
+    assert [r["case"] for r in compare(slower, baseline)] == ["bias/100"]  # 1 ms is noise
+    assert compare(slower, baseline, tolerance=0.6) == []
+
+
+def test_metrics_endpoint_and_cycle_profile(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    from configuration import Config
+    from article_store import get_store
+    from analysis_pipeline import AnalysisPipeline
+    from collection_cycle import CollectionCycle
+    from fingerprint_index import FingerprintIndex
+    from metrics import MetricsRegistry, get_metrics
+    from topics import TopicRegistry
+    from web.app import create_app
+    cfg = Config()
+    cfg.SENTIMENT_CACHE_FILE = cfg.KEYWORDS_FILE = cfg.TOPICS_FILE = cfg.NEAR_DUPLICATE_FILE = None
+    cfg.PROFILE_DIR = str(tmp_path / "profiles")
+
+    class Collector:
+        topics = TopicRegistry(cfg)
+
+        def stream_latest_news(self, topic=None):
+            yield [{"url": f"u{i}", "title": f"Title {i}", "description": ""} for i in range(3)]
+
+    metrics = get_metrics()
+    stored = metrics.value("news_stage_seconds", stage="store")
+    added = metrics.value("news_articles_total", outcome="added")
+    cycle = CollectionCycle(cfg, Collector(), AnalysisPipeline(cfg), get_store(), FingerprintIndex(None))
+    cycle.run(profile=True)
+    assert len(list((tmp_path / "profiles").glob("cycle-*.prof"))) == 1
+    assert metrics.value("news_stage_seconds", stage="store") == stored + 1
+    assert metrics.value("news_articles_total", outcome="added") == added + 3
+
+    resp = create_app(cfg).test_client().get("/api/metrics")
+    assert resp.mimetype == "text/plain"
+    text = resp.get_data(as_text=True)
+    assert "# TYPE news_stage_seconds histogram" in text
+    assert 'news_stage_seconds_bucket{stage="sentiment",le="+Inf"}' in text
+    assert 'news_cache_requests_total{cache="sentiment",result="miss"}' in text
+
+    disabled = MetricsRegistry(enabled=False)
+    with disabled.timer("news_stage_seconds", stage="store"):
+        disabled.inc("news_articles_total", outcome="added")
+    assert disabled.value("news_stage_seconds", stage="store") == 0
+    assert "news_articles_total{" not in disabled.render()
@@ -0,0 +1,98 @@
+import heapq, json, os, time
+from typing import Dict, List, Optional
+
+
+class Topic:
+    """A narrative to track: search queries plus optional source and category filters."""
+
+    def __init__(self, name: str, queries: List[str], sources: Optional[List[str]] = None,
+                 categories: Optional[List[str]] = None, interval: float = 300):
+        self.name = name
+        self.queries = list(queries)
+        self.sources = list(sources or [])
+        self.categories = list(categories or [])
+        self.interval = interval
+
+    def query(self, op: str = 'OR') -> str:
+        """The provider search string; several queries are OR-ed together."""
+        if len(self.queries) == 1:
+            return self.queries[0]
+        return f' {op} '.join(f'({q})' for q in self.queries)
+
+    def to_dict(self) -> Dict:
+        return {'name': self.name, 'queries': self.queries, 'sources': self.sources,
+                'categories': self.categories, 'interval': self.interval}
+
+
+class TopicRegistry:
+    """Topics from ``Config.TOPICS``, extended or overridden by ``Config.TOPICS_FILE``.
+
+    Entries are dicts with ``name``, ``queries`` and optionally ``sources``
+    (newsapi source ids, e.g. ``Config.NEWS_SOURCES``), ``categories`` (e.g.
+    ``Config.CATEGORIES``) and ``interval`` in seconds (default
+    ``Config.UPDATE_INTERVAL``). Without sources or categories a topic is not
+    filtered by them, so the query alone decides what is collected.
+    """
+
+    def __init__(self, cfg):
+        self.cfg = cfg
+        self.topics: Dict[str, Topic] = {}
+        entries = list(cfg.TOPICS)
+        path = cfg.TOPICS_FILE
+        if path and os.path.exists(path):
+            try:
+                with open(path) as f:
+                    entries += json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Ignoring topics file {path}: {e}")
+        for entry in entries:
+            self.topics[entry['name']] = Topic(
+                entry['name'], entry['queries'],
+                entry.get('sources'), entry.get('categories'),
+                entry.get('interval', cfg.UPDATE_INTERVAL))
+
+    def get(self, name: str) -> Optional[Topic]:
+        return self.topics.get(name)
+
+    def default(self) -> Topic:
+        return next(iter(self.topics.values()))
+
+    def all(self) -> List[Topic]:
+        return list(self.topics.values())
+
+
+class TopicScheduler:
+    """Decides which topic to fetch next.
+
+    Every topic runs on its own interval, but fetches are released at most one
+    per ``spacing`` seconds and the first runs are staggered by ``spacing``, so
+    many topics turn into a steady trickle of requests instead of a burst at
+    every interval. A topic that falls behind runs once and then keeps its
+    cadence from there instead of catching up on every missed run.
+    """
+
+    def __init__(self, topics: List[Topic], spacing: float = 10.0, now: Optional[float] = None):
+        now = time.monotonic() if now is None else now
+        self.spacing = spacing
+        self.topics = {t.name: t for t in topics}
+        self._heap = [(now + i * spacing, t.name) for i, t in enumerate(topics)]
+        heapq.heapify(self._heap)
+        self._last = float('-inf')
+
+    def due(self, now: Optional[float] = None) -> Optional[Topic]:
+        """Return the topic to fetch now, or None."""
+        now = time.monotonic() if now is None else now
+        if not self._heap or now < self.next_due():
+            return None
+        at, name = heapq.heappop(self._heap)
+        topic = self.topics[name]
+        self._last = now
+        nxt = at + topic.interval
+        heapq.heappush(self._heap, (nxt if nxt > now else now + topic.interval, name))
+        return topic
+
+    def next_due(self) -> float:
+        """Monotonic time at which ``due`` will next return a topic."""
+        if not self._heap:
+            return float('inf')
+        return max(self._heap[0][0], self._last + self.spacing)
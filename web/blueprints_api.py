@@ -1,94 +1,162 @@
-from flask import Blueprint, jsonify
-import json, os
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from article_store import get_store
+from evolution_stats import get_stats
+from job_queue import get_job_queue
+from metrics import get_metrics
+from story_index import get_story_index
+from web.stories_cache import get_stories_cache
+from web.story_feed import get_story_feed
 
 api_bp = Blueprint("api", __name__)
 
 @api_bp.route("/stories")
 def stories():
-    path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "articles.json")
-    if not os.path.exists(path):
-        # fallback to project root data path
-        path = os.path.join(os.getcwd(), "data", "articles.json")
-    with open(path) as f:
-        data = json.load(f)
-    return jsonify(data)
+    """Articles of the store's hot window, oldest first.
+
+    Filters: ``since`` (ISO time, compared with fetched_at; also reads older
+    days), ``source``, ``topic_cluster``. Pagination: ``limit`` plus ``cursor``
+    (the id of the last article seen); the next cursor comes back in
+    ``X-Next-Cursor``. Responses carry an ETag and answer ``If-None-Match``
+    with 304.
+    """
+    limit = request.args.get('limit', type=int)
+    etag, body, next_cursor = get_stories_cache(get_store()).get(
+        since=request.args.get('since'), source=request.args.get('source'),
+        topic_cluster=request.args.get('topic_cluster', type=int),
+        cursor=request.args.get('cursor', type=int),
+        limit=max(limit, 1) if limit is not None else None)
+
+    if request.if_none_match.contains(etag):
+        resp = Response(status=304)
+    else:
+        resp = Response(body, mimetype='application/json')
+    resp.set_etag(etag)
+    resp.headers['Cache-Control'] = 'no-cache'
+    if next_cursor is not None:
+        resp.headers['X-Next-Cursor'] = str(next_cursor)
+    return resp
+
+@api_bp.route("/stories/<fingerprint>/timeline")
+def story_timeline(fingerprint):
+    """Every snapshot of one story (URL fingerprint), oldest first, from the story index."""
+    store = get_store()
+    snapshots = store.get_many(get_story_index(store).timeline(fingerprint))
+    snapshots = [a for a in snapshots if a is not None]
+    if not snapshots:
+        return jsonify({"error": "unknown story"}), 404
+    return jsonify({"fingerprint": fingerprint, "snapshots": snapshots})
+
+@api_bp.route("/clusters/<int:cluster_id>")
+def cluster(cluster_id):
+    """Articles of one ``topic_cluster``, oldest first, from the story index."""
+    store = get_store()
+    articles = store.get_many(get_story_index(store).cluster(cluster_id))
+    articles = [a for a in articles if a is not None]
+    if not articles:
+        return jsonify({"error": "unknown cluster"}), 404
+    return jsonify({"topic_cluster": cluster_id, "articles": articles})
+
+@api_bp.route("/duplicates")
+def duplicates():
+    """Near-duplicate groups (syndicated copies) with their members and sources, widest spread first.
+
+    Query params: ``min_size`` (default 2) and ``limit``.
+    """
+    from configuration import Config
+    from collection_cycle import get_cycle
+    groups = get_cycle(Config()).duplicates.spread(
+        min_size=request.args.get('min_size', 2, type=int), limit=request.args.get('limit', type=int))
+    return jsonify(groups)
+
+@api_bp.route("/duplicates/<int:group_id>")
+def duplicate_group(group_id):
+    from configuration import Config
+    from collection_cycle import get_cycle
+    group = get_cycle(Config()).duplicates.summary(group_id)
+    if group is None:
+        return jsonify({"error": "unknown group"}), 404
+    store = get_store()
+    group['articles'] = [a for a in store.get_many(group['members']) if a is not None]
+    return jsonify(group)
+
+@api_bp.route("/stats/evolution")
+def evolution_stats():
+    """Precomputed counts per ``source-evolution_index``, source, cluster and hour bucket.
+
+    ``X-Stream-Seq`` is the ``/api/stream`` event id the counts include; a
+    client opens the stream with ``?last_id=<seq>`` to get every later delta.
+    """
+    store = get_store()
+    stats, feed = get_stats(store), get_story_feed(store)
+    (version, body), seq = store.atomically(lambda: (stats.get(), feed.seq))
+    etag = f"{id(stats):x}-{version}"
+    if request.if_none_match.contains(etag):
+        resp = Response(status=304)
+    else:
+        resp = Response(body, mimetype='application/json')
+    resp.set_etag(etag)
+    resp.headers['Cache-Control'] = 'no-cache'
+    resp.headers['X-Stream-Seq'] = str(seq)
+    return resp
+
+@api_bp.route("/stream")
+def stream():
+    """Server-Sent Events with store deltas: ``articles``, ``updates`` and ``reset``.
+
+    Reconnecting clients resume after ``Last-Event-ID``; a first connection
+    can start after an id with ``?last_id=`` (EventSource cannot set the
+    header), e.g. the ``X-Stream-Seq`` of ``/api/stats/evolution``.
+    """
+    last_id = request.headers.get('Last-Event-ID', type=int)
+    if last_id is None:
+        last_id = request.args.get('last_id', type=int)
+    feed = get_story_feed(get_store())
+    resp = Response(stream_with_context(feed.listen(last_id)), mimetype='text/event-stream')
+    resp.headers['Cache-Control'] = 'no-cache'
+    resp.headers['X-Accel-Buffering'] = 'no'
+    return resp
 
 @api_bp.route("/parse", methods=["POST"])
 def parse_now():
-    """Trigger a one-off collection + analysis and return latest data."""
-    try:
-        from configuration import Config
-        from news_collector import NewsCollector
-        from sentiment_analyzer import SentimentAnalyzer
-        from bias_detector import BiasDetector
-        from datetime import datetime
-
-        cfg = Config()
-        collector = NewsCollector(cfg)
-        analyzer = SentimentAnalyzer()
-        bias = BiasDetector(cfg)
-
-        articles = collector.collect_latest_news()
-        analyzed = []
-        for a in articles:
-            sentiment = analyzer.analyze((a.get('title') or '') + ' ' + (a.get('description') or ''))
-            bias_score = bias.detect_bias(a)
-            a['analysis'] = {
-                'sentiment': sentiment,
-                'bias_score': bias_score,
-                'manipulation_score': bias_score,  # simple baseline
-                'analyzed_at': datetime.now().isoformat()
-            }
-            analyzed.append(a)
-
-        # save
-        data_path = os.path.join(os.getcwd(), "data", "articles.json")
-        os.makedirs(os.path.dirname(data_path), exist_ok=True)
-        try:
-            with open(data_path, 'r') as f:
-                existing = json.load(f)
-        except Exception:
-            existing = []
-
-        # allow multiple snapshots per URL if content changed
-        url_to_last = {}
-        for x in existing:
-            url_to_last[x.get('url')] = x
-
-        appended = 0
-        for a in analyzed:
-            u = a.get('url')
-            if not u:
-                continue
-            prev = url_to_last.get(u)
-            if prev is None:
-                existing.append(a)
-                url_to_last[u] = a
-                appended += 1
-            else:
-                if (a.get('title') != prev.get('title') or
-                    a.get('description') != prev.get('description') or
-                    a.get('published_at') != prev.get('published_at')):
-                    existing.append(a)
-                    url_to_last[u] = a
-                    appended += 1
-
-        with open(data_path, 'w') as f:
-            json.dump(existing, f)
-
-        # build evolution timeline (assign evolution_index)
-        try:
-            from flask import request
-            from evolution_tracker import EvolutionTracker
-            mode = (request.args.get('mode') or '').lower()
-            tracker = EvolutionTracker(data_file=data_path)
-            if mode == 'title':
-                tracker.build_timeline_by_title_similarity()
-            else:
-                tracker.build_timeline()
-        except Exception as _e:
-            pass
-
-        return jsonify({"added": appended, "total": len(existing)})
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+    """Queue a one-off collection + analysis; returns the job to poll at /api/jobs/<id>.
+
+    Triggers that arrive while a parse with the same mode and topic is queued
+    or running share that job instead of starting another collection.
+    ``profile=1`` runs the collection under cProfile (see ``Config.PROFILE_DIR``).
+    """
+    from configuration import Config
+    from collection_cycle import get_cycle
+
+    mode = (request.args.get('mode') or '').lower()
+    timeline = 'title' if mode == 'title' else 'url'
+    profile = request.args.get('profile') in ('1', 'true')
+    cycle = get_cycle(Config())
+    topic = request.args.get('topic')
+    if topic and cycle.collector.topics.get(topic) is None:
+        return jsonify({"error": "unknown topic"}), 404
+    topic = topic or cycle.collector.topics.default().name
+    # allow multiple snapshots per URL if content changed
+    job, created = get_job_queue().submit(f"parse:{timeline}:{topic}", cycle.run,
+                                          snapshots=True, timeline=timeline, topic=topic,
+                                          profile=profile)
+    body = job.to_dict()
+    body['coalesced'] = not created
+    return jsonify(body), 202
+
+@api_bp.route("/metrics")
+def metrics():
+    """Stage timings, provider latencies, cache hit counts and queue depth (Prometheus text format)."""
+    return Response(get_metrics().render(), mimetype='text/plain; version=0.0.4')
+
+@api_bp.route("/topics")
+def topics():
+    from configuration import Config
+    from collection_cycle import get_cycle
+    return jsonify([t.to_dict() for t in get_cycle(Config()).collector.topics.all()])
+
+@api_bp.route("/jobs/<job_id>")
+def job_status(job_id):
+    job = get_job_queue().get(job_id)
+    if job is None:
+        return jsonify({"error": "unknown job"}), 404
+    return jsonify(job.to_dict())
@@ -0,0 +1,87 @@
+import hashlib, json, threading, uuid
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from metrics import get_metrics
+
+
+class StoriesCache:
+    """Pre-serialized /api/stories responses, invalidated by the store version.
+
+    A response is keyed by the normalised query; every entry is dropped as soon
+    as the store version moves, so a hit costs one version check and a dict
+    lookup. ETags combine a per-process token, the store version and the query.
+    """
+
+    def __init__(self, store, max_entries: int = 64):
+        self.store = store
+        self.max_entries = max_entries
+        self.token = uuid.uuid4().hex[:8]
+        self._lock = threading.Lock()
+        self._version = None
+        self._entries: 'OrderedDict[Tuple, Tuple[str, bytes, Optional[int]]]' = OrderedDict()
+
+    def get(self, since: Optional[str] = None, source: Optional[str] = None,
+            topic_cluster: Optional[int] = None, cursor: Optional[int] = None,
+            limit: Optional[int] = None):
+        """Return ``(etag, body, next_cursor)`` for the query."""
+        key = (since, source, topic_cluster, cursor, limit)
+        version = self.store.refresh()
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+            hit = self._entries.get(key)
+            if hit is not None:
+                self._entries.move_to_end(key)
+        if hit is not None:
+            get_metrics().inc('news_cache_requests_total', cache='stories', result='hit')
+            return hit
+        get_metrics().inc('news_cache_requests_total', cache='stories', result='miss')
+
+        items = self._select(since, source, topic_cluster, cursor, limit)
+        next_cursor = None
+        if limit is not None and len(items) > limit:
+            items = items[:limit]
+            next_cursor = items[-1]['id']
+        body = json.dumps(items).encode()
+        tag = hashlib.sha1(repr(key).encode()).hexdigest()[:12]
+        entry = (f'{self.token}-{version}-{tag}', body, next_cursor)
+
+        with self._lock:
+            if version == self._version:
+                self._entries[key] = entry
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return entry
+
+    def _select(self, since, source, topic_cluster, cursor, limit):
+        if cursor is not None:
+            records = self.store.since(cursor)
+        elif since is not None:
+            records = self.store.history(since[:10])  # segments are per day of fetched_at
+        else:
+            records = self.store.all()
+        out = []
+        for a in records:
+            if since is not None and (a.get('fetched_at') or '') < since:
+                continue
+            if source is not None and a.get('source') != source:
+                continue
+            if topic_cluster is not None and a.get('topic_cluster') != topic_cluster:
+                continue
+            out.append(a)
+            if limit is not None and len(out) > limit:
+                break
+        return out
+
+
+_caches: Dict[str, StoriesCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_stories_cache(store) -> StoriesCache:
+    with _caches_lock:
+        if store.path not in _caches:
+            _caches[store.path] = StoriesCache(store)
+        return _caches[store.path]
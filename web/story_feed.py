@@ -0,0 +1,90 @@
+import json, threading
+from collections import deque
+from typing import Dict, Optional
+
+
+class StoryFeed:
+    """Store changes as a numbered stream of Server-Sent Events.
+
+    The feed subscribes to the store and turns each change into one event:
+    ``articles`` (newly stored records), ``updates`` (``{id, source, fields,
+    previous}`` for patched fields such as ``evolution_index`` or
+    ``topic_cluster``) and ``reset`` (the store was reloaded; clients should
+    refetch). Recent events are kept so
+    a reconnecting client resumes from ``Last-Event-ID``; one that fell too far
+    behind gets a ``reset``.
+    """
+
+    def __init__(self, store, backlog: int = 1000, poll_interval: float = 2.0,
+                 keepalive: float = 15.0):
+        self.store = store
+        self.poll_interval = poll_interval
+        self.keepalive = keepalive
+        self.seq = 0
+        self._events = deque(maxlen=backlog)  # (seq, chunk)
+        self._cond = threading.Condition()
+        store.subscribe(self._on_event, replay=False)
+
+    # -------------- public --------------
+    def listen(self, last_id: Optional[int] = None, stop: Optional[threading.Event] = None):
+        """Yield SSE chunks for every event after ``last_id`` (default: from now on)."""
+        with self._cond:
+            cursor = self.seq if last_id is None else last_id
+            if cursor > self.seq:
+                cursor = -1  # an id from an earlier process: start over with a reset
+        yield "retry: 5000\n: connected\n\n"
+        idle = 0.0
+        while stop is None or not stop.is_set():
+            with self._cond:
+                oldest = self._events[0][0] if self._events else self.seq + 1
+                if cursor < oldest - 1:
+                    # events were evicted before this client saw them
+                    pending = [(self.seq, self._format(self.seq, 'reset', None))]
+                else:
+                    pending = [e for e in self._events if e[0] > cursor]
+                if not pending:
+                    self._cond.wait(self.poll_interval)
+            if pending:
+                for _, chunk in pending:
+                    yield chunk
+                cursor = pending[-1][0]
+                idle = 0.0
+                continue
+            # writes by other processes only show up once the store catches up
+            self.store.refresh()
+            idle += self.poll_interval
+            if idle >= self.keepalive:
+                idle = 0.0
+                yield ": keepalive\n\n"
+
+    # -------------- store events --------------
+    def _on_event(self, event, payload):
+        if event == 'add':
+            self._publish('articles', payload)
+        elif event == 'update':
+            self._publish('updates', [{'id': rec['id'], 'source': rec.get('source'),
+                                       'fields': {k: rec.get(k) for k in old},
+                                       'previous': old} for rec, old in payload])
+        elif event == 'reset':
+            self._publish('reset', None)
+
+    def _publish(self, event, data):
+        with self._cond:
+            self.seq += 1
+            self._events.append((self.seq, self._format(self.seq, event, data)))
+            self._cond.notify_all()
+
+    @staticmethod
+    def _format(seq, event, data):
+        return f"id: {seq}\nevent: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+_feeds: Dict[str, StoryFeed] = {}
+_feeds_lock = threading.Lock()
+
+
+def get_story_feed(store) -> StoryFeed:
+    with _feeds_lock:
+        if store.path not in _feeds:
+            _feeds[store.path] = StoryFeed(store)
+        return _feeds[store.path]